@@ -1,7 +1,10 @@
 from django.contrib import admin
-from .models import Events, EventReviews, Answers, Categories
+from .models import Events, EventReviews, Answers, ArchivedEvent, Categories, Registration, TaggingJob
 
 admin.site.register(Events)
 admin.site.register(EventReviews)
 admin.site.register(Answers)
-admin.site.register(Categories)
\ No newline at end of file
+admin.site.register(Categories)
+admin.site.register(TaggingJob)
+admin.site.register(Registration)
+admin.site.register(ArchivedEvent)
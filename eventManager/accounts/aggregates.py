@@ -0,0 +1,89 @@
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce
+
+from .models import Answers, EventReviews, Events
+
+
+def _update_event(event_id, count_delta, rating_delta):
+    # Un seul UPDATE : à droite du SET, F() désigne les valeurs avant mise à jour,
+    # la moyenne est donc calculée à partir des nouveaux total et nombre.
+    new_count = F('review_count') + count_delta
+    new_sum = F('rating_sum') + rating_delta
+    Events.objects.filter(id=event_id).update(
+        review_count=new_count,
+        rating_sum=new_sum,
+        avg_rating=Case(
+            When(review_count__lte=-count_delta, then=Value(0.0)),
+            default=Cast(new_sum, FloatField()) / Cast(new_count, FloatField()),
+            output_field=FloatField(),
+        ),
+    )
+
+
+def review_added(review):
+    _update_event(review.event_id, 1, int(review.rating))
+
+
+def review_rating_changed(review, old_rating):
+    _update_event(review.event_id, 0, int(review.rating) - int(old_rating))
+
+
+def review_removed(review):
+    _update_event(review.event_id, -1, -int(review.rating))
+
+
+def answer_added(answer):
+    EventReviews.objects.filter(id=answer.review_id).update(answer_count=F('answer_count') + 1)
+
+
+def answer_removed(answer):
+    EventReviews.objects.filter(id=answer.review_id).update(answer_count=F('answer_count') - 1)
+
+
+def _average(sum_field, count_field):
+    return Case(
+        When(**{count_field: 0}, then=Value(0.0)),
+        default=Cast(F(sum_field), FloatField()) / Cast(F(count_field), FloatField()),
+        output_field=FloatField(),
+    )
+
+
+def _chunks(ids, size=500):
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def recompute(events=None, reviews=None):
+    """Recalcule les agrégats depuis les tables sources ; renvoie le nombre
+    d'événements et d'avis qui avaient dérivé."""
+    if events is None:
+        events = Events.objects.all()
+    if reviews is None:
+        reviews = EventReviews.objects.all()
+
+    review_stats = EventReviews.objects.filter(event=OuterRef('pk')).values('event')
+    actual_count = Coalesce(Subquery(review_stats.annotate(n=Count('id')).values('n')), 0)
+    actual_sum = Coalesce(Subquery(review_stats.annotate(s=Sum('rating')).values('s')), 0)
+    event_ids = list(
+        events.annotate(actual_count=actual_count, actual_sum=actual_sum)
+        .annotate(actual_avg=_average('actual_sum', 'actual_count'))
+        .exclude(review_count=F('actual_count'), rating_sum=F('actual_sum'), avg_rating=F('actual_avg'))
+        .values_list('id', flat=True)
+    )
+    for ids in _chunks(event_ids):
+        with transaction.atomic():
+            drifted = Events.objects.filter(id__in=ids)
+            drifted.update(review_count=actual_count, rating_sum=actual_sum)
+            drifted.update(avg_rating=_average('rating_sum', 'review_count'))
+
+    answer_stats = Answers.objects.filter(review=OuterRef('pk')).values('review')
+    actual_answers = Coalesce(Subquery(answer_stats.annotate(n=Count('id')).values('n')), 0)
+    review_ids = list(
+        reviews.annotate(actual_answers=actual_answers)
+        .exclude(answer_count=F('actual_answers'))
+        .values_list('id', flat=True)
+    )
+    for ids in _chunks(review_ids):
+        EventReviews.objects.filter(id__in=ids).update(answer_count=actual_answers)
+    return len(event_ids), len(review_ids)
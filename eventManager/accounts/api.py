@@ -0,0 +1,465 @@
+"""API JSON en lecture et écriture : événements, avis, réponses, images et tags.
+
+Paramètres des GET :
+
+- `fields=title,date` : champs renvoyés ; seules les colonnes correspondantes
+  sont lues en base (`.only()`) ;
+- `expand=category,reviews` : relations incluses dans la réponse, chargées par
+  select_related (clé étrangère) ou prefetch (une requête par relation) ;
+- `after=` / `before=` / `page_size=` : pagination par curseur des listes,
+  filtres par relation (`?event=12`).
+
+Les réponses portent un ETag et un Last-Modified tirés des versions du cache
+des pages (accounts/caching.py), celles des relations dépliées comprises : un
+GET conditionnel sur des données inchangées reçoit un 304 sans aucune requête
+SQL.
+
+Les écritures (corps JSON) demandent une session et le jeton CSRF, comme les
+formulaires du site.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import FileField, Prefetch
+from django.forms import ModelForm, modelform_factory
+from django.forms.models import model_to_dict
+from django.http import HttpResponse, JsonResponse, QueryDict
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from . import aggregates, booking, caching
+from .models import Answers, Categories, EventReviews, Events, Image, Tags
+from .pagination import paginate_keyset
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+class Resource:
+    """Description d'un modèle exposé : champs, relations dépliables, écritures.
+
+    `expand` associe un nom de paramètre au nom de la relation sur le modèle et
+    à la ressource qui sérialise les objets liés ; `sorts` associe une valeur
+    de `?sort=` aux champs du curseur correspondant (`cursor` par défaut). Les méthodes create, update
+    et delete portent les effets de bord propres au modèle (agrégats, places).
+    """
+
+    def __init__(self, model, fields, expand=None, filters=None, writable=(), create_only=(),
+                 cursor=('id',), sorts=None, read_only=False, form=ModelForm):
+        self.model = model
+        self.form = form
+        self.fields = list(fields)
+        self.expand = expand or {}
+        self.filters = filters or {}
+        self.writable = list(writable)
+        self.create_only = list(create_only)
+        self.cursor = cursor
+        self.sorts = sorts or {}
+        # Aucune écriture, suppression comprise
+        self.read_only = read_only
+
+    # Lecture
+
+    def _relation(self, name):
+        relation, resource = self.expand[name]
+        return self.model._meta.get_field(relation), RESOURCES[resource]
+
+    def queryset(self, fields, expand):
+        cursors = [self.cursor, *self.sorts.values()]
+        columns = set(fields) | {field.lstrip('-') for cursor in cursors for field in cursor} | {'id'}
+        select, prefetch = [], []
+        for name in expand:
+            field, resource = self._relation(name)
+            if field.many_to_one:
+                # Colonnes de l'objet lié lues dans la même requête (jointure)
+                select.append(field.name)
+                columns.add(field.name)
+                columns.update(f'{field.name}__{column}' for column in resource.fields)
+            else:
+                related_columns = list(resource.fields)
+                if field.one_to_many:
+                    # La clé étrangère sert à rattacher chaque objet à son parent
+                    related_columns.append(field.field.name)
+                related = resource.model._default_manager.only(*related_columns).order_by(*resource.cursor)
+                prefetch.append(Prefetch(_accessor(field), queryset=related))
+        queryset = self.model._default_manager.prefetch_related(*prefetch).only(*columns)
+        # select_related() sans argument suivrait toutes les clés étrangères
+        return queryset.select_related(*select) if select else queryset
+
+    def serialize(self, obj, fields=None, expand=()):
+        data = {}
+        for name in fields or self.fields:
+            if name not in expand:
+                data[name] = _value(obj, self.model._meta.get_field(name))
+        for name in expand:
+            field, resource = self._relation(name)
+            if field.many_to_one:
+                related = getattr(obj, field.name)
+                data[name] = None if related is None else resource.serialize(related)
+            else:
+                data[name] = [resource.serialize(related) for related in getattr(obj, _accessor(field)).all()]
+        return data
+
+    # Écriture
+
+    def owner_id(self, obj):
+        return obj.created_by_id
+
+    def can_write(self, user, obj=None):
+        if user.is_staff:
+            return True
+        return obj is None or self.owner_id(obj) == user.id
+
+    def form_class(self, creating):
+        fields = self.writable + (self.create_only if creating else [])
+        return modelform_factory(self.model, form=self.form, fields=fields)
+
+    def create(self, form, user):
+        obj = form.save(commit=False)
+        if any(field.name == 'created_by' for field in self.model._meta.fields):
+            obj.created_by = user
+        obj.save()
+        return obj
+
+    def update(self, form):
+        obj = form.save(commit=False)
+        if form.changed_data:
+            obj.save(update_fields=form.changed_data)
+        return obj
+
+    def delete(self, obj):
+        obj.delete()
+
+
+class EventResource(Resource):
+    def update(self, form):
+        delta = form.cleaned_data['places'] - form.initial['places']
+        event = super().update(form)
+        if delta:
+            # Les places restantes suivent la capacité, sans écraser les
+            # réservations faites entre-temps ; les places ajoutées vont
+            # d'abord à la liste d'attente
+            try:
+                booking.change_capacity(event.id, delta)
+            except booking.BookingError as exc:
+                raise ApiError(str(exc))
+            event.refresh_from_db(fields=['places_left'])
+        return event
+
+
+class ReviewForm(ModelForm):
+    def clean_rating(self):
+        rating = self.cleaned_data['rating']
+        if not 1 <= rating <= 5:
+            raise ValidationError('La note doit être comprise entre 1 et 5')
+        return rating
+
+
+class ReviewResource(Resource):
+    def create(self, form, user):
+        review = super().create(form, user)
+        aggregates.review_added(review)
+        return review
+
+    def update(self, form):
+        old_rating = form.initial['rating']
+        review = super().update(form)
+        if 'rating' in form.changed_data:
+            aggregates.review_rating_changed(review, old_rating)
+        return review
+
+    def delete(self, review):
+        aggregates.review_removed(review)
+        review.delete()
+
+
+class AnswerResource(Resource):
+    def create(self, form, user):
+        answer = super().create(form, user)
+        aggregates.answer_added(answer)
+        return answer
+
+    def delete(self, answer):
+        aggregates.answer_removed(answer)
+        answer.delete()
+
+
+class ImageResource(Resource):
+    # Les fichiers s'envoient par les formulaires d'upload (validation,
+    # déduplication, tagging) ; l'API ne permet que la suppression
+    def owner_id(self, image):
+        return Events.objects.filter(id=image.event_id).values_list('created_by_id', flat=True).first()
+
+
+RESOURCES = {
+    'events': EventResource(
+        Events,
+        fields=['id', 'title', 'category', 'date', 'location', 'places', 'places_left', 'created_by',
+                'review_count', 'avg_rating'],
+        expand={'category': ('category', 'categories'), 'created_by': ('created_by', 'users'),
+                'reviews': ('reviews', 'reviews'), 'images': ('images', 'images')},
+        filters={'category': 'category_id', 'created_by': 'created_by_id'},
+        writable=['title', 'category', 'date', 'location', 'places'],
+        cursor=('date', 'id'),
+        # Index (avg_rating, id), lu à l'envers
+        sorts={'-avg_rating': ('-avg_rating', '-id')},
+    ),
+    'reviews': ReviewResource(
+        EventReviews,
+        fields=['id', 'event', 'review_text', 'rating', 'created_by', 'created_at', 'answer_count'],
+        expand={'event': ('event', 'events'), 'created_by': ('created_by', 'users'),
+                'answers': ('answers', 'answers'), 'images': ('images', 'images')},
+        filters={'event': 'event_id', 'created_by': 'created_by_id'},
+        writable=['review_text', 'rating'],
+        create_only=['event'],
+        form=ReviewForm,
+    ),
+    'answers': AnswerResource(
+        Answers,
+        fields=['id', 'review', 'answer_text', 'created_by', 'created_at'],
+        expand={'review': ('review', 'reviews'), 'created_by': ('created_by', 'users')},
+        filters={'review': 'review_id', 'created_by': 'created_by_id'},
+        writable=['answer_text'],
+        create_only=['review'],
+    ),
+    'images': ImageResource(
+        Image,
+        fields=['id', 'event', 'review', 'image', 'content_hash'],
+        expand={'event': ('event', 'events'), 'tags': ('tags', 'tags')},
+        filters={'event': 'event_id', 'review': 'review_id'},
+    ),
+    # Lecture seule : les ids des tags sont gardés en cache par chaque
+    # processus (tag_service), renommer ou supprimer un tag les fausserait
+    'tags': Resource(Tags, fields=['id', 'name'], read_only=True),
+    # Uniquement dépliées dans les autres ressources
+    'categories': Resource(Categories, fields=['id', 'name']),
+    'users': Resource(User, fields=['id', 'username']),
+}
+
+
+def _accessor(field):
+    return field.get_accessor_name() if field.auto_created else field.name
+
+
+def _value(obj, field):
+    if field.many_to_one:
+        return getattr(obj, field.attname)
+    value = field.value_from_object(obj)
+    if isinstance(field, FileField):
+        return value.url if value else None
+    return value
+
+
+def _split(value):
+    return [item for item in (value or '').split(',') if item]
+
+
+def _read_params(resource, params):
+    fields = _split(params.get('fields')) or resource.fields
+    expand = _split(params.get('expand'))
+    unknown = [name for name in fields if name not in resource.fields and name not in resource.expand]
+    unknown += [name for name in expand if name not in resource.expand]
+    if unknown:
+        raise ApiError(f'Champ inconnu : {", ".join(unknown)}')
+    # Une relation inverse (reviews, images...) demandée dans fields= est dépliée
+    expand += [name for name in fields if name not in resource.fields and name not in expand]
+    return [name for name in fields if name not in expand], expand
+
+
+def _json_body(request):
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        raise ApiError('Corps JSON invalide')
+    if not isinstance(data, dict):
+        raise ApiError('Le corps doit être un objet JSON')
+    return data
+
+
+# Relations dont la modification change la version d'un événement seul
+# (signaux de accounts/signals.py) ; les autres suivent la version des listes
+_EVENT_VERSIONED = {'reviews', 'images'}
+
+
+def _etag_versions(request, resource_name, pk=None):
+    """Versions dont dépend la réponse : la ressource et ses relations dépliées.
+
+    Toute modification d'un événement, de ses avis, réponses, images ou tags,
+    d'une catégorie ou d'un tag change la version des listes. Celle d'un
+    événement seul est plus fine, mais ne couvre que ses avis et ses images.
+    Les utilisateurs dépliés ont leur propre version.
+    """
+    expand = set(_split(request.GET.get('expand'))) & set(RESOURCES[resource_name].expand)
+    related = {RESOURCES[resource_name].expand[name][1] for name in expand}
+    if resource_name == 'events' and pk is not None and expand <= _EVENT_VERSIONED:
+        versions = [caching.event_version(pk)]
+    else:
+        versions = [caching.list_version()]
+    if 'users' in related:
+        versions.append(caching.users_version())
+    return versions
+
+
+def _conditional(request, versions):
+    """Réponse 304/412 si l'en-tête conditionnel de la requête correspond, sinon None."""
+    if None in versions:
+        # Cache désactivé (DummyCache) : pas de version fiable
+        return None, None
+    key = ':'.join(str(version) for version in versions)
+    etag = quote_etag(hashlib.sha1(f'{key}:{request.get_full_path()}'.encode()).hexdigest())
+    last_modified = max(versions) // 10**9
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    return response, (etag, last_modified)
+
+
+def _with_validators(response, validators):
+    if validators is not None:
+        etag, last_modified = validators
+        response.headers.setdefault('ETag', etag)
+        response.headers.setdefault('Last-Modified', http_date(last_modified))
+    # Gardée par les clients, mais revalidée à chaque lecture
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def _page_url(request, **cursor):
+    params = QueryDict(mutable=True)
+    params.update(request.GET)
+    for key in ('after', 'before'):
+        params.pop(key, None)
+    params.update(cursor)
+    return f'{request.path}?{params.urlencode()}'
+
+
+def _errors(form):
+    return {field: [error['message'] for error in errors] for field, errors in form.errors.get_json_data().items()}
+
+
+def _check_write(request, resource, obj=None):
+    if not request.user.is_authenticated:
+        raise ApiError('Authentification requise', status=401)
+    if resource.read_only or (not resource.writable and request.method != 'DELETE'):
+        raise ApiError('Ressource en lecture seule', status=405)
+    if not resource.can_write(request.user, obj):
+        raise ApiError('Action non autorisée', status=403)
+
+
+def collection(request, resource_name):
+    """GET : liste paginée ; POST : création."""
+    resource = RESOURCES[resource_name]
+    try:
+        if request.method == 'GET':
+            return _list(request, resource_name, resource)
+        if request.method == 'POST':
+            return _create(request, resource_name, resource)
+    except ApiError as exc:
+        return JsonResponse({'error': exc.message}, status=exc.status)
+    return JsonResponse({'error': 'Méthode non autorisée'}, status=405, headers={'Allow': 'GET, POST'})
+
+
+def item(request, resource_name, pk):
+    """GET : détail ; PATCH/PUT : modification ; DELETE : suppression.
+
+    If-None-Match / If-Modified-Since (GET) et If-Match (écritures) sont
+    vérifiés avant toute lecture en base.
+    """
+    resource = RESOURCES[resource_name]
+    if request.method not in ('GET', 'PATCH', 'PUT', 'DELETE'):
+        return JsonResponse({'error': 'Méthode non autorisée'}, status=405,
+                            headers={'Allow': 'GET, PATCH, PUT, DELETE'})
+    response, validators = _conditional(request, _etag_versions(request, resource_name, pk))
+    if response is not None:
+        return _with_validators(response, validators)
+    try:
+        if request.method == 'GET':
+            fields, expand = _read_params(resource, request.GET)
+            obj = resource.queryset(fields, expand).filter(pk=pk).first()
+            if obj is None:
+                raise ApiError('Introuvable', status=404)
+            return _with_validators(JsonResponse(resource.serialize(obj, fields, expand)), validators)
+        obj = resource.model._default_manager.filter(pk=pk).first()
+        if obj is None:
+            raise ApiError('Introuvable', status=404)
+        _check_write(request, resource, obj)
+        if request.method == 'DELETE':
+            with transaction.atomic():
+                resource.delete(obj)
+            return HttpResponse(status=204)
+        return _update(request, resource, obj, partial=request.method == 'PATCH')
+    except ApiError as exc:
+        return JsonResponse({'error': exc.message}, status=exc.status)
+
+
+def _list(request, resource_name, resource):
+    response, validators = _conditional(request, _etag_versions(request, resource_name))
+    if response is not None:
+        return _with_validators(response, validators)
+
+    fields, expand = _read_params(resource, request.GET)
+    filters = {}
+    for name, lookup in resource.filters.items():
+        if name in request.GET:
+            try:
+                filters[lookup] = int(request.GET[name])
+            except ValueError:
+                raise ApiError(f'Filtre {name} invalide')
+    try:
+        page_size = int(request.GET.get('page_size', getattr(settings, 'API_PAGE_SIZE', 20)))
+    except ValueError:
+        raise ApiError('page_size invalide')
+    page_size = max(1, min(page_size, getattr(settings, 'API_MAX_PAGE_SIZE', 100)))
+    cursor = resource.cursor
+    if request.GET.get('sort'):
+        try:
+            cursor = resource.sorts[request.GET['sort']]
+        except KeyError:
+            raise ApiError(f"Tri {request.GET['sort']} invalide")
+    try:
+        page = paginate_keyset(
+            resource.queryset(fields, expand).filter(**filters),
+            fields=cursor,
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+            page_size=page_size,
+        )
+    except ValueError as exc:
+        raise ApiError(str(exc))
+    return _with_validators(JsonResponse({
+        'results': [resource.serialize(obj, fields, expand) for obj in page],
+        'next': _page_url(request, after=page.next_cursor) if page.next_cursor else None,
+        'previous': _page_url(request, before=page.prev_cursor) if page.prev_cursor else None,
+    }), validators)
+
+
+def _create(request, resource_name, resource):
+    _check_write(request, resource)
+    form = resource.form_class(creating=True)(data=_json_body(request))
+    if not form.is_valid():
+        return JsonResponse({'errors': _errors(form)}, status=400)
+    with transaction.atomic():
+        obj = resource.create(form, request.user)
+    response = JsonResponse(resource.serialize(obj), status=201)
+    response['Location'] = reverse(f'api:{resource_name}-detail', args=[obj.pk])
+    return response
+
+
+def _update(request, resource, obj, partial):
+    form_class = resource.form_class(creating=False)
+    data = _json_body(request)
+    if partial:
+        data = {**model_to_dict(obj, fields=form_class._meta.fields), **data}
+    form = form_class(data=data, instance=obj)
+    if not form.is_valid():
+        return JsonResponse({'errors': _errors(form)}, status=400)
+    with transaction.atomic():
+        obj = resource.update(form)
+    return JsonResponse(resource.serialize(obj))
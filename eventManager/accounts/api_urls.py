@@ -0,0 +1,17 @@
+from django.urls import path
+from .api import collection, item
+
+app_name = 'api'
+
+urlpatterns = [
+  path('events/', collection, {'resource_name': 'events'}, name='events-list'),
+  path('events/<int:pk>/', item, {'resource_name': 'events'}, name='events-detail'),
+  path('reviews/', collection, {'resource_name': 'reviews'}, name='reviews-list'),
+  path('reviews/<int:pk>/', item, {'resource_name': 'reviews'}, name='reviews-detail'),
+  path('answers/', collection, {'resource_name': 'answers'}, name='answers-list'),
+  path('answers/<int:pk>/', item, {'resource_name': 'answers'}, name='answers-detail'),
+  path('images/', collection, {'resource_name': 'images'}, name='images-list'),
+  path('images/<int:pk>/', item, {'resource_name': 'images'}, name='images-detail'),
+  path('tags/', collection, {'resource_name': 'tags'}, name='tags-list'),
+  path('tags/<int:pk>/', item, {'resource_name': 'tags'}, name='tags-detail'),
+]
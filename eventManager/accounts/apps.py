@@ -0,0 +1,15 @@
+from django.apps import AppConfig
+from django.conf import settings
+
+
+class AccountsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'accounts'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        if getattr(settings, 'TAGGER_WARM_ON_STARTUP', False):
+            from .classifier import warm_model
+
+            warm_model()
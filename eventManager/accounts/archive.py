@@ -0,0 +1,244 @@
+import os
+
+from django.core.files.storage import default_storage, storages
+from django.db import transaction
+from django.db.models import Count, Prefetch
+
+from . import caching, chunked_uploads
+from .models import Answers, ArchivedEvent, EventReviews, Events, Image, ImageVariant, Registration, UploadSession
+from .signals import suspended
+
+
+class ArchiveResult:
+    def __init__(self):
+        self.events = 0
+        self.reviews = 0
+        self.answers = 0
+        self.images = 0
+        self.files_moved = 0
+
+
+def cold_storage():
+    return storages['archive']
+
+
+def archivable(cutoff):
+    return Events.objects.filter(date__lt=cutoff)
+
+
+def _snapshot_queryset():
+    answers = Answers.objects.select_related('created_by').order_by('created_at', 'id')
+    reviews = (
+        EventReviews.objects.select_related('created_by')
+        .prefetch_related(Prefetch('answers_set', queryset=answers))
+        .order_by('created_at', 'id')
+    )
+    return (
+        Events.objects.select_related('category', 'created_by')
+        .prefetch_related(
+            Prefetch('reviews', queryset=reviews),
+            Prefetch('images', queryset=Image.objects.prefetch_related('tags').order_by('id')),
+            Prefetch('registrations', queryset=Registration.objects.select_related('user').order_by('id')),
+        )
+        .annotate(registration_count=Count('registrations', distinct=True))
+    )
+
+
+def snapshot(event, file_names):
+    """Dict JSON de l'événement et de ses dépendances ; `file_names` donne le
+    nom de chaque image dans le stockage froid."""
+    return {
+        'title': event.title,
+        'category': event.category.name,
+        'date': event.date.isoformat(),
+        'location': event.location,
+        'places': event.places,
+        'created_by': event.created_by.username,
+        'review_count': event.review_count,
+        'avg_rating': event.avg_rating,
+        'registration_count': event.registration_count,
+        'registrations': [
+            {
+                'id': registration.id,
+                'user': registration.user.username,
+                'status': registration.status,
+                'created_at': registration.created_at.isoformat(),
+                'cancelled_at': registration.cancelled_at.isoformat() if registration.cancelled_at else None,
+            }
+            for registration in event.registrations.all()
+        ],
+        'reviews': [
+            {
+                'id': review.id,
+                'created_by': review.created_by.username,
+                'created_at': review.created_at.isoformat(),
+                'rating': review.rating,
+                'review_text': review.review_text,
+                'answers': [
+                    {
+                        'id': answer.id,
+                        'created_by': answer.created_by.username,
+                        'created_at': answer.created_at.isoformat(),
+                        'answer_text': answer.answer_text,
+                    }
+                    for answer in review.answers_set.all()
+                ],
+            }
+            for review in event.reviews.all()
+        ],
+        'images': [
+            {
+                'id': image.id,
+                'review': image.review_id,
+                'file': file_names.get(image.image.name),
+                'content_hash': image.content_hash,
+                'tags': [tag.name for tag in image.tags.all()],
+            }
+            for image in event.images.all()
+        ],
+    }
+
+
+def _cold_name(name, content_hash):
+    # Nom froid dérivé du contenu : un nom chaud peut être réattribué à un
+    # autre fichier une fois celui-ci archivé et supprimé
+    if not content_hash:
+        return name
+    return f'events/{content_hash[:2]}/{content_hash}{os.path.splitext(name)[1].lower()}'
+
+
+def _copy_to_cold(hashes, result, created):
+    """Copie les fichiers {nom chaud: empreinte} vers le stockage froid ;
+    renvoie {nom chaud: nom froid}.
+
+    Fait avant la transaction : un instantané ne pointe jamais vers un
+    fichier absent. Un contenu déjà archivé (même empreinte) n'est pas
+    recopié ; les noms froids écrits par cet appel sont ajoutés à `created`,
+    pour être supprimés si la transaction échoue.
+    """
+    cold = cold_storage()
+    copied = {}
+    for name, content_hash in hashes.items():
+        cold_name = _cold_name(name, content_hash)
+        if content_hash and cold.exists(cold_name):
+            copied[name] = cold_name
+            continue
+        try:
+            with default_storage.open(name, 'rb') as fp:
+                copied[name] = cold.save(cold_name, fp)
+        except FileNotFoundError:
+            copied[name] = None
+            continue
+        created.append(copied[name])
+        result.files_moved += 1
+    return copied
+
+
+def _discard_cold(names):
+    cold = cold_storage()
+    for name in names:
+        cold.delete(name)
+
+
+def _remove_parts(paths):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _release_files(image_names, variant_names):
+    # Fichiers partagés (déduplication par contenu) : supprimés seulement
+    # quand plus aucune image active ne les utilise
+    still_used = set(Image.objects.filter(image__in=image_names).values_list('image', flat=True))
+    still_used |= set(ImageVariant.objects.filter(file__in=variant_names).values_list('file', flat=True))
+    for name in set(image_names) | set(variant_names):
+        if name not in still_used:
+            default_storage.delete(name)
+
+
+def archive_chunk(event_ids, result=None):
+    """Archive les événements `event_ids` et leurs dépendances, en une transaction."""
+    result = result or ArchiveResult()
+    events = list(_snapshot_queryset().filter(id__in=event_ids))
+    hashes = {image.image.name: image.content_hash for event in events for image in event.images.all() if image.image}
+    image_names = list(hashes)
+    variant_names = list(
+        ImageVariant.objects.filter(image__event__in=event_ids).values_list('file', flat=True)
+    )
+    # Envois par morceaux (supprimés en cascade) : leurs fichiers partiels aussi
+    part_paths = [
+        chunked_uploads.part_path(session)
+        for session in UploadSession.objects.filter(event__in=event_ids).only('id')
+    ]
+    created = []
+    file_names = _copy_to_cold(hashes, result, created)
+
+    try:
+        with transaction.atomic():
+            ArchivedEvent.objects.bulk_create([
+                ArchivedEvent(
+                    id=event.id,
+                    title=event.title,
+                    category_name=event.category.name,
+                    date=event.date,
+                    location=event.location,
+                    data=snapshot(event, file_names),
+                )
+                for event in events
+            ])
+            # Avis, réponses, images, tags, inscriptions, envois et index de
+            # recherche partent en cascade ; le cache est invalidé une fois par
+            # événement plutôt qu'une fois par objet supprimé
+            with suspended():
+                Events.objects.filter(id__in=[event.id for event in events]).delete()
+            for event in events:
+                caching.invalidate_event(event.id)
+            # Les miniatures ne sont pas archivées : elles se régénèrent
+            transaction.on_commit(lambda: _release_files(image_names, variant_names))
+            transaction.on_commit(lambda: _remove_parts(part_paths))
+    except BaseException:
+        # Aucun instantané ne pointe vers les copies faites pour ce lot
+        _discard_cold(created)
+        raise
+
+    result.events += len(events)
+    for event in events:
+        reviews = event.reviews.all()
+        result.reviews += len(reviews)
+        result.answers += sum(len(review.answers_set.all()) for review in reviews)
+        result.images += len(event.images.all())
+    return result
+
+
+def archive_events(cutoff, chunk_size=200, progress=None):
+    """Archive par lots tous les événements antérieurs à `cutoff`.
+
+    Chaque lot est une transaction : une interruption laisse les lots déjà
+    archivés en place et la commande peut simplement être relancée.
+    """
+    result = ArchiveResult()
+    while True:
+        event_ids = list(archivable(cutoff).order_by('id').values_list('id', flat=True)[:chunk_size])
+        if not event_ids:
+            return result
+        archive_chunk(event_ids, result=result)
+        if progress:
+            progress(result)
+
+
+def lookup(event_id):
+    return ArchivedEvent.objects.filter(id=event_id).first()
+
+
+async def alookup(event_id):
+    return await ArchivedEvent.objects.filter(id=event_id).afirst()
+
+
+def images_of(archived):
+    """Images de l'instantané avec leur URL dans le stockage froid."""
+    cold = cold_storage()
+    images = []
+    for image in archived.data['images']:
+        if image['file']:
+            images.append({**image, 'url': cold.url(image['file'])})
+    return images
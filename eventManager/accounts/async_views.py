@@ -0,0 +1,181 @@
+"""Versions asynchrones des pages de lecture et de l'ajout d'événement.
+
+Servies à la place des vues synchrones quand ASYNC_VIEWS est actif (déploiement
+ASGI, voir eventManager/asgi.py). Sous WSGI, Django devrait démarrer une boucle
+d'événements à chaque requête pour les exécuter : les vues synchrones y restent
+plus rapides.
+"""
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.core.exceptions import ValidationError
+from django.http import Http404, QueryDict
+from django.shortcuts import redirect, render
+from django.urls import reverse_lazy
+from django.views.generic import TemplateView
+
+from . import archive, caching, feeds
+from .executor import ExecutorBusy, run_bounded
+from .models import Categories, Events, Registration
+from .pagination import apaginate_keyset
+from .uploads import save_upload, validate_image
+from .views import (
+    EVENTS_PER_PAGE, _archived_event_details, _event_details_queryset, _event_filters, _event_sort,
+    _filter_events, _parse_places, _reviews_queryset,
+)
+
+
+async def _alist(queryset):
+    return [obj async for obj in queryset]
+
+
+async def _render(request, template_name, context, status=None):
+    # Le rendu est synchrone : balise {% cache %} (accès au cache) et
+    # requêtes paresseuses du gabarit. Il passe par le thread des vues
+    # synchrones plutôt que de bloquer la boucle d'événements.
+    return await sync_to_async(render)(request, template_name, context, status=status)
+
+
+async def _auser(request):
+    # request.user se résout par une requête synchrone : on le charge ici pour
+    # que le rendu (processeur de contexte "auth") ne bloque pas la boucle.
+    request.user = await request.auser()
+    return request.user
+
+
+class HomeView(TemplateView):
+    template_name = 'index.html'
+    login_url = reverse_lazy('accounts:login')
+
+    async def get(self, request, *args, **kwargs):
+        # LoginRequiredMixin est synchrone : contrôle équivalent en asynchrone
+        user = await _auser(request)
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path(), self.login_url)
+        context = self.get_context_data(**kwargs)
+        version = await caching.alist_version()
+        context['events'] = await caching.acached(
+            'home', 'events', version,
+            lambda: _alist(feeds.upcoming()[:5]),  # Les 5 prochains événements
+        )
+        context['categories'] = await caching.acached('home', 'categories', version,
+                                                      lambda: _alist(Categories.objects.all()))
+        # TemplateResponse : rendue par le gestionnaire ASGI, hors de la boucle
+        return self.render_to_response(context)
+
+
+async def event_reviews(request, event_id):
+    try:
+        event = await Events.objects.only('id', 'title').aget(id=event_id)
+    except Events.DoesNotExist:
+        raise Http404('Événement introuvable')
+    # Les avis ne sont lus, dans le thread du rendu, qu'en l'absence du fragment en cache
+    return await _render(request, 'event_reviews.html', {
+        'event': event,
+        'reviews': _reviews_queryset().filter(event_id=event_id),
+        'cache_version': await caching.aevent_version(event_id),
+        'cache_timeout': settings.PAGE_CACHE_TIMEOUT,
+    })
+
+
+async def event_list(request):
+    filters = _event_filters(request.GET)
+    cache_key = hashlib.sha1(request.GET.urlencode().encode()).hexdigest()
+    page, categories = await caching.acached(
+        'event_list', cache_key, await caching.alist_version(),
+        lambda: _event_list_page(request.GET, filters),
+    )
+
+    # Les liens de pagination conservent les filtres
+    query = QueryDict(mutable=True)
+    query.update({key: value for key, value in filters.items() if value})
+    return await _render(request, 'event_list.html', {
+        'events': page,
+        'page': page,
+        'filters': filters,
+        'filter_query': query.urlencode(),
+        'categories': categories,
+    })
+
+
+async def _event_list_page(params, filters):
+    events = _filter_events(filters)
+    try:
+        page = await apaginate_keyset(
+            events,
+            fields=_event_sort(filters),
+            after=params.get('after'),
+            before=params.get('before'),
+            page_size=EVENTS_PER_PAGE,
+        )
+    except ValueError:
+        page = await apaginate_keyset(events, fields=_event_sort(filters), page_size=EVENTS_PER_PAGE)
+    return page, await _alist(Categories.objects.all())
+
+
+async def event_details(request, event_id):
+    user = await _auser(request)
+    version = await caching.aevent_version(event_id)
+    try:
+        event = await caching.acached(
+            'event_details', event_id, version,
+            lambda: _event_details_queryset().aget(id=event_id),
+        )
+    except Events.DoesNotExist:
+        return await sync_to_async(_archived_event_details)(request, await archive.alookup(event_id))
+    # Propre à chaque visiteur : hors cache
+    registration = None
+    if user.is_authenticated:
+        registration = await (
+            Registration.objects.filter(event_id=event_id, user=user)
+            .exclude(status=Registration.CANCELLED)
+            .afirst()
+        )
+    return await _render(request, 'event_details.html', {
+        'event': event,
+        'reviews': event.reviews.all(),
+        'registration': registration,
+        'cache_version': version,
+        'cache_timeout': settings.PAGE_CACHE_TIMEOUT,
+    })
+
+
+async def add_event(request):
+    user = await _auser(request)
+    categories = await _alist(Categories.objects.all())
+    if request.method == 'POST':
+        uploaded_file = request.FILES.get('image')
+        try:
+            places = _parse_places(request.POST.get('places'))
+        except ValidationError as exc:
+            return await _render(request, 'add_event.html', {'categories': categories, 'error': exc.messages[0]})
+        fields = {
+            'title': request.POST.get('title'),
+            'category_id': request.POST.get('category'),
+            'date': request.POST.get('date'),
+            'location': request.POST.get('location'),
+            'places': places,
+            'created_by': user,
+        }
+        if uploaded_file:
+            # Lecture, hachage et stockage de l'image sont bloquants : ils passent
+            # par le pool borné pour ne jamais bloquer la boucle d'événements
+            try:
+                await run_bounded(_create_event_with_image, fields, uploaded_file)
+            except ValidationError as exc:
+                return await _render(request, 'add_event.html', {'categories': categories, 'error': exc.messages[0]})
+            except ExecutorBusy as exc:
+                return await _render(request, 'add_event.html', {'categories': categories, 'error': str(exc)}, status=503)
+        else:
+            await Events.objects.acreate(**fields)
+        return redirect('home')
+    return await _render(request, 'add_event.html', {'categories': categories})
+
+
+def _create_event_with_image(fields, uploaded_file):
+    validate_image(uploaded_file)
+    event = Events.objects.create(**fields)
+    save_upload(uploaded_file, event=event)
+    return event
@@ -0,0 +1,116 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import caching
+from .models import Events, Registration
+
+
+class BookingError(Exception):
+    pass
+
+
+def _take_seat(event_id):
+    # Décrément conditionnel : la base ne le fait que s'il reste une place,
+    # deux réservations simultanées ne peuvent pas prendre la même.
+    return Events.objects.filter(id=event_id, places_left__gt=0).update(places_left=F('places_left') - 1)
+
+
+def book(event_id, user):
+    """Inscrit `user` : place confirmée s'il en reste, sinon liste d'attente.
+
+    Lève Events.DoesNotExist si l'événement n'existe pas, BookingError si
+    `user` y est déjà inscrit.
+    """
+    try:
+        with transaction.atomic():
+            seat = _take_seat(event_id)
+            if not seat:
+                # Verrou sur l'événement puis nouvel essai : une annulation en
+                # cours a pu libérer une place sans trouver personne en attente.
+                if not Events.objects.select_for_update().filter(id=event_id).exists():
+                    raise Events.DoesNotExist
+                seat = _take_seat(event_id)
+            registration = Registration.objects.create(
+                event_id=event_id,
+                user=user,
+                status=Registration.CONFIRMED if seat else Registration.WAITLISTED,
+            )
+    except IntegrityError:
+        raise BookingError('Vous êtes déjà inscrit à cet événement.')
+    caching.invalidate_event(event_id)
+    return registration
+
+
+def cancel(registration):
+    """Annule une inscription ; la place libérée revient au premier en attente.
+
+    Renvoie l'inscription promue, ou None.
+    """
+    with transaction.atomic():
+        # Le verrou sur l'événement sérialise annulations et mises en attente ;
+        # le statut est relu par la base : deux annulations simultanées de la
+        # même inscription ne libèrent qu'une place.
+        Events.objects.select_for_update().filter(id=registration.event_id).exists()
+        now = timezone.now()
+        released = Registration.objects.filter(id=registration.id, status=Registration.CONFIRMED).update(
+            status=Registration.CANCELLED, cancelled_at=now,
+        )
+        if not released:
+            Registration.objects.filter(id=registration.id, status=Registration.WAITLISTED).update(
+                status=Registration.CANCELLED, cancelled_at=now,
+            )
+            registration.status = Registration.CANCELLED
+            return None
+
+        promoted = _promote_next(registration.event_id)
+        if promoted is None:
+            Events.objects.filter(id=registration.event_id).update(places_left=F('places_left') + 1)
+    registration.status = Registration.CANCELLED
+    registration.cancelled_at = now
+    caching.invalidate_event(registration.event_id)
+    return promoted
+
+
+def change_capacity(event_id, delta):
+    """Répercute sur places_left un changement de capacité de `delta` places.
+
+    Lève BookingError si la capacité descendrait sous le nombre de places
+    déjà réservées. Les places ajoutées vont d'abord à la liste d'attente ;
+    renvoie les inscriptions promues.
+    """
+    if not delta:
+        return []
+    promoted = []
+    with transaction.atomic():
+        Events.objects.select_for_update().filter(id=event_id).exists()
+        # Delta relatif à la valeur en base : les réservations faites entre
+        # la lecture du formulaire et l'enregistrement sont conservées
+        changed = Events.objects.filter(id=event_id, places_left__gte=-delta).update(
+            places_left=F('places_left') + delta,
+        )
+        if not changed:
+            raise BookingError('Capacité inférieure au nombre de places déjà réservées.')
+        while delta > len(promoted) and _take_seat(event_id):
+            candidate = _promote_next(event_id)
+            if candidate is None:
+                Events.objects.filter(id=event_id).update(places_left=F('places_left') + 1)
+                break
+            promoted.append(candidate)
+    caching.invalidate_event(event_id)
+    return promoted
+
+
+def _promote_next(event_id):
+    # Appelé sous le verrou de l'événement. La place est transmise
+    # directement : places_left ne bouge pas.
+    candidate = (
+        Registration.objects.filter(event_id=event_id, status=Registration.WAITLISTED)
+        .order_by('created_at', 'id')
+        .first()
+    )
+    if candidate is None:
+        return None
+    Registration.objects.filter(id=candidate.id).update(status=Registration.CONFIRMED)
+    candidate.status = Registration.CONFIRMED
+    return candidate
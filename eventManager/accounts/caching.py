@@ -0,0 +1,142 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+LIST_VERSION_KEY = 'events:list:version'
+# Noms d'utilisateur, affichés par l'API (relations `created_by` dépliées)
+USERS_VERSION_KEY = 'users:version'
+
+# Espaces de noms suivis par hit_ratios()
+NAMESPACES = ('home', 'event_list', 'event_details')
+
+
+def _version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+async def _aversion(key):
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), None)
+        version = await cache.aget(key)
+    return version
+
+
+def _bump(key):
+    # Une nouvelle version (et non un simple +1) : une entrée évincée puis
+    # recréée ne peut pas retomber sur un ancien numéro encore en cache.
+    cache.set(key, time.time_ns(), None)
+
+
+def event_version(event_id):
+    return _version(f'event:{event_id}:version')
+
+
+def list_version():
+    return _version(LIST_VERSION_KEY)
+
+
+def users_version():
+    return _version(USERS_VERSION_KEY)
+
+
+async def aevent_version(event_id):
+    return await _aversion(f'event:{event_id}:version')
+
+
+async def alist_version():
+    return await _aversion(LIST_VERSION_KEY)
+
+
+def invalidate_event(event_id):
+    """Invalide le cache d'un événement et des listes, après le commit en cours.
+
+    Différé au commit : sinon une requête concurrente pourrait remettre en
+    cache l'état d'avant la transaction.
+    """
+    def bump():
+        _bump(f'event:{event_id}:version')
+        _bump(LIST_VERSION_KEY)
+    transaction.on_commit(bump)
+
+
+def invalidate_lists():
+    transaction.on_commit(lambda: _bump(LIST_VERSION_KEY))
+
+
+def invalidate_users():
+    transaction.on_commit(lambda: _bump(USERS_VERSION_KEY))
+
+
+def cached(namespace, key, version, producer, timeout=None):
+    """Valeur en cache pour (namespace, key, version), calculée par `producer` si absente."""
+    full_key = f'{namespace}:{key}:{version}'
+    value = cache.get(full_key)
+    if value is not None:
+        _count(namespace, 'hits')
+        return value
+    _count(namespace, 'misses')
+    value = producer()
+    if timeout is None:
+        timeout = getattr(settings, 'PAGE_CACHE_TIMEOUT', 300)
+    cache.set(full_key, value, timeout)
+    return value
+
+
+async def acached(namespace, key, version, producer, timeout=None):
+    """Version asynchrone de cached ; `producer` est une fonction coroutine."""
+    full_key = f'{namespace}:{key}:{version}'
+    value = await cache.aget(full_key)
+    if value is not None:
+        await _acount(namespace, 'hits')
+        return value
+    await _acount(namespace, 'misses')
+    value = await producer()
+    if timeout is None:
+        timeout = getattr(settings, 'PAGE_CACHE_TIMEOUT', 300)
+    await cache.aset(full_key, value, timeout)
+    return value
+
+
+def _count(namespace, outcome):
+    # Compteurs stockés dans le cache lui-même : partagés par tous les workers
+    # avec un backend commun (Redis, fichiers)
+    key = f'stats:{namespace}:{outcome}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, None)
+
+
+async def _acount(namespace, outcome):
+    key = f'stats:{namespace}:{outcome}'
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aadd(key, 1, None)
+
+
+def hit_ratios():
+    """{namespace: {'hits', 'misses', 'ratio'}} depuis la dernière remise à zéro."""
+    keys = [f'stats:{ns}:{outcome}' for ns in NAMESPACES for outcome in ('hits', 'misses')]
+    values = cache.get_many(keys)
+    ratios = {}
+    for namespace in NAMESPACES:
+        hits = values.get(f'stats:{namespace}:hits', 0)
+        misses = values.get(f'stats:{namespace}:misses', 0)
+        ratios[namespace] = {
+            'hits': hits,
+            'misses': misses,
+            'ratio': hits / (hits + misses) if hits + misses else 0.0,
+        }
+    return ratios
+
+
+def reset_stats():
+    cache.delete_many([f'stats:{ns}:{outcome}' for ns in NAMESPACES for outcome in ('hits', 'misses')])
@@ -0,0 +1,206 @@
+"""Envoi d'images en plusieurs morceaux, reprenable après une coupure.
+
+Protocole (voir les vues upload_* de accounts/views.py) :
+
+1. init : taille totale et nom du fichier → identifiant de session ;
+2. append : un morceau à la position `Upload-Offset`, lu dans un fichier
+   temporaire puis recopié dans le fichier de la session ; en cas de
+   coupure, le client relit la position reçue et reprend à partir d'elle ;
+3. complete : le fichier est mis en file ; `run_tagger` le valide, le range
+   dans le stockage (déplacement, sans copie) et le met en file de tagging.
+
+La mémoire utilisée ne dépend pas de la taille du fichier : les morceaux sont
+copiés par blocs de BLOCK_SIZE octets.
+"""
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import UploadSession
+from .uploads import save_upload, validate_image
+
+BLOCK_SIZE = 64 * 1024
+
+
+class UploadConflict(Exception):
+    """Position ou état inattendu : le client doit relire la session."""
+
+
+class UploadInterrupted(Exception):
+    """Flux coupé en cours de morceau : le client reprend à la position reçue."""
+
+
+class _AssembledFile(File):
+    # Avec temporary_file_path(), FileSystemStorage déplace le fichier au
+    # lieu de le recopier
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def max_bytes():
+    return getattr(settings, 'CHUNKED_UPLOAD_MAX_BYTES', 500 * 1024 * 1024)
+
+
+def max_chunk_bytes():
+    return getattr(settings, 'CHUNKED_UPLOAD_MAX_CHUNK_BYTES', 8 * 1024 * 1024)
+
+
+def part_path(session):
+    return os.path.join(settings.CHUNKED_UPLOAD_DIR, f'{session.id}.part')
+
+
+def start(user, event, filename, size, review=None):
+    if size <= 0:
+        raise ValidationError('Taille invalide')
+    if size > max_bytes():
+        raise ValidationError(f'Fichier trop lourd (maximum {max_bytes() // (1024 * 1024)} Mo)')
+    session = UploadSession.objects.create(
+        user=user,
+        event=event,
+        review=review,
+        filename=os.path.basename(filename)[:255] or 'image',
+        size=size,
+    )
+    os.makedirs(settings.CHUNKED_UPLOAD_DIR, exist_ok=True)
+    open(part_path(session), 'wb').close()
+    return session
+
+
+def append(session, offset, stream, length):
+    """Écrit `length` octets lus dans `stream` à la position `offset` ; renvoie la nouvelle position.
+
+    Le morceau est d'abord lu dans un fichier temporaire, sans verrou : un
+    client lent ne bloque pas la session. La position est ensuite réservée
+    par un UPDATE conditionnel et le morceau recopié dans le fichier, dans
+    la même transaction. Si le flux s'interrompt, les octets déjà lus
+    restent acquis et UploadInterrupted est levée.
+    """
+    if session.status != UploadSession.OPEN:
+        raise UploadConflict('Envoi déjà terminé')
+    if offset != session.received:
+        raise UploadConflict(f'Position attendue : {session.received}')
+    if offset + length > session.size:
+        raise ValidationError('Le morceau dépasse la taille annoncée')
+
+    written = 0
+    interrupted = None
+    with tempfile.TemporaryFile(dir=settings.CHUNKED_UPLOAD_DIR) as chunk:
+        try:
+            while written < length:
+                block = stream.read(min(BLOCK_SIZE, length - written))
+                if not block:
+                    break
+                chunk.write(block)
+                written += len(block)
+        except OSError as exc:
+            # Client déconnecté (UnreadablePostError) ou flux coupé
+            interrupted = exc
+        if written:
+            chunk.seek(0)
+            with transaction.atomic():
+                # L'UPDATE conditionnel verrouille la session jusqu'à la fin de
+                # la copie : un envoi concurrent à la même position ou un
+                # complete() attend, puis voit la nouvelle position
+                advanced = UploadSession.objects.filter(
+                    id=session.id, status=UploadSession.OPEN, received=offset,
+                ).update(received=F('received') + written, updated_at=timezone.now())
+                if not advanced:
+                    raise UploadConflict('Envoi concurrent à la même position')
+                with open(part_path(session), 'r+b') as fp:
+                    fp.seek(offset)
+                    shutil.copyfileobj(chunk, fp, BLOCK_SIZE)
+            session.received = offset + written
+    if interrupted is not None or written < length:
+        raise UploadInterrupted(f'Morceau interrompu après {written} octet(s)')
+    return session.received
+
+
+def complete(session):
+    """Met la session en file de finalisation, si tous les octets sont reçus."""
+    marked = UploadSession.objects.filter(
+        id=session.id, status=UploadSession.OPEN, received=session.size,
+    ).update(status=UploadSession.COMPLETE, updated_at=timezone.now())
+    if not marked:
+        session.refresh_from_db()
+        if session.status != UploadSession.OPEN:
+            raise UploadConflict('Envoi déjà terminé')
+        raise UploadConflict(f'Fichier incomplet : {session.received} / {session.size} octets')
+    session.status = UploadSession.COMPLETE
+
+
+def claim_next():
+    """Réserve la prochaine session à finaliser (même principe que claim_next_job)."""
+    while True:
+        session = (
+            UploadSession.objects.filter(status=UploadSession.COMPLETE)
+            .order_by('updated_at').first()
+        )
+        if session is None:
+            return None
+        claimed = UploadSession.objects.filter(id=session.id, status=UploadSession.COMPLETE).update(
+            status=UploadSession.PROCESSING, updated_at=timezone.now(),
+        )
+        if claimed:
+            session.status = UploadSession.PROCESSING
+            return session
+
+
+def finalize(session):
+    """Valide le fichier assemblé, le range dans le stockage et le met en file de tagging."""
+    path = part_path(session)
+    try:
+        with open(path, 'rb') as fp:
+            uploaded_file = _AssembledFile(fp, name=session.filename)
+            validate_image(uploaded_file, max_bytes=max_bytes())
+            image = save_upload(uploaded_file, event=session.event, review=session.review)
+    except (OSError, ValidationError) as exc:
+        session.status = UploadSession.FAILED
+        session.error = exc.messages[0] if isinstance(exc, ValidationError) else str(exc)
+    else:
+        session.status = UploadSession.DONE
+        session.image = image
+    finally:
+        # Reste du fichier si le contenu existait déjà (TAG_CACHE_SHARE_FILES) ou en cas d'échec
+        if os.path.exists(path):
+            os.remove(path)
+    session.save(update_fields=['status', 'error', 'image', 'updated_at'])
+    return session
+
+
+def finalize_pending(limit=10):
+    sessions = []
+    while len(sessions) < limit:
+        session = claim_next()
+        if session is None:
+            break
+        sessions.append(finalize(session))
+    return sessions
+
+
+def purge_stale(max_age=None, processing_after=timedelta(minutes=10)):
+    """Supprime les envois abandonnés et remet en file les finalisations interrompues.
+
+    Renvoie (sessions supprimées, sessions remises en file).
+    """
+    if max_age is None:
+        max_age = timedelta(hours=getattr(settings, 'CHUNKED_UPLOAD_EXPIRY_HOURS', 24))
+    now = timezone.now()
+    requeued = UploadSession.objects.filter(
+        status=UploadSession.PROCESSING, updated_at__lt=now - processing_after,
+    ).update(status=UploadSession.COMPLETE, updated_at=now)
+    stale = UploadSession.objects.filter(updated_at__lt=now - max_age).exclude(status=UploadSession.PROCESSING)
+    deleted = 0
+    for session in stale.iterator():
+        if os.path.exists(part_path(session)):
+            os.remove(part_path(session))
+        session.delete()
+        deleted += 1
+    return deleted, requeued
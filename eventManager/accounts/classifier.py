@@ -0,0 +1,64 @@
+import threading
+
+from django.conf import settings
+
+_lock = threading.Lock()
+_classifier = None
+
+
+class Classifier:
+    """Modèle de classification d'images chargé une seule fois par processus."""
+
+    def __init__(self):
+        # torch/torchvision ne sont importés qu'au premier besoin : les commandes
+        # qui ne taguent pas d'images (migrate, check, runserver...) n'en paient pas le coût.
+        from torchvision import models
+
+        from .inference import BatchEngine, build_backend
+
+        weights = models.EfficientNet_B3_Weights.IMAGENET1K_V1
+        model = models.efficientnet_b3(weights=weights)
+        model.eval()
+        self.labels = weights.meta["categories"]
+        self.transform = weights.transforms()
+        self.backend_name = getattr(settings, 'TAGGER_BACKEND', 'eager')
+        self.model = build_backend(
+            self.backend_name,
+            model,
+            input_size=self.transform.crop_size[0],
+            onnx_path=getattr(settings, 'TAGGER_ONNX_PATH', None),
+        )
+        self.version = model_version()
+        self.engine = BatchEngine(
+            self.model,
+            self.transform,
+            self.labels,
+            max_batch_size=getattr(settings, 'TAGGER_MAX_BATCH_SIZE', 32),
+        )
+
+
+def model_version():
+    # Connu sans charger le modèle, pour interroger le cache de tags depuis les vues
+    return f"efficientnet_b3/{getattr(settings, 'TAGGER_BACKEND', 'eager')}"
+
+
+def get_classifier():
+    global _classifier
+    if _classifier is None:
+        with _lock:
+            if _classifier is None:
+                _classifier = Classifier()
+    return _classifier
+
+
+def is_loaded():
+    return _classifier is not None
+
+
+def warm_model():
+    # Charge le modèle et fait une passe à vide pour initialiser les noyaux CPU
+    from PIL import Image as PILImage
+
+    classifier = get_classifier()
+    classifier.engine.predict_batch([PILImage.new('RGB', (300, 300))])
+    return classifier
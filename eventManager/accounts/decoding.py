@@ -0,0 +1,19 @@
+"""Décodage des images pour le classifieur.
+
+Module sans dépendance à Django : `decode_bytes` peut tourner dans un pool
+de processus (retag_images) sans configurer Django dans les processus fils.
+"""
+import io
+
+from PIL import Image as PILImage
+
+
+def decode(fp, size):
+    # draft() laisse le décodeur JPEG réduire l'image à la taille utile au modèle
+    pil_img = PILImage.open(fp)
+    pil_img.draft('RGB', (size, size))
+    return pil_img.convert('RGB')
+
+
+def decode_bytes(data, size):
+    return decode(io.BytesIO(data), size)
@@ -0,0 +1,194 @@
+import csv
+import json
+import os
+
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import caching, feeds, search
+from .models import Categories, Events
+from .uploads import save_upload, validate_image
+
+FORMATS = ('csv', 'jsonl')
+EXPORT_FIELDS = ['id', 'title', 'category', 'date', 'location', 'places', 'places_left',
+                 'review_count', 'avg_rating']
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.images = 0
+        self.errors = []  # (numéro de ligne, message)
+
+
+def guess_format(path, default='csv'):
+    extension = os.path.splitext(path)[1].lstrip('.').lower()
+    if extension in ('jsonl', 'ndjson'):
+        return 'jsonl'
+    if extension == 'csv':
+        return 'csv'
+    return default
+
+
+def read_rows(fp, fmt):
+    """Lignes d'un fichier texte ouvert, une à une : (numéro de ligne, dict)."""
+    if fmt == 'csv':
+        reader = csv.DictReader(fp)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'jsonl':
+        for line_num, line in enumerate(fp, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_num, json.loads(line)
+            except ValueError:
+                # Signalée par import_events, sans interrompre la lecture
+                yield line_num, None
+    else:
+        raise ValueError(f'Format inconnu : {fmt!r} (choix : {", ".join(FORMATS)})')
+
+
+class _CategoryCache:
+    # Une requête par nom de catégorie pour tout l'import
+    def __init__(self):
+        self._ids = dict(Categories.objects.values_list('name', 'id'))
+
+    def get(self, name):
+        if name not in self._ids:
+            self._ids[name] = Categories.objects.get_or_create(name=name)[0].id
+        return self._ids[name]
+
+
+def _text(row, name):
+    # JSONL : une valeur peut être un nombre, une liste... refusée pour cette ligne seulement
+    value = row.get(name)
+    if value is None:
+        return ''
+    if not isinstance(value, str):
+        raise ValidationError(f'{name} doit être du texte : {value!r}')
+    return value
+
+
+def _event_from_row(row, categories, created_by):
+    if not isinstance(row, dict):
+        raise ValidationError('ligne illisible')
+    title = _text(row, 'title').strip()
+    category = _text(row, 'category').strip()
+    if not title or not category:
+        raise ValidationError('title et category sont obligatoires')
+    date = parse_datetime(str(row.get('date') or ''))
+    if date is None:
+        raise ValidationError(f"date invalide : {row.get('date')!r}")
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    try:
+        places = int(row.get('places') or 0)
+    except (TypeError, ValueError):
+        raise ValidationError(f"places invalide : {row.get('places')!r}")
+    if places < 0:
+        raise ValidationError('places doit être positif')
+    return Events(
+        title=title[:100],
+        category_id=categories.get(category[:50]),
+        date=date,
+        location=_text(row, 'location')[:200],
+        places=places,
+        places_left=places,
+        created_by=created_by,
+    )
+
+
+def import_events(rows, created_by, batch_size=1000, images_dir=None):
+    """Crée les événements de `rows` par lots de `batch_size`, un lot par transaction.
+
+    Les lignes invalides sont ignorées et listées dans le résultat. Avec
+    `images_dir`, la colonne "image" (chemin relatif à ce dossier) est
+    enregistrée et mise en file de tagging.
+    """
+    result = ImportResult()
+    categories = _CategoryCache()
+    batch = []
+    for line_num, row in rows:
+        try:
+            batch.append((_event_from_row(row, categories, created_by), _text(row, 'image')))
+        except ValidationError as exc:
+            result.errors.append((line_num, exc.messages[0]))
+            continue
+        if len(batch) >= batch_size:
+            _save_batch(batch, images_dir, result)
+            batch = []
+    if batch:
+        _save_batch(batch, images_dir, result)
+    if result.created:
+        caching.invalidate_lists()
+    return result
+
+
+def _save_batch(batch, images_dir, result):
+    with transaction.atomic():
+        events = Events.objects.bulk_create([event for event, _ in batch])
+        # bulk_create ne déclenche pas les signaux d'indexation ni de flux
+        search.index_bulk(events)
+        feeds.add_events(events)
+        result.created += len(events)
+    if images_dir:
+        for event, image_path in batch:
+            if image_path and _import_image(event, os.path.join(images_dir, image_path), result):
+                result.images += 1
+
+
+def _import_image(event, path, result):
+    try:
+        with open(path, 'rb') as fp:
+            uploaded_file = File(fp, name=os.path.basename(path))
+            validate_image(uploaded_file)
+            save_upload(uploaded_file, event=event)
+    except (OSError, ValidationError) as exc:
+        message = exc.messages[0] if isinstance(exc, ValidationError) else str(exc)
+        result.errors.append((None, f'image {path} : {message}'))
+        return False
+    return True
+
+
+def export_rows(queryset, chunk_size=2000):
+    """Dicts des événements de `queryset`, lus par paquets (mémoire constante)."""
+    events = queryset.select_related('category').order_by('id').only(
+        'id', 'title', 'category__name', 'date', 'location', 'places', 'places_left',
+        'review_count', 'avg_rating',
+    )
+    for event in events.iterator(chunk_size=chunk_size):
+        yield {
+            'id': event.id,
+            'title': event.title,
+            'category': event.category.name,
+            'date': event.date.isoformat(),
+            'location': event.location,
+            'places': event.places,
+            'places_left': event.places_left,
+            'review_count': event.review_count,
+            'avg_rating': round(event.avg_rating, 2),
+        }
+
+
+class _Echo:
+    # Tampon factice : csv.writer renvoie directement la ligne formatée
+    def write(self, value):
+        return value
+
+
+def serialize(rows, fmt):
+    """Lignes texte prêtes à écrire ou à envoyer en streaming."""
+    if fmt == 'csv':
+        writer = csv.DictWriter(_Echo(), fieldnames=EXPORT_FIELDS)
+        yield writer.writeheader()
+        for row in rows:
+            yield writer.writerow(row)
+    elif fmt == 'jsonl':
+        for row in rows:
+            yield json.dumps(row, ensure_ascii=False) + '\n'
+    else:
+        raise ValueError(f'Format inconnu : {fmt!r} (choix : {", ".join(FORMATS)})')
@@ -0,0 +1,57 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from . import metrics
+
+
+class ExecutorBusy(Exception):
+    pass
+
+
+_lock = threading.Lock()
+_executor = None
+_slots = None
+
+
+def _get_executor():
+    global _executor, _slots
+    with _lock:
+        if _executor is None:
+            workers = getattr(settings, 'UPLOAD_EXECUTOR_WORKERS', 4)
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='upload')
+            # Tâches en cours + en attente : au-delà, on refuse plutôt que
+            # d'empiler des uploads (et leurs fichiers temporaires) en mémoire
+            _slots = threading.BoundedSemaphore(workers + getattr(settings, 'UPLOAD_EXECUTOR_MAX_PENDING', 16))
+        return _executor, _slots
+
+
+def _run(timing, fn, args, kwargs):
+    # Le contexte n'est pas copié (les connexions Django en dépendent) : seule
+    # la mesure de la requête suit la tâche
+    try:
+        if timing is None:
+            return fn(*args, **kwargs)
+        with metrics.track_request(timing):
+            return fn(*args, **kwargs)
+    finally:
+        # Ces threads ne voient pas passer request_finished
+        close_old_connections()
+
+
+async def run_bounded(fn, *args, **kwargs):
+    """Exécute `fn` (bloquante : décodage, hachage, stockage) hors de la boucle d'événements.
+
+    Le pool est partagé et borné (UPLOAD_EXECUTOR_WORKERS) ; lève ExecutorBusy
+    s'il est saturé.
+    """
+    executor, slots = _get_executor()
+    if not slots.acquire(blocking=False):
+        raise ExecutorBusy('Trop de traitements en cours, réessayez plus tard.')
+    try:
+        return await asyncio.get_running_loop().run_in_executor(executor, _run, metrics.current(), fn, args, kwargs)
+    finally:
+        slots.release()
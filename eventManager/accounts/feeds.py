@@ -0,0 +1,110 @@
+"""Flux d'événements à venir, matérialisés dans FeedEntry.
+
+Chaque événement à venir a une ligne dans le flux « upcoming », dans celui
+de sa catégorie et dans celui de chacun de ses tags. Les lignes sont
+réécrites à chaque modification de l'événement ou de ses tags (signaux,
+ou appel explicite après une insertion en masse) ; celles des événements
+passés sont ignorées à la lecture et purgées par `rebuild_feeds`.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Events, FeedEntry, ImageTag
+
+UPCOMING = FeedEntry.UPCOMING
+
+
+def category_feed(category_id):
+    return f'category:{category_id}'
+
+
+def tag_feed(tag_id):
+    return f'tag:{tag_id}'
+
+
+def _tag_filter():
+    # Tags manuels (sans confiance) ou détectés avec assez de confiance
+    min_confidence = getattr(settings, 'FEED_TAG_MIN_CONFIDENCE', 0.3)
+    return Q(confidence__isnull=True) | Q(confidence__gte=min_confidence)
+
+
+def _entries(events, now):
+    """Lignes de flux des événements à venir parmi `events`."""
+    events = [event for event in events if event.date >= now]
+    tags = {}
+    for event_id, tag_id in (
+        ImageTag.objects.filter(_tag_filter(), image__event__in=[event.id for event in events])
+        .values_list('image__event_id', 'tag_id').distinct()
+    ):
+        tags.setdefault(event_id, []).append(tag_id)
+    entries = []
+    for event in events:
+        feeds = [UPCOMING, category_feed(event.category_id)]
+        feeds += [tag_feed(tag_id) for tag_id in tags.get(event.id, [])]
+        entries += [
+            FeedEntry(feed=feed, date=event.date, event_id=event.id, title=event.title,
+                      location=event.location, category_id=event.category_id)
+            for feed in feeds
+        ]
+    return entries
+
+
+def _columns():
+    return Events.objects.only('id', 'title', 'date', 'location', 'category_id')
+
+
+def refresh_events(event_ids):
+    """Réécrit les lignes de flux des événements `event_ids` (supprimés compris)."""
+    event_ids = list(event_ids)
+    if not event_ids:
+        return
+    with transaction.atomic():
+        FeedEntry.objects.filter(event__in=event_ids).delete()
+        FeedEntry.objects.bulk_create(_entries(_columns().filter(id__in=event_ids), timezone.now()))
+
+
+def add_events(events):
+    """Lignes de flux de nouveaux événements, après un bulk_create (sans signal)."""
+    now = timezone.now()
+    for start in range(0, len(events), 1000):
+        FeedEntry.objects.bulk_create(_entries(events[start:start + 1000], now))
+
+
+def refresh_images(image_ids):
+    """Après un changement de tags sur les images `image_ids`."""
+    refresh_events(
+        Events.objects.filter(images__in=image_ids).values_list('id', flat=True).distinct()
+    )
+
+
+def rebuild(chunk_size=2000):
+    """Reconstruit tous les flux à partir des événements à venir.
+
+    Une seule transaction : les lecteurs voient les anciens flux jusqu'à la
+    fin. Renvoie le nombre de lignes écrites.
+    """
+    now = timezone.now()
+    written = 0
+    with transaction.atomic():
+        FeedEntry.objects.all().delete()
+        events = _columns().filter(date__gte=now).order_by('id')
+        last_id = 0
+        while True:
+            chunk = list(events.filter(id__gt=last_id)[:chunk_size])
+            if not chunk:
+                return written
+            written += len(FeedEntry.objects.bulk_create(_entries(chunk, now)))
+            last_id = chunk[-1].id
+
+
+def purge_past(now=None):
+    """Supprime les lignes des événements passés ; renvoie leur nombre."""
+    deleted, _ = FeedEntry.objects.filter(date__lt=now or timezone.now()).delete()
+    return deleted
+
+
+def upcoming(feed=UPCOMING, now=None):
+    """Lignes à venir d'un flux, dans l'ordre de la clé primaire (date, événement)."""
+    return FeedEntry.objects.filter(feed=feed, date__gte=now or timezone.now()).order_by('date', 'event_id')
@@ -0,0 +1,119 @@
+import os
+
+import torch
+
+
+class BatchEngine:
+    """Fait passer une liste d'images dans le modèle, par lots de `max_batch_size`.
+
+    Chaque image donne ses `topk` meilleurs labels avec leur probabilité :
+    [(label, confiance), ...]. Le regroupement des images en lots est fait
+    en amont, par tagging.claim_jobs (jobs de la file) ou retag_chunk.
+    """
+
+    def __init__(self, model, transform, labels, max_batch_size=32, topk=5):
+        self.model = model
+        self.transform = transform
+        self.labels = labels
+        self.max_batch_size = max_batch_size
+        self.topk = topk
+
+    def predict_batch(self, pil_images):
+        results = []
+        for start in range(0, len(pil_images), self.max_batch_size):
+            chunk = pil_images[start:start + self.max_batch_size]
+            input_tensor = torch.stack([self.transform(img) for img in chunk])
+
+            with torch.no_grad():
+                outputs = self.model(input_tensor)
+                scores, indices = outputs.softmax(dim=1).topk(self.topk)
+
+            for row_scores, row in zip(scores.tolist(), indices.tolist()):
+                results.append([(self.labels[idx], score) for idx, score in zip(row, row_scores)])
+        return results
+
+
+class EagerBackend:
+    """Modèle PyTorch fp32 tel quel."""
+
+    name = 'eager'
+
+    def __init__(self, model):
+        self.model = model
+
+    def __call__(self, input_tensor):
+        return self.model(input_tensor)
+
+
+class TorchScriptBackend(EagerBackend):
+    """Modèle tracé puis figé avec TorchScript (fusion des opérations)."""
+
+    name = 'torchscript'
+
+    def __init__(self, model, input_size):
+        example = torch.zeros(1, 3, input_size, input_size)
+        with torch.no_grad():
+            traced = torch.jit.trace(model, example)
+        super().__init__(torch.jit.optimize_for_inference(torch.jit.freeze(traced)))
+
+
+class CompiledBackend(EagerBackend):
+    """Modèle optimisé par `torch.compile` (compilé au premier appel)."""
+
+    name = 'compile'
+
+    def __init__(self, model):
+        super().__init__(torch.compile(model))
+
+
+class QuantizedBackend(EagerBackend):
+    """Quantification dynamique int8 des couches linéaires."""
+
+    name = 'quantized'
+
+    def __init__(self, model):
+        super().__init__(torch.ao.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8,
+        ))
+
+
+class OnnxBackend:
+    """Export ONNX exécuté par ONNX Runtime (dépendance optionnelle `onnxruntime`)."""
+
+    name = 'onnx'
+
+    def __init__(self, model, input_size, onnx_path):
+        import onnxruntime
+
+        if not os.path.exists(onnx_path):
+            os.makedirs(os.path.dirname(onnx_path), exist_ok=True)
+            torch.onnx.export(
+                model,
+                torch.zeros(1, 3, input_size, input_size),
+                onnx_path,
+                input_names=['input'],
+                output_names=['logits'],
+                dynamic_axes={'input': {0: 'batch'}, 'logits': {0: 'batch'}},
+            )
+        self.session = onnxruntime.InferenceSession(onnx_path, providers=['CPUExecutionProvider'])
+
+    def __call__(self, input_tensor):
+        (logits,) = self.session.run(None, {'input': input_tensor.numpy()})
+        return torch.from_numpy(logits)
+
+
+BACKENDS = ['eager', 'torchscript', 'compile', 'quantized', 'onnx']
+
+
+def build_backend(name, model, input_size, onnx_path=None):
+    if name == 'eager':
+        return EagerBackend(model)
+    if name == 'torchscript':
+        return TorchScriptBackend(model, input_size)
+    if name == 'compile':
+        return CompiledBackend(model)
+    if name == 'quantized':
+        return QuantizedBackend(model)
+    if name == 'onnx':
+        return OnnxBackend(model, input_size, onnx_path)
+    raise ValueError(f'Backend de tagging inconnu : {name!r} (choix : {", ".join(BACKENDS)})')
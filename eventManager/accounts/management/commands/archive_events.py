@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from accounts.archive import archivable, archive_events
+
+
+class Command(BaseCommand):
+    help = ("Archive les événements passés (avis, réponses, images comprises) et déplace "
+            "leurs images vers le stockage froid ; à planifier (cron)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', help='Date limite (AAAA-MM-JJ) ; par défaut ARCHIVE_AFTER_DAYS jours avant aujourd\'hui')
+        parser.add_argument('--chunk-size', type=int, default=200, help='Événements par transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Compte les événements concernés sans rien archiver')
+
+    def handle(self, *args, **options):
+        if options['before']:
+            day = parse_date(options['before'])
+            if day is None:
+                raise CommandError(f"Date invalide : {options['before']}")
+            cutoff = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+        else:
+            cutoff = timezone.now() - timedelta(days=getattr(settings, 'ARCHIVE_AFTER_DAYS', 365))
+
+        if options['dry_run']:
+            self.stdout.write(f'{archivable(cutoff).count()} événement(s) antérieur(s) au {cutoff:%Y-%m-%d}')
+            return
+
+        def progress(result):
+            self.stdout.write(f'{result.events} événement(s) archivé(s)...')
+
+        result = archive_events(cutoff, chunk_size=options['chunk_size'],
+                                progress=progress if options['verbosity'] > 1 else None)
+        self.stdout.write(self.style.SUCCESS(
+            f'{result.events} événement(s) archivé(s) ({result.reviews} avis, {result.answers} réponses, '
+            f'{result.images} images, {result.files_moved} fichier(s) déplacé(s) vers le stockage froid)'
+        ))
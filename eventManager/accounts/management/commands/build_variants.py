@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from accounts.models import Image
+from accounts.variants import generate_variants
+
+
+class Command(BaseCommand):
+    help = "Génère les miniatures (WebP/AVIF) des images existantes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help="Régénère aussi les images qui ont déjà des variantes")
+        parser.add_argument('--chunk-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        images = Image.objects.exclude(image='').exclude(image__isnull=True)
+        if not options['force']:
+            images = images.annotate(variant_count=Count('variants')).filter(variant_count=0)
+
+        done = failed = 0
+        for image_obj in images.order_by('id').iterator(chunk_size=options['chunk_size']):
+            try:
+                generate_variants(image_obj, force=options['force'])
+                done += 1
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f'Image #{image_obj.id} : {exc!r}')
+        self.stdout.write(self.style.SUCCESS(f'{done} image(s) traitée(s), {failed} échec(s)'))
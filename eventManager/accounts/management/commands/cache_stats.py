@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from accounts.caching import hit_ratios, reset_stats
+
+
+class Command(BaseCommand):
+    help = 'Affiche le taux de succès du cache des pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Remet les compteurs à zéro après affichage')
+
+    def handle(self, *args, **options):
+        for namespace, counts in hit_ratios().items():
+            self.stdout.write(
+                f"{namespace:<15} {counts['hits']:>8} succès {counts['misses']:>8} échecs "
+                f"{counts['ratio']:>7.1%}"
+            )
+        if options['reset']:
+            reset_stats()
+            self.stdout.write(self.style.SUCCESS('Compteurs remis à zéro'))
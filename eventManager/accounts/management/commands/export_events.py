@@ -0,0 +1,30 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from accounts.event_io import FORMATS, export_rows, guess_format, serialize
+from accounts.models import Events
+
+
+class Command(BaseCommand):
+    help = "Exporte les événements en CSV ou JSONL (lecture par paquets, mémoire constante)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='-', help='Fichier de sortie ("-" pour la sortie standard)')
+        parser.add_argument('--format', choices=FORMATS, help="Déduit de l'extension par défaut (csv)")
+        parser.add_argument('--category', help='Nom de catégorie')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        events = Events.objects.all()
+        if options['category']:
+            events = events.filter(category__name=options['category'])
+
+        path = options['output']
+        fmt = options['format'] or guess_format(path)
+        fp = sys.stdout if path == '-' else open(path, 'w', newline='', encoding='utf-8')
+        try:
+            fp.writelines(serialize(export_rows(events, chunk_size=options['chunk_size']), fmt))
+        finally:
+            if fp is not sys.stdout:
+                fp.close()
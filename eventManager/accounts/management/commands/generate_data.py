@@ -0,0 +1,151 @@
+import hashlib
+import io
+import random
+from datetime import timedelta
+
+from PIL import Image as PILImage
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from accounts import feeds, search
+from accounts.models import Answers, Categories, EventReviews, Events, Image
+
+CATEGORIES = ['Conférence', 'Atelier', 'Concert', 'Exposition', 'Sport', 'Meetup', 'Festival', 'Théâtre']
+CITIES = ['Paris', 'Lyon', 'Marseille', 'Toulouse', 'Nantes', 'Lille', 'Bordeaux', 'Strasbourg']
+WORDS = [
+    'super', 'ambiance', 'organisation', 'intervenants', 'salle', 'accueil', 'musique', 'public',
+    'retard', 'excellent', 'décevant', 'programme', 'pause', 'café', 'présentation', 'atelier',
+]
+COLORS = ['red', 'green', 'blue', 'orange', 'purple', 'teal', 'gray', 'navy']
+
+
+class Command(BaseCommand):
+    help = "Génère un jeu de données volumineux et reproductible (insertions en masse)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--events', type=int, default=1000)
+        parser.add_argument('--reviews', type=int, default=10, help='Avis par événement (moyenne)')
+        parser.add_argument('--answers', type=int, default=1, help='Réponses par avis (moyenne)')
+        parser.add_argument('--images', type=int, default=1, help='Images par événement')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        # Dates relatives au jour courant, décalages tirés de la graine
+        today = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+        with transaction.atomic():
+            users = self._users(options['users'], options['seed'], batch_size)
+            categories = [Categories.objects.get_or_create(name=name)[0] for name in CATEGORIES]
+
+            events = Events.objects.bulk_create(
+                (
+                    self._event(i, rng, today, categories, users, options['reviews'])
+                    for i in range(options['events'])
+                ),
+                batch_size=batch_size,
+            )
+            reviews = self._reviews(events, users, rng, options['answers'], batch_size)
+            answers = self._answers(reviews, users, rng, batch_size)
+            images = self._images(events, options['images'], batch_size)
+
+            # bulk_create ne passe pas par les signaux : index de recherche à la main
+            search.index_bulk(events, batch_size=batch_size)
+            search.index_bulk(reviews, batch_size=batch_size)
+            search.index_bulk(answers, batch_size=batch_size)
+            feeds.add_events(events)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(users)} utilisateurs, {len(events)} événements, {len(reviews)} avis, '
+            f'{len(answers)} réponses, {len(images)} images'
+        ))
+
+    def _users(self, count, seed, batch_size):
+        # Un seul hachage pour tous : le mot de passe est "bench"
+        password = make_password('bench')
+        usernames = [f'user{seed}_{i}' for i in range(count)]
+        # Relancée avec la même graine, la commande réutilise les comptes déjà
+        # créés ; ignore_conflicts ne renvoie pas les clés : relecture par nom
+        User.objects.bulk_create(
+            (User(username=username, email=f'{username}@example.com', password=password)
+             for username in usernames),
+            batch_size=batch_size,
+            ignore_conflicts=True,
+        )
+        by_name = {}
+        for start in range(0, count, batch_size):
+            names = usernames[start:start + batch_size]
+            by_name.update((user.username, user) for user in User.objects.filter(username__in=names))
+        return [by_name[username] for username in usernames]
+
+    def _event(self, i, rng, today, categories, users, reviews_per_event):
+        # Les notes sont tirées avant l'insertion pour écrire les agrégats
+        # (accounts.aggregates) directement avec l'événement
+        ratings = [rng.randint(1, 5) for _ in range(rng.randint(0, reviews_per_event * 2))]
+        places = rng.choice([20, 50, 100, 200, 500])
+        event = Events(
+            title=f'{rng.choice(CATEGORIES)} {rng.choice(WORDS)} {i}',
+            category=rng.choice(categories),
+            date=today + timedelta(minutes=rng.randrange(-60 * 24 * 90, 60 * 24 * 365)),
+            location=rng.choice(CITIES),
+            places=places,
+            places_left=places,
+            created_by=rng.choice(users),
+            review_count=len(ratings),
+            rating_sum=sum(ratings),
+            avg_rating=sum(ratings) / len(ratings) if ratings else 0,
+        )
+        event.ratings = ratings
+        return event
+
+    def _reviews(self, events, users, rng, answers_per_review, batch_size):
+        reviews = []
+        for event in events:
+            for rating in event.ratings:
+                reviews.append(EventReviews(
+                    event=event,
+                    created_by=rng.choice(users),
+                    review_text=' '.join(rng.choices(WORDS, k=rng.randint(5, 30))),
+                    rating=rating,
+                    answer_count=rng.randint(0, answers_per_review * 2),
+                ))
+        return EventReviews.objects.bulk_create(reviews, batch_size=batch_size)
+
+    def _answers(self, reviews, users, rng, batch_size):
+        answers = (
+            Answers(
+                review=review,
+                created_by=rng.choice(users),
+                answer_text=' '.join(rng.choices(WORDS, k=rng.randint(3, 15))),
+            )
+            for review in reviews
+            for _ in range(review.answer_count)
+        )
+        return Answers.objects.bulk_create(answers, batch_size=batch_size)
+
+    def _images(self, events, per_event, batch_size):
+        if not per_event:
+            return []
+        # Quelques fichiers partagés : le volume stocké reste constant
+        files = []
+        for color in COLORS:
+            buffer = io.BytesIO()
+            PILImage.new('RGB', (640, 480), color).save(buffer, 'JPEG')
+            content = buffer.getvalue()
+            name = default_storage.save(f'events/generated_{color}.jpg', ContentFile(content))
+            files.append((name, hashlib.sha256(content).hexdigest()))
+
+        images = []
+        for i, event in enumerate(events):
+            for j in range(per_event):
+                name, content_hash = files[(i + j) % len(files)]
+                images.append(Image(event=event, image=name, content_hash=content_hash))
+        return Image.objects.bulk_create(images, batch_size=batch_size)
@@ -0,0 +1,46 @@
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.event_io import FORMATS, guess_format, import_events, read_rows
+
+
+class Command(BaseCommand):
+    help = "Importe des événements depuis un fichier CSV ou JSONL (lecture en flux, insertions par lots)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Fichier à importer ("-" pour l\'entrée standard)')
+        parser.add_argument('--user', required=True, help='Créateur des événements importés')
+        parser.add_argument('--format', choices=FORMATS, help='Déduit de l\'extension par défaut')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--images-dir',
+                            help='Dossier des images de la colonne "image" (mises en file de tagging)')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"Utilisateur inconnu : {options['user']}")
+
+        path = options['path']
+        fmt = options['format'] or guess_format(path)
+        fp = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        try:
+            result = import_events(
+                read_rows(fp, fmt), user,
+                batch_size=options['batch_size'],
+                images_dir=options['images_dir'],
+            )
+        finally:
+            if fp is not sys.stdin:
+                fp.close()
+
+        for line_num, message in result.errors[:50]:
+            self.stderr.write(f'ligne {line_num} : {message}' if line_num else message)
+        if len(result.errors) > 50:
+            self.stderr.write(f'... et {len(result.errors) - 50} autre(s) erreur(s)')
+        self.stdout.write(self.style.SUCCESS(
+            f'{result.created} événement(s) importé(s), {result.images} image(s) en file, '
+            f'{len(result.errors)} erreur(s)'
+        ))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from accounts import caching, feeds
+
+
+class Command(BaseCommand):
+    help = ("Reconstruit les flux d'événements à venir (général, par catégorie, par tag) ; "
+            "à planifier (cron), par exemple chaque nuit")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--purge-only', action='store_true',
+                            help='Supprime seulement les lignes des événements passés')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Événements lus par requête')
+
+    def handle(self, *args, **options):
+        if options['purge_only']:
+            deleted = feeds.purge_past()
+            self.stdout.write(self.style.SUCCESS(f'{deleted} ligne(s) de flux passée(s) supprimée(s)'))
+            return
+        written = feeds.rebuild(chunk_size=options['chunk_size'])
+        caching.invalidate_lists()
+        self.stdout.write(self.style.SUCCESS(f'{written} ligne(s) de flux écrite(s)'))
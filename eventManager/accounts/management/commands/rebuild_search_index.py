@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import Answers, EventReviews, Events, SearchDocument
+from accounts.search import index_bulk
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index de recherche des événements, avis et réponses"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        sources = [
+            ('événements', Events.objects.only('id', 'title', 'location')),
+            ('avis', EventReviews.objects.only('id', 'event_id', 'review_text')),
+            ('réponses', Answers.objects.select_related('review').only('id', 'answer_text', 'review__event_id')),
+        ]
+        # Une seule transaction : la recherche sert l'ancien index jusqu'à la
+        # fin, et une reconstruction interrompue ne laisse pas d'index partiel
+        with transaction.atomic():
+            SearchDocument.objects.all().delete()
+            for label, queryset in sources:
+                count = 0
+                chunk = []
+                for obj in queryset.order_by('id').iterator(chunk_size=chunk_size):
+                    chunk.append(obj)
+                    if len(chunk) >= chunk_size:
+                        count += self._flush(chunk)
+                count += self._flush(chunk)
+                self.stdout.write(f'{count} {label} indexé(e)s')
+        self.stdout.write(self.style.SUCCESS('Index de recherche reconstruit'))
+
+    def _flush(self, chunk):
+        count = len(chunk)
+        if count:
+            index_bulk(chunk)
+            chunk.clear()
+        return count
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from accounts.aggregates import recompute
+
+
+class Command(BaseCommand):
+    help = "Recalcule les compteurs d'avis et de réponses et corrige les écarts"
+
+    def handle(self, *args, **options):
+        events, reviews = recompute()
+        self.stdout.write(self.style.SUCCESS(
+            f'{events} événement(s) et {reviews} avis corrigé(s)'
+        ))
@@ -0,0 +1,86 @@
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from accounts.classifier import model_version, warm_model
+from accounts.retag import Checkpoint, retag_images, select_images
+
+
+class Command(BaseCommand):
+    help = ("Re-tague les images existantes avec le modèle courant (après un changement de "
+            "modèle) ; reprend là où une exécution interrompue s'est arrêtée")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from-version', help='Seulement les images taguées par cette version du modèle')
+        parser.add_argument('--stale', action='store_true',
+                            help='Seulement les images sans tag de la version courante')
+        parser.add_argument('--tagged-before', help="Seulement les images non taguées depuis cette date (AAAA-MM-JJ)")
+        parser.add_argument('--chunk-size', type=int, default=500, help='Images par lot (et par transaction)')
+        parser.add_argument('--batch-size', type=int,
+                            default=getattr(settings, 'TAGGER_MAX_BATCH_SIZE', 32),
+                            help="Nombre maximum d'images par passe du modèle")
+        parser.add_argument('--workers', type=int, help='Processus de décodage (0 : aucun ; par défaut : CPU - 1)')
+        parser.add_argument('--max-rate', type=float, help='Images par seconde au maximum')
+        parser.add_argument('--checkpoint', default=getattr(settings, 'RETAG_CHECKPOINT_PATH', 'retag_images.json'),
+                            help='Fichier de reprise')
+        parser.add_argument('--restart', action='store_true', help='Ignore le point de reprise existant')
+        parser.add_argument('--dry-run', action='store_true', help='Compte les images concernées sans rien taguer')
+
+    def handle(self, *args, **options):
+        tagged_before = None
+        if options['tagged_before']:
+            day = parse_date(options['tagged_before'])
+            if day is None:
+                raise CommandError(f"Date invalide : {options['tagged_before']}")
+            tagged_before = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+        images = select_images(options['from_version'], options['stale'], tagged_before)
+
+        # La reprise n'a de sens qu'avec les mêmes filtres et le même modèle
+        checkpoint = Checkpoint(options['checkpoint'], {
+            'from_version': options['from_version'],
+            'stale': options['stale'],
+            'tagged_before': options['tagged_before'],
+            'model_version': model_version(),
+        })
+        after_id = 0
+        if options['restart']:
+            checkpoint.clear()
+        else:
+            try:
+                after_id = checkpoint.load()
+            except ValueError as exc:
+                raise CommandError(f'{exc} (--restart pour repartir de zéro)')
+
+        total = images.filter(id__gt=after_id).count()
+        if options['dry_run']:
+            self.stdout.write(f'{total} image(s) à re-taguer')
+            return
+        if after_id:
+            self.stdout.write(f"Reprise après l'image #{after_id}")
+
+        warm_model()
+
+        def progress(result):
+            checkpoint.save(result.last_id)
+            self.stdout.write(
+                f'{result.images}/{total} image(s), {result.rate:.1f} image(s)/s '
+                f'(dernière : #{result.last_id})'
+            )
+
+        result = retag_images(
+            images,
+            chunk_size=options['chunk_size'],
+            batch_size=options['batch_size'],
+            workers=options['workers'],
+            max_rate=options['max_rate'],
+            after_id=after_id,
+            on_chunk=progress,
+        )
+        checkpoint.clear()
+        self.stdout.write(self.style.SUCCESS(
+            f'{result.images} image(s) re-taguée(s) en {model_version()} : {result.inferred} par le modèle, '
+            f'{result.cached} depuis le cache, {result.failed} échec(s) ; {result.rate:.1f} image(s)/s'
+        ))
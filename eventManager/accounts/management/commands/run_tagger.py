@@ -0,0 +1,64 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from accounts import chunked_uploads, tag_cache
+from accounts.classifier import warm_model
+from accounts.tagging import claim_jobs, requeue_stale_jobs, run_jobs
+
+
+class Command(BaseCommand):
+    help = "Traite la file des jobs de tagging d'images"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help="Attente (s) entre deux sondages quand la file est vide")
+        parser.add_argument('--stale-after', type=int, default=600,
+                            help="Remet en file les jobs en cours depuis plus de N secondes")
+        parser.add_argument('--batch-size', type=int,
+                            default=getattr(settings, 'TAGGER_MAX_BATCH_SIZE', 32),
+                            help="Nombre maximum d'images par passe du modèle")
+        parser.add_argument('--max-wait', type=float,
+                            default=getattr(settings, 'TAGGER_MAX_WAIT', 0.05),
+                            help="Attente maximum (s) pour compléter un lot")
+        parser.add_argument('--once', action='store_true',
+                            help="Vide la file puis s'arrête")
+
+    def handle(self, *args, **options):
+        # Chargé avant le premier job pour ne pas fausser sa latence
+        warm_model()
+
+        requeued = requeue_stale_jobs(timedelta(seconds=options['stale_after']))
+        if requeued:
+            self.stdout.write(f'{requeued} job(s) bloqué(s) remis en file')
+        deleted, requeued = chunked_uploads.purge_stale(processing_after=timedelta(seconds=options['stale_after']))
+        if deleted or requeued:
+            self.stdout.write(f'Envois par morceaux : {deleted} abandonné(s) supprimé(s), {requeued} remis en file')
+
+        while True:
+            # Les envois par morceaux terminés deviennent des images (et des jobs de tagging)
+            for session in chunked_uploads.finalize_pending():
+                if session.status == session.DONE:
+                    self.stdout.write(self.style.SUCCESS(f'Envoi {session.id} : image #{session.image_id}'))
+                else:
+                    self.stderr.write(f'Envoi {session.id} refusé : {session.error}')
+
+            jobs = claim_jobs(options['batch_size'], options['max_wait'])
+            if not jobs:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            for job in run_jobs(jobs):
+                if job.status == job.DONE:
+                    self.stdout.write(self.style.SUCCESS(
+                        f'Job #{job.id} terminé en {job.duration_ms:.0f} ms (lot de {len(jobs)})'
+                    ))
+                else:
+                    self.stderr.write(f'Job #{job.id} ({job.status}) : {job.last_error}')
+            self.stdout.write(
+                'Cache de tags : {hits} hit(s), {misses} miss(es), {evictions} éviction(s)'.format(**tag_cache.stats)
+            )
@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.classifier import warm_model
+
+
+class Command(BaseCommand):
+    help = "Charge le modèle de tagging et fait une inférence à vide"
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        warm_model()
+        self.stdout.write(self.style.SUCCESS(
+            f'Modèle prêt en {time.perf_counter() - start:.1f} s'
+        ))
@@ -0,0 +1,137 @@
+import bisect
+import contextlib
+import heapq
+import threading
+import time
+from contextvars import ContextVar
+
+# Bornes (s) des histogrammes de durée
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_current = ContextVar('request_timing', default=None)
+
+
+class RequestTiming:
+    """Temps d'une requête, réparti par poste (db, template, upload, ...)."""
+
+    def __init__(self, top_queries=5):
+        self.start = time.perf_counter()
+        self.spans = {}
+        self.db_count = 0
+        self.db_time = 0.0
+        self._top_queries = top_queries
+        self._slowest = []  # tas (durée, sql) des requêtes les plus lentes
+
+    def add(self, name, seconds):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def add_query(self, sql, seconds):
+        self.db_count += 1
+        self.db_time += seconds
+        if len(self._slowest) < self._top_queries:
+            heapq.heappush(self._slowest, (seconds, sql))
+        elif seconds > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, (seconds, sql))
+
+    def slowest_queries(self):
+        return sorted(self._slowest, reverse=True)
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+
+def current():
+    return _current.get()
+
+
+@contextlib.contextmanager
+def track_request(timing):
+    token = _current.set(timing)
+    try:
+        yield timing
+    finally:
+        _current.reset(token)
+
+
+@contextlib.contextmanager
+def span(name):
+    """Ajoute la durée du bloc au poste `name` de la requête en cours et à l'histogramme."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        timing = _current.get()
+        if timing is not None:
+            timing.add(name, seconds)
+        registry.observe('span_duration_seconds', seconds, span=name)
+
+
+class Registry:
+    """Compteurs et histogrammes du processus, au format texte Prometheus.
+
+    Chaque processus (worker gunicorn, run_tagger) a son propre registre.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        index = bisect.bisect_left(BUCKETS, seconds)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * (len(BUCKETS) + 1), 0.0, 0]
+            histogram[0][index] += 1
+            histogram[1] += seconds
+            histogram[2] += 1
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self, prefix='eventmanager_'):
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, ([*h[0]], h[1], h[2])) for key, h in self._histograms.items())
+
+        lines = []
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f'# TYPE {prefix}{name} counter')
+                typed.add(name)
+            lines.append(f'{prefix}{name}{_labels(labels)} {value}')
+        for (name, labels), (buckets, total, count) in histograms:
+            if name not in typed:
+                lines.append(f'# TYPE {prefix}{name} histogram')
+                typed.add(name)
+            cumulative = 0
+            for bound, n in zip((*BUCKETS, '+Inf'), buckets):
+                cumulative += n
+                lines.append(f'{prefix}{name}_bucket{_labels(labels + (("le", str(bound)),))} {cumulative}')
+            lines.append(f'{prefix}{name}_sum{_labels(labels)} {total:.6f}')
+            lines.append(f'{prefix}{name}_count{_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    escaped = ','.join(
+        '{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels
+    )
+    return '{' + escaped + '}'
+
+
+registry = Registry()
@@ -0,0 +1,107 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def time_query(execute, sql, params, many, context):
+    timing = metrics.current()
+    if timing is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timing.add_query(sql, time.perf_counter() - start)
+
+
+def install_query_timer(sender=None, connection=None, **kwargs):
+    # Posé sur chaque connexion à sa création (signal connection_created,
+    # voir AccountsConfig.ready) plutôt qu'à chaque requête : sous ASGI,
+    # l'ORM asynchrone utilise la connexion d'un autre thread que la vue. La
+    # requête en cours est retrouvée par contextvar, propagée à ces threads.
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+class PerformanceMiddleware:
+    """Mesure chaque requête : durée totale, requêtes SQL, rendu des templates.
+
+    Les mesures alimentent le registre Prometheus (`/metrics/`), l'en-tête
+    Server-Timing (PERF_SERVER_TIMING) et le journal des requêtes lentes
+    (PERF_SLOW_REQUEST_MS). À placer en tête de MIDDLEWARE.
+
+    Compatible synchrone et asynchrone : sous ASGI, les vues asynchrones ne
+    sont pas renvoyées dans un thread à cause de lui.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        self.server_timing = getattr(settings, 'PERF_SERVER_TIMING', settings.DEBUG)
+        self.slow_request_ms = getattr(settings, 'PERF_SLOW_REQUEST_MS', 500)
+        self.top_queries = getattr(settings, 'PERF_SLOW_TOP_QUERIES', 5)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        timing = metrics.RequestTiming(top_queries=self.top_queries)
+        with metrics.track_request(timing):
+            response = self.get_response(request)
+        return self._finish(request, response, timing)
+
+    async def __acall__(self, request):
+        timing = metrics.RequestTiming(top_queries=self.top_queries)
+        with metrics.track_request(timing):
+            response = await self.get_response(request)
+        return self._finish(request, response, timing)
+
+    def _finish(self, request, response, timing):
+        total = timing.elapsed()
+
+        match = request.resolver_match
+        view = match.view_name if match else '<non résolue>'
+        self._record(view, request.method, response.status_code, total, timing)
+
+        if self.server_timing:
+            response['Server-Timing'] = self._server_timing(total, timing)
+        if total * 1000 >= self.slow_request_ms:
+            self._log_slow(request, view, total, timing)
+        return response
+
+    def _record(self, view, method, status, total, timing):
+        registry = metrics.registry
+        registry.inc('requests_total', view=view, method=method, status=status)
+        registry.observe('request_duration_seconds', total, view=view)
+        registry.inc('db_queries_total', timing.db_count, view=view)
+        registry.inc('db_query_seconds_total', timing.db_time, view=view)
+
+    def _server_timing(self, total, timing):
+        entries = [f'db;dur={timing.db_time * 1000:.1f};desc="{timing.db_count} SQL"']
+        for name, seconds in timing.spans.items():
+            entries.append(f'{name};dur={seconds * 1000:.1f}')
+        entries.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(entries)
+
+    def _log_slow(self, request, view, total, timing):
+        lines = [
+            f'{seconds * 1000:.1f} ms  {sql[:300]}'
+            for seconds, sql in timing.slowest_queries()
+        ]
+        spans = ', '.join(f'{name} {seconds * 1000:.1f} ms' for name, seconds in timing.spans.items())
+        logger.warning(
+            'Requête lente %s %s (%s) : %.0f ms, %d requêtes SQL en %.1f ms%s\n%s',
+            request.method, request.path, view, total * 1000,
+            timing.db_count, timing.db_time * 1000,
+            f', {spans}' if spans else '',
+            '\n'.join(lines),
+        )
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_imagevariant'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='events',
+            index=models.Index(fields=['date', 'id'], name='events_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='events',
+            index=models.Index(fields=['category', 'date', 'id'], name='events_category_date_id_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:44
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, FloatField, OuterRef, Subquery, Sum
+from django.db.models.functions import Cast, Coalesce
+
+
+def fill_aggregates(apps, schema_editor):
+    Events = apps.get_model('accounts', 'Events')
+    EventReviews = apps.get_model('accounts', 'EventReviews')
+    Answers = apps.get_model('accounts', 'Answers')
+
+    reviews = EventReviews.objects.filter(event=OuterRef('pk')).values('event')
+    Events.objects.update(
+        review_count=Coalesce(Subquery(reviews.annotate(n=Count('id')).values('n')), 0),
+        rating_sum=Coalesce(Subquery(reviews.annotate(s=Sum('rating')).values('s')), 0),
+    )
+    Events.objects.filter(review_count__gt=0).update(
+        avg_rating=Cast(F('rating_sum'), FloatField()) / Cast(F('review_count'), FloatField()),
+    )
+    answers = Answers.objects.filter(review=OuterRef('pk')).values('review')
+    EventReviews.objects.update(
+        answer_count=Coalesce(Subquery(answers.annotate(n=Count('id')).values('n')), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_events_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventreviews',
+            name='answer_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='events',
+            name='avg_rating',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='events',
+            name='rating_sum',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='events',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='events',
+            index=models.Index(fields=['avg_rating', 'id'], name='events_avg_rating_idx'),
+        ),
+        migrations.RunPython(fill_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:45
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_tags(apps, schema_editor):
+    # Avant la contrainte unique : on garde le plus ancien tag de chaque nom et
+    # on lui rattache les images de ses doublons.
+    Tags = apps.get_model('accounts', 'Tags')
+    Through = apps.get_model('accounts', 'Image').tags.through
+
+    duplicates = Tags.objects.values('name').annotate(keep_id=Min('id'), n=Count('id')).filter(n__gt=1)
+    for row in duplicates:
+        others = list(Tags.objects.filter(name=row['name']).exclude(id=row['keep_id']).values_list('id', flat=True))
+        image_ids = Through.objects.filter(tags_id__in=others).values_list('image_id', flat=True).distinct()
+        Through.objects.bulk_create(
+            [Through(image_id=image_id, tags_id=row['keep_id']) for image_id in image_ids],
+            ignore_conflicts=True,
+        )
+        Tags.objects.filter(id__in=others).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_review_aggregates'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_tags, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='tags',
+            name='name',
+            field=models.CharField(max_length=50, unique=True),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Passage de la table de liaison automatique Image.tags à un modèle explicite
+# ImageTag, sans recopier les lignes : la table existante est reprise puis
+# renommée, et on lui ajoute le score et la version du modèle.
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0012_tags_name_unique'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='ImageTag',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('image', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='image_tags', to='accounts.image')),
+                        ('tag', models.ForeignKey(db_column='tags_id', on_delete=django.db.models.deletion.CASCADE, related_name='image_tags', to='accounts.tags')),
+                    ],
+                    options={
+                        'db_table': 'accounts_image_tags',
+                        'unique_together': {('image', 'tag')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='image',
+                    name='tags',
+                    field=models.ManyToManyField(blank=True, related_name='images', through='accounts.ImageTag', to='accounts.tags'),
+                ),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='imagetag',
+            name='tag',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='image_tags', to='accounts.tags'),
+        ),
+        migrations.AlterModelTable(
+            name='imagetag',
+            table=None,
+        ),
+        migrations.AlterUniqueTogether(
+            name='imagetag',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='imagetag',
+            constraint=models.UniqueConstraint(fields=('image', 'tag'), name='imagetag_unique_image_tag'),
+        ),
+        migrations.AddField(
+            model_name='imagetag',
+            name='confidence',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='imagetag',
+            name='model_version',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.AddIndex(
+            model_name='imagetag',
+            index=models.Index(fields=['tag', '-confidence'], name='imagetag_tag_confidence_idx'),
+        ),
+    ]
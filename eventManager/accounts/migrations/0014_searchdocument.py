@@ -0,0 +1,87 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE accounts_search_fts USING fts5(
+        title, body,
+        content='accounts_searchdocument', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER accounts_search_ai AFTER INSERT ON accounts_searchdocument BEGIN
+        INSERT INTO accounts_search_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER accounts_search_ad AFTER DELETE ON accounts_searchdocument BEGIN
+        INSERT INTO accounts_search_fts(accounts_search_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER accounts_search_au AFTER UPDATE ON accounts_searchdocument BEGIN
+        INSERT INTO accounts_search_fts(accounts_search_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO accounts_search_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+]
+
+SQLITE_BACKWARD = [
+    'DROP TRIGGER IF EXISTS accounts_search_au',
+    'DROP TRIGGER IF EXISTS accounts_search_ad',
+    'DROP TRIGGER IF EXISTS accounts_search_ai',
+    'DROP TABLE IF EXISTS accounts_search_fts',
+]
+
+# L'expression doit rester identique à celle de accounts.search.PostgresBackend
+# pour que l'index GIN soit utilisé.
+POSTGRES_FORWARD = [
+    """
+    CREATE INDEX accounts_search_tsv_idx ON accounts_searchdocument
+    USING GIN (to_tsvector('french', title || ' ' || body))
+    """,
+]
+
+POSTGRES_BACKWARD = [
+    'DROP INDEX IF EXISTS accounts_search_tsv_idx',
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0013_imagetag'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('event', 'Événement'), ('review', 'Avis'), ('answer', 'Réponse')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('title', models.CharField(blank=True, max_length=200)),
+                ('body', models.TextField(blank=True)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='accounts.events')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='searchdocument_unique_object')],
+            },
+        ),
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            _run({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRES_BACKWARD}),
+        ),
+    ]
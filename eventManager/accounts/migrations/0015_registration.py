@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:54
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+
+
+def fill_places_left(apps, schema_editor):
+    # Aucune inscription n'existe encore : toutes les places sont libres
+    Events = apps.get_model('accounts', 'Events')
+    Events.objects.update(places_left=Greatest(F('places'), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0014_searchdocument'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Registration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('confirmed', 'Confirmée'), ('waitlisted', "En liste d'attente"), ('cancelled', 'Annulée')], max_length=10)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('cancelled_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='events',
+            name='places_left',
+            field=models.IntegerField(blank=True, default=0),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_places_left, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='events',
+            constraint=models.CheckConstraint(condition=models.Q(('places_left__gte', 0)), name='events_places_left_gte_0'),
+        ),
+        migrations.AddField(
+            model_name='registration',
+            name='event',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='registrations', to='accounts.events'),
+        ),
+        migrations.AddField(
+            model_name='registration',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='registrations', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='registration',
+            index=models.Index(fields=['event', 'status', 'created_at', 'id'], name='registration_waitlist_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='registration',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'cancelled'), _negated=True), fields=('event', 'user'), name='registration_active_unique'),
+        ),
+    ]
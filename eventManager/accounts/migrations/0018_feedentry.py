@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0017_uploadsession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('pk', models.CompositePrimaryKey('feed', 'date', 'event', blank=True, editable=False, primary_key=True, serialize=False)),
+                ('feed', models.CharField(max_length=40)),
+                ('date', models.DateTimeField()),
+                ('title', models.CharField(max_length=100)),
+                ('location', models.CharField(max_length=200)),
+                ('category_id', models.IntegerField()),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='accounts.events')),
+            ],
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:48
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0018_feedentry'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='events',
+            name='places',
+            field=models.IntegerField(validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+    ]
@@ -1,5 +1,9 @@
+import uuid
+
+from django.core.validators import MinValueValidator
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 
 class Categories(models.Model):
@@ -9,7 +13,7 @@ class Categories(models.Model):
         return f'{self.name}'
     
 class Tags(models.Model):
-    name = models.CharField(max_length=50)
+    name = models.CharField(max_length=50, unique=True)
 
     def __str__(self):
         return f'{self.name}'
@@ -19,8 +23,31 @@ class Events(models.Model):
     category = models.ForeignKey(Categories, on_delete=models.CASCADE)
     date = models.DateTimeField()
     location = models.CharField(max_length=200)
-    places = models.IntegerField()
+    places = models.IntegerField(validators=[MinValueValidator(0)])
+    # Places restantes, décrémentées uniquement par accounts.booking
+    places_left = models.IntegerField(blank=True)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Agrégats des avis, tenus à jour par accounts.aggregates
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.IntegerField(default=0)
+    avg_rating = models.FloatField(default=0)
+
+    class Meta:
+        indexes = [
+            # Pagination par curseur (date, id), avec ou sans filtre de catégorie
+            models.Index(fields=['date', 'id'], name='events_date_id_idx'),
+            models.Index(fields=['category', 'date', 'id'], name='events_category_date_id_idx'),
+            models.Index(fields=['avg_rating', 'id'], name='events_avg_rating_idx'),
+        ]
+        constraints = [
+            # Dernier rempart contre la surréservation
+            models.CheckConstraint(condition=models.Q(places_left__gte=0), name='events_places_left_gte_0'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self._state.adding and self.places_left is None:
+            self.places_left = self.places
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f'{self.title} - {self.category.name}'
@@ -29,10 +56,48 @@ class Image(models.Model):
     event = models.ForeignKey(Events, on_delete=models.CASCADE, related_name='images')
     review = models.ForeignKey('EventReviews', on_delete=models.CASCADE, related_name='images', null=True, blank=True)
     image = models.ImageField(upload_to='events/', null=True, blank=True)
-    tags = models.ManyToManyField(Tags, related_name='images', blank=True)
+    tags = models.ManyToManyField(Tags, through='ImageTag', related_name='images', blank=True)
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
 
     def __str__(self):
         return f'Image for {self.event.title}'
+
+
+class ImageTag(models.Model):
+    image = models.ForeignKey(Image, on_delete=models.CASCADE, related_name='image_tags')
+    tag = models.ForeignKey(Tags, on_delete=models.CASCADE, related_name='image_tags')
+    # Probabilité softmax du label ; vide pour les tags posés à la main
+    confidence = models.FloatField(null=True, blank=True)
+    model_version = models.CharField(max_length=50, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['image', 'tag'], name='imagetag_unique_image_tag'),
+        ]
+        indexes = [
+            models.Index(fields=['tag', '-confidence'], name='imagetag_tag_confidence_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.tag.name} ({self.confidence}) - image {self.image_id}'
+
+
+class ImageVariant(models.Model):
+    image = models.ForeignKey(Image, on_delete=models.CASCADE, related_name='variants')
+    file = models.ImageField(upload_to='variants/')
+    format = models.CharField(max_length=10)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['width']
+        constraints = [
+            models.UniqueConstraint(fields=['image', 'format', 'width'], name='imagevariant_unique_size'),
+        ]
+
+    def __str__(self):
+        return f'{self.format} {self.width}x{self.height} - image {self.image_id}'
     
 
 class EventReviews(models.Model):
@@ -41,6 +106,7 @@ class EventReviews(models.Model):
     rating = models.IntegerField()
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
+    answer_count = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return f'{self.event.title} - {self.rating} stars'
@@ -53,4 +119,197 @@ class Answers(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f'{self.answer_text}'
\ No newline at end of file
+        return f'{self.answer_text}'
+
+class TaggingJob(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'En attente'),
+        (RUNNING, 'En cours'),
+        (DONE, 'Terminé'),
+        (FAILED, 'Échoué'),
+    ]
+
+    image = models.ForeignKey(Image, on_delete=models.CASCADE, related_name='tagging_jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    available_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration_ms = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'available_at', 'id'], name='taggingjob_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f'Tagging #{self.id} ({self.status}) - image {self.image_id}'
+
+    @property
+    def latency_ms(self):
+        # Temps total entre la mise en file et la fin du traitement
+        if self.finished_at is None:
+            return None
+        return (self.finished_at - self.created_at).total_seconds() * 1000
+
+
+class TagCache(models.Model):
+    content_hash = models.CharField(max_length=64)
+    model_version = models.CharField(max_length=50)
+    tags = models.JSONField(default=list)
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['content_hash', 'model_version'], name='tagcache_unique_hash'),
+        ]
+
+    def __str__(self):
+        return f'{self.content_hash[:12]} ({self.model_version})'
+
+
+class SearchDocument(models.Model):
+    EVENT = 'event'
+    REVIEW = 'review'
+    ANSWER = 'answer'
+    KIND_CHOICES = [
+        (EVENT, 'Événement'),
+        (REVIEW, 'Avis'),
+        (ANSWER, 'Réponse'),
+    ]
+
+    # Copie du texte indexé, tenue à jour par accounts.signals ; l'index plein
+    # texte lui-même (FTS5 ou tsvector) est créé par la migration selon la base.
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    event = models.ForeignKey(Events, on_delete=models.CASCADE, related_name='+')
+    title = models.CharField(max_length=200, blank=True)
+    body = models.TextField(blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='searchdocument_unique_object'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} #{self.object_id}'
+
+
+class Registration(models.Model):
+    CONFIRMED = 'confirmed'
+    WAITLISTED = 'waitlisted'
+    CANCELLED = 'cancelled'
+    STATUS_CHOICES = [
+        (CONFIRMED, 'Confirmée'),
+        (WAITLISTED, "En liste d'attente"),
+        (CANCELLED, 'Annulée'),
+    ]
+
+    event = models.ForeignKey(Events, on_delete=models.CASCADE, related_name='registrations')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='registrations')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES)
+    created_at = models.DateTimeField(default=timezone.now)
+    cancelled_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # Une seule inscription active par personne et par événement
+            models.UniqueConstraint(
+                fields=['event', 'user'],
+                condition=~models.Q(status='cancelled'),
+                name='registration_active_unique',
+            ),
+        ]
+        indexes = [
+            # Ordre de la liste d'attente
+            models.Index(fields=['event', 'status', 'created_at', 'id'], name='registration_waitlist_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user} - {self.event.title} ({self.status})'
+
+
+class ArchivedEvent(models.Model):
+    # Même id que l'événement d'origine : ses anciennes URL restent valides
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(max_length=100)
+    category_name = models.CharField(max_length=50)
+    date = models.DateTimeField(db_index=True)
+    location = models.CharField(max_length=200)
+    # Instantané complet (avis, réponses, images en stockage froid, tags),
+    # écrit par accounts.archive
+    data = models.JSONField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f'{self.title} (archivé)'
+
+
+class UploadSession(models.Model):
+    OPEN = 'open'
+    COMPLETE = 'complete'
+    PROCESSING = 'processing'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (OPEN, 'En cours'),
+        (COMPLETE, 'Reçu, en attente de traitement'),
+        (PROCESSING, 'En traitement'),
+        (DONE, 'Terminé'),
+        (FAILED, 'Échoué'),
+    ]
+
+    # Identifiant non devinable : il suffit, avec la session, à reprendre l'envoi
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    event = models.ForeignKey(Events, on_delete=models.CASCADE, related_name='+')
+    review = models.ForeignKey(EventReviews, on_delete=models.CASCADE, related_name='+', null=True, blank=True)
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    # Octets reçus : l'envoi reprend toujours à cette position
+    received = models.BigIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=OPEN)
+    image = models.ForeignKey(Image, on_delete=models.SET_NULL, related_name='+', null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'updated_at'], name='uploadsession_status_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.filename} ({self.received}/{self.size}, {self.status})'
+
+
+class FeedEntry(models.Model):
+    """Ligne d'un flux d'événements à venir, tenue à jour par accounts.feeds.
+
+    Flux : « upcoming » (tous les événements), « category:<id> » et
+    « tag:<id> ». La clé primaire (flux, date, événement) range les lignes
+    d'un flux dans l'ordre d'affichage : une page est une lecture d'intervalle
+    de la clé, sans tri ni jointure.
+    """
+    UPCOMING = 'upcoming'
+
+    pk = models.CompositePrimaryKey('feed', 'date', 'event')
+    feed = models.CharField(max_length=40)
+    date = models.DateTimeField()
+    event = models.ForeignKey(Events, on_delete=models.CASCADE, related_name='+')
+    # Copie des champs affichés dans les listes
+    title = models.CharField(max_length=100)
+    location = models.CharField(max_length=200)
+    category_id = models.IntegerField()
+
+    def __str__(self):
+        return f'{self.feed} : {self.title} ({self.date})'
@@ -0,0 +1,121 @@
+import base64
+import json
+from functools import reduce
+
+from django.db.models import Q
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def encode_cursor(values):
+    # isoformat() garde les microsecondes (DjangoJSONEncoder les tronque) :
+    # le curseur doit reproduire exactement la valeur stockée.
+    values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in values]
+    raw = json.dumps(values, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, model, fields):
+    """Décode un curseur ; lève ValueError s'il est invalide ou falsifié."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise ValueError('Curseur invalide')
+    if not isinstance(values, list) or len(values) != len(fields):
+        raise ValueError('Curseur invalide')
+    try:
+        return [model._meta.get_field(name).to_python(value) for name, value in zip(fields, values)]
+    except Exception:
+        raise ValueError('Curseur invalide')
+
+
+def _name(field):
+    return field.lstrip('-')
+
+
+def _seek(fields, values, forward):
+    """Condition "(f1, f2, ...) > (v1, v2, ...)" (ou < en arrière), écrite en OU de ET.
+
+    Un champ préfixé de "-" est trié en ordre décroissant : la comparaison
+    s'inverse pour lui. La borne redondante "f1 >= v1" permet à la base de
+    démarrer la lecture de l'index composite directement au curseur au lieu
+    de parcourir la table.
+    """
+    def op(field):
+        return 'gt' if forward != field.startswith('-') else 'lt'
+
+    clauses = []
+    for i, field in enumerate(fields):
+        equal = {_name(f): v for f, v in zip(fields[:i], values[:i])}
+        clauses.append(Q(**equal, **{f'{_name(field)}__{op(field)}': values[i]}))
+    return Q(**{f'{_name(fields[0])}__{op(fields[0])}e': values[0]}) & reduce(lambda a, b: a | b, clauses)
+
+
+def _reversed(field):
+    return _name(field) if field.startswith('-') else f'-{field}'
+
+
+def paginate_keyset(queryset, fields=('date', 'id'), after=None, before=None, page_size=20):
+    """Page de `queryset` triée par `fields`, à partir d'un curseur.
+
+    Comme pour order_by(), un champ préfixé de "-" est trié en ordre
+    décroissant ; l'index doit suivre le même sens pour chaque champ (ou le
+    sens inverse pour tous).
+
+    Contrairement à OFFSET, le coût ne dépend pas de la profondeur de la page :
+    la base reprend la lecture de l'index juste après le curseur.
+    """
+    query, fields = _page_query(queryset, fields, after, before, page_size)
+    return _build_page(list(query), fields, after, before, page_size)
+
+
+async def apaginate_keyset(queryset, fields=('date', 'id'), after=None, before=None, page_size=20):
+    """Version asynchrone de paginate_keyset (ORM asynchrone)."""
+    query, fields = _page_query(queryset, fields, after, before, page_size)
+    return _build_page([obj async for obj in query], fields, after, before, page_size)
+
+
+def _page_query(queryset, fields, after, before, page_size):
+    fields = list(fields)
+    model = queryset.model
+    if before:
+        values = decode_cursor(before, model, [_name(f) for f in fields])
+        return (
+            queryset.filter(_seek(fields, values, forward=False))
+            .order_by(*[_reversed(f) for f in fields])[:page_size + 1]
+        ), fields
+    if after:
+        values = decode_cursor(after, model, [_name(f) for f in fields])
+        queryset = queryset.filter(_seek(fields, values, forward=True))
+    return queryset.order_by(*fields)[:page_size + 1], fields
+
+
+def _build_page(rows, fields, after, before, page_size):
+    if before:
+        has_more = len(rows) > page_size
+        items = list(reversed(rows[:page_size]))
+        has_prev, has_next = has_more, True
+    else:
+        items = rows[:page_size]
+        has_prev, has_next = bool(after), len(rows) > page_size
+
+    def cursor_of(obj):
+        return encode_cursor([getattr(obj, _name(f)) for f in fields])
+
+    return KeysetPage(
+        items,
+        next_cursor=cursor_of(items[-1]) if items and has_next else None,
+        prev_cursor=cursor_of(items[0]) if items and has_prev else None,
+    )
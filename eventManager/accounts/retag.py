@@ -0,0 +1,245 @@
+"""Re-tagging en masse des images existantes, après un changement de modèle.
+
+Les images sont lues par lots triés par id (`.iterator()`) et décodées dans
+un pool de processus pendant que le modèle traite les précédentes ; leurs
+tags détectés sont remplacés en une transaction par lot. Les tags posés à la
+main (sans confiance) sont conservés. Après chaque lot, `on_chunk` reçoit le
+résultat : la commande `retag_images` s'en sert pour enregistrer le point de
+reprise (Checkpoint).
+"""
+import json
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import get_context
+
+from django.db import transaction
+from django.db.models import Q
+
+from . import caching, tag_cache
+from .classifier import get_classifier, model_version
+from .decoding import decode_bytes
+from .models import Image, ImageTag, TaggingJob
+from .signals import suspended
+from .tag_service import assign_tags
+
+logger = logging.getLogger(__name__)
+
+
+class RetagResult:
+    def __init__(self, last_id=0):
+        self.images = 0
+        self.inferred = 0
+        self.cached = 0
+        self.failed = 0
+        self.last_id = last_id
+        self.started = time.monotonic()
+
+    @property
+    def rate(self):
+        elapsed = time.monotonic() - self.started
+        return self.images / elapsed if elapsed else 0.0
+
+
+class RateLimiter:
+    """Ne dépasse pas `max_rate` images par seconde en moyenne (None : sans limite)."""
+
+    def __init__(self, max_rate=None):
+        self.max_rate = max_rate
+        self.started = time.monotonic()
+        self.count = 0
+
+    def wait(self, count):
+        self.count += count
+        if not self.max_rate:
+            return
+        delay = self.started + self.count / self.max_rate - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def select_images(from_version=None, stale=False, tagged_before=None):
+    """Images à re-taguer.
+
+    `from_version` : images portant des tags de cette version du modèle ;
+    `stale` : images sans aucun tag de la version courante ;
+    `tagged_before` : images dont aucun tagging n'a abouti depuis cette date.
+    """
+    images = Image.objects.exclude(Q(image='') | Q(image__isnull=True))
+    if from_version is not None:
+        images = images.filter(id__in=ImageTag.objects.filter(model_version=from_version).values('image_id'))
+    if stale:
+        images = images.exclude(id__in=ImageTag.objects.filter(model_version=model_version()).values('image_id'))
+    if tagged_before is not None:
+        recent = TaggingJob.objects.filter(status=TaggingJob.DONE, finished_at__gte=tagged_before)
+        images = images.exclude(id__in=recent.values('image_id'))
+    return images
+
+
+def _read(image):
+    # Lecture via l'API de stockage, dans ce processus : les fils ne font que décoder
+    with image.image.open('rb') as fp:
+        return fp.read()
+
+
+def _decoded(images, pool, size, window):
+    """(image, image PIL ou exception) dans l'ordre de `images`.
+
+    Au plus `window` décodages en cours : la mémoire ne dépend pas de la taille
+    du lot.
+    """
+    pending = deque()
+    for image in images:
+        try:
+            data = _read(image)
+            outcome = pool.submit(decode_bytes, data, size) if pool else decode_bytes(data, size)
+        except Exception as exc:
+            outcome = exc
+        pending.append((image, outcome))
+        while len(pending) > window:
+            yield _result(*pending.popleft())
+    while pending:
+        yield _result(*pending.popleft())
+
+
+def _result(image, outcome):
+    if isinstance(outcome, Future):
+        try:
+            return image, outcome.result()
+        except Exception as exc:
+            return image, exc
+    return image, outcome
+
+
+def _key(image):
+    # Images sans empreinte : jamais regroupées ni mises en cache
+    return image.content_hash or f'#{image.id}'
+
+
+def _infer(batch, tags_by_key, result):
+    predictions = get_classifier().engine.predict_batch([pil_img for _, pil_img in batch])
+    result.inferred += len(batch)
+    for (image, _), predicted_tags in zip(batch, predictions):
+        tags_by_key[_key(image)] = predicted_tags
+
+
+def retag_chunk(images, pool=None, batch_size=32, limiter=None, result=None):
+    """Re-tague `images` : cache de tags, puis inférence par lots sur les contenus inconnus."""
+    result = result or RetagResult()
+    limiter = limiter or RateLimiter()
+    size = get_classifier().transform.resize_size[0]
+
+    tags_by_key = tag_cache.lookup_many({image.content_hash for image in images})
+    cached = sum(1 for image in images if _key(image) in tags_by_key)
+    result.cached += cached
+    limiter.wait(cached)
+    # Un seul décodage par contenu, même partagé par plusieurs images du lot
+    unknown = {}
+    for image in images:
+        if _key(image) not in tags_by_key:
+            unknown.setdefault(_key(image), image)
+
+    inferred = {}
+    batch = []
+    for image, outcome in _decoded(list(unknown.values()), pool, size, window=2 * batch_size):
+        if isinstance(outcome, Exception):
+            logger.warning("Image %s non décodée : %r", image.id, outcome)
+            result.failed += 1
+            continue
+        batch.append((image, outcome))
+        if len(batch) == batch_size:
+            limiter.wait(len(batch))
+            _infer(batch, inferred, result)
+            batch = []
+    if batch:
+        limiter.wait(len(batch))
+        _infer(batch, inferred, result)
+    tag_cache.store_many({key: tags for key, tags in inferred.items() if not key.startswith('#')})
+    tags_by_key.update(inferred)
+
+    # Les images non décodées gardent leurs tags
+    tags_by_image = {image.id: tags_by_key[_key(image)] for image in images if _key(image) in tags_by_key}
+    _rewrite(tags_by_image, {image.event_id for image in images if image.id in tags_by_image})
+
+    result.images += len(images)
+    result.last_id = images[-1].id
+    return result
+
+
+def _rewrite(tags_by_image, event_ids):
+    """Remplace les tags détectés des images, en une transaction."""
+    with transaction.atomic():
+        # Suppression en masse : cache et flux (par assign_tags) mis à jour une fois pour le lot
+        with suspended():
+            ImageTag.objects.filter(image__in=list(tags_by_image), confidence__isnull=False).delete()
+        assign_tags(tags_by_image, model_version=model_version())
+        for event_id in event_ids:
+            caching.invalidate_event(event_id)
+
+
+def retag_images(images, chunk_size=500, batch_size=32, workers=None, max_rate=None, after_id=0,
+                 on_chunk=None):
+    """Re-tague `images` par lots de `chunk_size`, à partir de l'id `after_id` exclu.
+
+    `workers` : processus de décodage (0 : décodage dans ce processus).
+    """
+    result = RetagResult(last_id=after_id)
+    limiter = RateLimiter(max_rate)
+    images = (
+        images.filter(id__gt=after_id).order_by('id')
+        .only('id', 'image', 'content_hash', 'event_id')
+        .iterator(chunk_size=chunk_size)
+    )
+    if workers is None:
+        workers = max(1, (os.cpu_count() or 2) - 1)
+    # spawn : les fils n'héritent ni de la connexion à la base ni des threads du modèle
+    pool = ProcessPoolExecutor(workers, mp_context=get_context('spawn')) if workers else None
+    try:
+        chunk = []
+        for image in images:
+            chunk.append(image)
+            if len(chunk) == chunk_size:
+                retag_chunk(chunk, pool, batch_size, limiter, result)
+                if on_chunk:
+                    on_chunk(result)
+                chunk = []
+        if chunk:
+            retag_chunk(chunk, pool, batch_size, limiter, result)
+            if on_chunk:
+                on_chunk(result)
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+    return result
+
+
+class Checkpoint:
+    """Point de reprise de retag_images : dernier id traité et filtres utilisés."""
+
+    def __init__(self, path, filters):
+        self.path = path
+        self.filters = filters
+
+    def load(self):
+        """Dernier id traité, ou 0 ; lève ValueError si les filtres diffèrent."""
+        try:
+            with open(self.path) as fp:
+                state = json.load(fp)
+        except FileNotFoundError:
+            return 0
+        if state['filters'] != self.filters:
+            raise ValueError(f"Point de reprise {self.path} créé avec d'autres filtres : {state['filters']}")
+        return state['last_id']
+
+    def save(self, last_id):
+        # Écriture puis renommage : un arrêt brutal ne laisse pas de fichier tronqué
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as fp:
+            json.dump({'filters': self.filters, 'last_id': last_id}, fp)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,130 @@
+import re
+
+from django.db import connection
+
+from .models import Answers, EventReviews, Events, SearchDocument
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+KIND_BY_MODEL = {
+    Events: SearchDocument.EVENT,
+    EventReviews: SearchDocument.REVIEW,
+    Answers: SearchDocument.ANSWER,
+}
+
+
+class SearchResult:
+    def __init__(self, kind, object_id, event_id, title, body, rank):
+        self.kind = kind
+        self.object_id = object_id
+        self.event_id = event_id
+        self.title = title
+        self.body = body
+        self.rank = rank
+
+
+class SqliteBackend:
+    """FTS5, classement bm25 (titre pondéré double)."""
+
+    def build_query(self, text):
+        # Chaque mot est cité pour neutraliser la syntaxe FTS5 ; le dernier est
+        # traité comme un préfixe pour la recherche au fil de la frappe.
+        words = WORD_RE.findall(text)
+        if not words:
+            return None
+        terms = [f'"{word}"' for word in words]
+        terms[-1] += '*'
+        return ' '.join(terms)
+
+    def search(self, text, limit, offset):
+        query = self.build_query(text)
+        if query is None:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT d.kind, d.object_id, d.event_id, d.title, d.body,
+                       bm25(accounts_search_fts, 2.0, 1.0) AS rank
+                FROM accounts_search_fts
+                JOIN accounts_searchdocument d ON d.id = accounts_search_fts.rowid
+                WHERE accounts_search_fts MATCH %s
+                ORDER BY rank
+                LIMIT %s OFFSET %s
+                """,
+                [query, limit, offset],
+            )
+            return [SearchResult(*row) for row in cursor.fetchall()]
+
+
+class PostgresBackend:
+    """tsvector/tsquery servis par l'index GIN créé en migration."""
+
+    def search(self, text, limit, offset):
+        if not WORD_RE.search(text):
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT d.kind, d.object_id, d.event_id, d.title, d.body,
+                       ts_rank_cd(to_tsvector('french', d.title || ' ' || d.body), q) AS rank
+                FROM accounts_searchdocument d, websearch_to_tsquery('french', %s) q
+                WHERE to_tsvector('french', d.title || ' ' || d.body) @@ q
+                ORDER BY rank DESC, d.id
+                LIMIT %s OFFSET %s
+                """,
+                [text, limit, offset],
+            )
+            return [SearchResult(*row) for row in cursor.fetchall()]
+
+
+def get_backend():
+    if connection.vendor == 'postgresql':
+        return PostgresBackend()
+    if connection.vendor == 'sqlite':
+        return SqliteBackend()
+    raise NotImplementedError(f'Recherche non disponible pour {connection.vendor}')
+
+
+def search(text, page=1, per_page=20):
+    """Résultats classés de la page `page` et indicateur de page suivante."""
+    offset = (page - 1) * per_page
+    results = get_backend().search(text, per_page + 1, offset)
+    return results[:per_page], len(results) > per_page
+
+
+def document_for(obj):
+    if isinstance(obj, Events):
+        return SearchDocument(kind=SearchDocument.EVENT, object_id=obj.id, event_id=obj.id,
+                              title=obj.title, body=obj.location)
+    if isinstance(obj, EventReviews):
+        return SearchDocument(kind=SearchDocument.REVIEW, object_id=obj.id, event_id=obj.event_id,
+                              body=obj.review_text)
+    if isinstance(obj, Answers):
+        # Pour l'indexation en masse, charger les réponses avec select_related('review')
+        return SearchDocument(kind=SearchDocument.ANSWER, object_id=obj.id, event_id=obj.review.event_id,
+                              body=obj.answer_text)
+    raise TypeError(f'Objet non indexable : {obj!r}')
+
+
+def index_object(obj):
+    doc = document_for(obj)
+    SearchDocument.objects.update_or_create(
+        kind=doc.kind,
+        object_id=doc.object_id,
+        defaults={'event_id': doc.event_id, 'title': doc.title, 'body': doc.body},
+    )
+
+
+def unindex_object(obj):
+    SearchDocument.objects.filter(kind=KIND_BY_MODEL[type(obj)], object_id=obj.id).delete()
+
+
+def index_bulk(objects, batch_size=1000):
+    """Indexe des objets créés en masse (bulk_create ne déclenche pas les signaux)."""
+    SearchDocument.objects.bulk_create(
+        [document_for(obj) for obj in objects],
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['kind', 'object_id'],
+        update_fields=['event_id', 'title', 'body'],
+    )
@@ -0,0 +1,137 @@
+import contextlib
+import contextvars
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import caching, feeds, search, tag_service
+from .middleware import install_query_timer
+from .models import Answers, Categories, EventReviews, Events, Image, ImageTag, ImageVariant, Tags
+
+# Champs d'Events recopiés dans les flux
+FEED_FIELDS = {'title', 'date', 'location', 'category', 'category_id'}
+
+_suspended = contextvars.ContextVar('signals_suspended', default=False)
+
+
+@contextlib.contextmanager
+def suspended():
+    """Coupe l'indexation et l'invalidation objet par objet, pour les
+    suppressions en masse : l'appelant s'en charge une fois pour le lot."""
+    token = _suspended.set(True)
+    try:
+        yield
+    finally:
+        _suspended.reset(token)
+
+
+@receiver(post_save, sender=Events)
+@receiver(post_save, sender=EventReviews)
+@receiver(post_save, sender=Answers)
+def index_search_document(sender, instance, **kwargs):
+    if _suspended.get():
+        return
+    search.index_object(instance)
+
+
+@receiver(post_delete, sender=Events)
+@receiver(post_delete, sender=EventReviews)
+@receiver(post_delete, sender=Answers)
+def remove_search_document(sender, instance, **kwargs):
+    if _suspended.get():
+        return
+    search.unindex_object(instance)
+
+
+@receiver(post_save, sender=Events)
+@receiver(post_delete, sender=Events)
+@receiver(post_save, sender=EventReviews)
+@receiver(post_delete, sender=EventReviews)
+@receiver(post_save, sender=Image)
+@receiver(post_delete, sender=Image)
+def invalidate_event_cache(sender, instance, **kwargs):
+    if _suspended.get():
+        return
+    caching.invalidate_event(instance.event_id if sender is not Events else instance.id)
+
+
+@receiver(post_save, sender=Answers)
+@receiver(post_delete, sender=Answers)
+def invalidate_answer_event_cache(sender, instance, **kwargs):
+    if _suspended.get():
+        return
+    # Lecture de l'id seul : l'avis a pu être supprimé (cascade)
+    event_id = EventReviews.objects.filter(id=instance.review_id).values_list('event_id', flat=True).first()
+    if event_id is not None:
+        caching.invalidate_event(event_id)
+
+
+@receiver(post_save, sender=ImageTag)
+@receiver(post_delete, sender=ImageTag)
+@receiver(post_save, sender=ImageVariant)
+@receiver(post_delete, sender=ImageVariant)
+def invalidate_image_event_cache(sender, instance, **kwargs):
+    if _suspended.get():
+        return
+    event_id = Image.objects.filter(id=instance.image_id).values_list('event_id', flat=True).first()
+    if event_id is not None:
+        caching.invalidate_event(event_id)
+
+
+@receiver(post_save, sender=Categories)
+@receiver(post_delete, sender=Categories)
+@receiver(post_save, sender=Tags)
+@receiver(post_delete, sender=Tags)
+def invalidate_list_cache(sender, instance, **kwargs):
+    if _suspended.get():
+        return
+    caching.invalidate_lists()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_users_cache(sender, instance, update_fields=None, **kwargs):
+    # La connexion ne sauvegarde que last_login : nom inchangé
+    if update_fields is not None and 'username' not in update_fields:
+        return
+    caching.invalidate_users()
+
+
+@receiver(post_save, sender=Events)
+def refresh_event_feeds(sender, instance, update_fields=None, **kwargs):
+    if _suspended.get():
+        return
+    # Sauvegardes partielles sans champ affiché (places, agrégats) : flux inchangés
+    if update_fields is not None and not set(update_fields) & FEED_FIELDS:
+        return
+    # Relu en base : l'instance peut porter des valeurs brutes du formulaire
+    # (date en texte) que la base a converties
+    feeds.refresh_events([instance.id])
+
+
+@receiver(post_save, sender=ImageTag)
+@receiver(post_delete, sender=ImageTag)
+@receiver(post_delete, sender=Image)
+def refresh_tag_feeds(sender, instance, **kwargs):
+    if _suspended.get():
+        return
+    event_id = instance.event_id if sender is Image else (
+        Image.objects.filter(id=instance.image_id).values_list('event_id', flat=True).first()
+    )
+    if event_id is not None:
+        # Après le commit : si la suppression vient de celle de l'événement,
+        # il n'existe plus et ses lignes ne sont pas recréées
+        transaction.on_commit(lambda: feeds.refresh_events([event_id]))
+
+
+@receiver(post_save, sender=Tags)
+@receiver(post_delete, sender=Tags)
+def forget_cached_tag(sender, instance, **kwargs):
+    tag_service.forget_tag(instance)
+
+
+# Mesure des requêtes SQL par PerformanceMiddleware, sur toutes les connexions
+connection_created.connect(install_query_timer)
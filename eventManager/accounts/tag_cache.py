@@ -0,0 +1,89 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .classifier import model_version
+from .models import TagCache
+
+# Compteurs du processus courant (worker ou serveur web)
+stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+
+def lookup(content_hash):
+    """Renvoie les tags déjà prédits pour ce contenu, ou None."""
+    if not content_hash:
+        return None
+    entry = (
+        TagCache.objects
+        .filter(content_hash=content_hash, model_version=model_version())
+        .only('id', 'tags')
+        .first()
+    )
+    if entry is None:
+        stats['misses'] += 1
+        return None
+    stats['hits'] += 1
+    TagCache.objects.filter(id=entry.id).update(hits=F('hits') + 1, last_used_at=timezone.now())
+    return entry.tags
+
+
+def lookup_many(content_hashes):
+    """Version par lot de lookup : {empreinte: tags} des contenus déjà tagués."""
+    content_hashes = [content_hash for content_hash in content_hashes if content_hash]
+    entries = list(
+        TagCache.objects
+        .filter(content_hash__in=content_hashes, model_version=model_version())
+        .values_list('id', 'content_hash', 'tags')
+    )
+    stats['hits'] += len(entries)
+    stats['misses'] += len(content_hashes) - len(entries)
+    if entries:
+        TagCache.objects.filter(id__in=[entry_id for entry_id, _, _ in entries]).update(
+            hits=F('hits') + 1, last_used_at=timezone.now(),
+        )
+    return {content_hash: tags for _, content_hash, tags in entries}
+
+
+def store(content_hash, tags):
+    if not content_hash:
+        return
+    try:
+        with transaction.atomic():
+            TagCache.objects.create(content_hash=content_hash, model_version=model_version(), tags=tags)
+    except IntegrityError:
+        # Un autre worker a tagué la même image entre-temps
+        return
+    evict()
+
+
+def store_many(tags_by_hash):
+    """Version par lot de store : une insertion et une éviction pour tout le lot."""
+    if not tags_by_hash:
+        return
+    version = model_version()
+    TagCache.objects.bulk_create(
+        [
+            TagCache(content_hash=content_hash, model_version=version, tags=tags)
+            for content_hash, tags in tags_by_hash.items()
+            if content_hash
+        ],
+        ignore_conflicts=True,
+    )
+    evict()
+
+
+def evict():
+    """Supprime les entrées les moins récemment utilisées au-delà de TAG_CACHE_MAX_ENTRIES.
+
+    On laisse le cache dépasser la limite de 10 % avant de purger, pour ne pas
+    payer une suppression à chaque insertion.
+    """
+    max_entries = getattr(settings, 'TAG_CACHE_MAX_ENTRIES', 100_000)
+    excess = TagCache.objects.count() - max_entries
+    if excess <= max_entries // 10:
+        return 0
+    stale_ids = list(TagCache.objects.order_by('last_used_at').values_list('id', flat=True)[:excess])
+    deleted, _ = TagCache.objects.filter(id__in=stale_ids).delete()
+    stats['evictions'] += deleted
+    return deleted
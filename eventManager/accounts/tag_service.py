@@ -0,0 +1,109 @@
+import threading
+
+from django.db.models import Max
+
+from . import feeds
+from .models import Events, ImageTag, Tags
+
+# Les labels ImageNet sont fixes (1000 entrées) : l'id d'un tag résolu est
+# gardé pour la durée du processus. Un tag renommé ou supprimé (admin) est
+# oublié par ce processus (signal, voir forget_tag) ; les autres, dont
+# run_tagger, le gardent jusqu'à leur redémarrage.
+_tag_ids = {}
+_lock = threading.Lock()
+
+
+def resolve_tags(names):
+    """Renvoie {nom: id} pour `names`, en créant les tags manquants en une requête."""
+    names = list(dict.fromkeys(names))
+    missing = [name for name in names if name not in _tag_ids]
+    if missing:
+        found = dict(Tags.objects.filter(name__in=missing).values_list('name', 'id'))
+        to_create = [name for name in missing if name not in found]
+        if to_create:
+            # ignore_conflicts + contrainte unique : un autre processus peut créer
+            # les mêmes tags en parallèle sans erreur ni doublon.
+            Tags.objects.bulk_create([Tags(name=name) for name in to_create], ignore_conflicts=True)
+            found.update(Tags.objects.filter(name__in=to_create).values_list('name', 'id'))
+        with _lock:
+            _tag_ids.update(found)
+    return {name: _tag_ids[name] for name in names}
+
+
+def forget_tag(tag):
+    """Retire du cache les noms qui pointent vers `tag` (renommé ou supprimé)."""
+    with _lock:
+        for name in [name for name, tag_id in _tag_ids.items() if tag_id == tag.id]:
+            del _tag_ids[name]
+
+
+def _with_confidence(tags):
+    # Accepte des noms seuls ou des paires (nom, confiance) ; garde la première
+    # occurrence de chaque nom.
+    pairs = {}
+    for tag in tags:
+        name, confidence = (tag, None) if isinstance(tag, str) else tag
+        pairs.setdefault(name, confidence)
+    return pairs
+
+
+def assign_tags(tags_by_image, model_version=''):
+    """Associe des tags à plusieurs images : {image_id: [nom ou (nom, confiance)]}.
+
+    Une requête pour résoudre les tags (aucune si tout est en cache) et une
+    seule insertion dans la table de liaison.
+    """
+    tags_by_image = {image_id: _with_confidence(tags) for image_id, tags in tags_by_image.items()}
+    all_names = [name for tags in tags_by_image.values() for name in tags]
+    if not all_names:
+        return
+    tag_ids = resolve_tags(all_names)
+    ImageTag.objects.bulk_create(
+        [
+            ImageTag(image_id=image_id, tag_id=tag_ids[name], confidence=confidence, model_version=model_version)
+            for image_id, tags in tags_by_image.items()
+            for name, confidence in tags.items()
+        ],
+        ignore_conflicts=True,
+    )
+    # Insertion en masse, sans signal : flux par tag mis à jour ici
+    feeds.refresh_images(list(tags_by_image))
+
+
+def images_by_tag(tag_name, min_confidence=0.0):
+    """Liens image-tag d'un tag, du plus confiant au moins confiant.
+
+    Servi par l'index (tag, -confidence) : la base lit l'index dans l'ordre
+    sans parcourir les images.
+    """
+    return (
+        ImageTag.objects
+        .filter(tag__name=tag_name, confidence__gte=min_confidence)
+        .select_related('image', 'image__event')
+        .order_by('-confidence', 'id')
+    )
+
+
+def events_by_tag(tag_name, min_confidence=0.0, limit=50):
+    """Événements ayant une image portant ce tag, classés par meilleur score."""
+    best = (
+        ImageTag.objects
+        .filter(tag__name=tag_name, confidence__gte=min_confidence)
+        .values('image__event_id')
+        .annotate(best=Max('confidence'))
+        .order_by('-best')[:limit]
+    )
+    scores = {row['image__event_id']: row['best'] for row in best}
+    events = Events.objects.select_related('category').in_bulk(list(scores))
+    ranked = []
+    for event_id, score in scores.items():
+        if event_id in events:
+            event = events[event_id]
+            event.tag_confidence = score
+            ranked.append(event)
+    return ranked
+
+
+def clear_cache():
+    with _lock:
+        _tag_ids.clear()
@@ -0,0 +1,166 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import caching, metrics, tag_cache
+from .classifier import get_classifier, model_version
+from .decoding import decode
+from .models import TaggingJob
+from .tag_service import assign_tags
+from .variants import generate_variants
+
+logger = logging.getLogger(__name__)
+RETRY_DELAY = timedelta(seconds=30)
+
+
+def load_image(image_obj):
+    # Lecture via l'API de stockage (compatible avec les stockages distants)
+    with image_obj.image.open('rb') as fp:
+        return decode(fp, get_classifier().transform.resize_size[0])
+
+
+def claim_next_job():
+    """Réserve le prochain job disponible, ou None si la file est vide.
+
+    La réservation passe par un UPDATE conditionnel sur le statut, ce qui
+    permet de lancer plusieurs workers sur la même base sans double traitement.
+    """
+    while True:
+        job = (
+            TaggingJob.objects
+            .filter(status=TaggingJob.PENDING, available_at__lte=timezone.now())
+            .order_by('available_at', 'id')
+            .first()
+        )
+        if job is None:
+            return None
+        claimed = TaggingJob.objects.filter(id=job.id, status=TaggingJob.PENDING).update(
+            status=TaggingJob.RUNNING,
+            started_at=timezone.now(),
+            attempts=job.attempts + 1,
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+
+def claim_jobs(max_batch_size, max_wait):
+    """Réserve jusqu'à `max_batch_size` jobs, en attendant au plus `max_wait`
+    secondes que le lot se remplisse une fois le premier job obtenu."""
+    jobs = []
+    deadline = None
+    while len(jobs) < max_batch_size:
+        job = claim_next_job()
+        if job is not None:
+            jobs.append(job)
+            if deadline is None:
+                deadline = time.monotonic() + max_wait
+            continue
+        if deadline is None or time.monotonic() >= deadline:
+            break
+        time.sleep(min(0.01, max(deadline - time.monotonic(), 0)))
+    return jobs
+
+
+def _fail(job, exc, elapsed_ms):
+    job.last_error = repr(exc)
+    job.duration_ms = elapsed_ms
+    if job.attempts < job.max_attempts:
+        # Nouvel essai plus tard, avec un délai croissant
+        job.status = TaggingJob.PENDING
+        job.available_at = timezone.now() + RETRY_DELAY * job.attempts
+    else:
+        job.status = TaggingJob.FAILED
+        job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'last_error', 'duration_ms', 'available_at', 'finished_at'])
+
+
+def _finish(results, elapsed_ms):
+    """Enregistre les tags de plusieurs jobs en une seule insertion."""
+    if not results:
+        return
+    try:
+        with transaction.atomic():
+            assign_tags(
+                {job.image_id: tag_names for job, tag_names in results},
+                model_version=model_version(),
+            )
+            finished_at = timezone.now()
+            TaggingJob.objects.filter(id__in=[job.id for job, _ in results]).update(
+                status=TaggingJob.DONE,
+                last_error='',
+                finished_at=finished_at,
+                duration_ms=elapsed_ms,
+            )
+            # assign_tags insère en masse, sans signal : invalidation explicite
+            for event_id in {job.image.event_id for job, _ in results}:
+                caching.invalidate_event(event_id)
+    except Exception as exc:
+        for job, _ in results:
+            _fail(job, exc, elapsed_ms)
+        return
+    for job, _ in results:
+        job.status = TaggingJob.DONE
+        job.last_error = ''
+        job.finished_at = finished_at
+        job.duration_ms = elapsed_ms
+
+
+def run_jobs(jobs):
+    """Tague un lot de jobs avec une seule passe du modèle."""
+    start = time.perf_counter()
+
+    results = []
+    loaded = []
+    for job in jobs:
+        try:
+            # Une image identique a pu être taguée depuis la mise en file
+            cached_tags = tag_cache.lookup(job.image.content_hash)
+            if cached_tags is not None:
+                results.append((job, cached_tags))
+                continue
+            loaded.append((job, load_image(job.image)))
+        except Exception as exc:
+            _fail(job, exc, (time.perf_counter() - start) * 1000)
+
+    if loaded:
+        try:
+            with metrics.span('inference'):
+                predictions = get_classifier().engine.predict_batch([pil_img for _, pil_img in loaded])
+        except Exception as exc:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            for job, _ in loaded:
+                _fail(job, exc, elapsed_ms)
+        else:
+            for (job, _), predicted_tags in zip(loaded, predictions):
+                tag_cache.store(job.image.content_hash, predicted_tags)
+                results.append((job, predicted_tags))
+
+    _finish(results, (time.perf_counter() - start) * 1000)
+
+    for job in jobs:
+        if job.status == TaggingJob.DONE:
+            _build_variants(job)
+    return jobs
+
+
+def _build_variants(job):
+    # Une miniature ratée ne doit pas faire échouer le tagging : build_variants
+    # la rattrapera.
+    try:
+        if generate_variants(job.image):
+            caching.invalidate_event(job.image.event_id)
+    except Exception:
+        logger.exception("Miniatures de l'image %s non générées", job.image_id)
+
+
+def requeue_stale_jobs(older_than):
+    # Jobs restés "en cours" après l'arrêt brutal d'un worker
+    cutoff = timezone.now() - older_than
+    return TaggingJob.objects.filter(status=TaggingJob.RUNNING, started_at__lt=cutoff).update(
+        status=TaggingJob.PENDING,
+        available_at=timezone.now(),
+    )
@@ -0,0 +1,50 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from accounts.variants import CONTENT_TYPES
+
+register = template.Library()
+
+
+def _variants(image, fmt=None):
+    # .all() pour profiter d'un prefetch_related('images__variants') éventuel
+    return [v for v in image.variants.all() if fmt is None or v.format == fmt]
+
+
+@register.simple_tag
+def image_srcset(image, fmt='webp'):
+    """`srcset` des variantes d'une image dans un format, ex. "a_160.webp 160w, ..."."""
+    return ', '.join(f'{v.file.url} {v.width}w' for v in _variants(image, fmt))
+
+
+@register.simple_tag
+def thumbnail_url(image, width=160):
+    """URL de la plus petite variante d'au moins `width` pixels, sinon de l'original."""
+    candidates = _variants(image)
+    for variant in candidates:
+        if variant.width >= width:
+            return variant.file.url
+    if candidates:
+        return candidates[-1].file.url
+    return image.image.url if image.image else ''
+
+
+@register.simple_tag
+def responsive_image(image, sizes='100vw', alt='', css_class=''):
+    """Balise <picture> avec une source par format et l'original en repli."""
+    variants = _variants(image)
+    formats = []
+    for variant in variants:
+        if variant.format not in formats:
+            formats.append(variant.format)
+
+    sources = format_html_join(
+        '',
+        '<source type="{}" srcset="{}" sizes="{}">',
+        ((CONTENT_TYPES[fmt], image_srcset(image, fmt), sizes) for fmt in formats),
+    )
+    fallback = thumbnail_url(image, 480) if variants else (image.image.url if image.image else '')
+    return format_html(
+        '<picture>{}<img src="{}" alt="{}" class="{}" loading="lazy" decoding="async"></picture>',
+        sources, fallback, alt, css_class,
+    )
@@ -0,0 +1,72 @@
+import hashlib
+
+from PIL import Image as PILImage
+from PIL import UnidentifiedImageError
+from django.conf import settings
+from django.core.exceptions import ValidationError
+
+from . import metrics
+from .models import Image, TaggingJob
+
+
+@metrics.span('validate')
+def validate_image(uploaded_file, max_bytes=None):
+    """Rejette les fichiers trop lourds ou trop grands avant tout décodage.
+
+    Seul l'en-tête est lu depuis le tampon d'upload (mémoire ou fichier
+    temporaire) : une bombe de décompression est refusée sans être décodée.
+    `max_bytes` remplace UPLOAD_MAX_BYTES (envois par morceaux).
+    """
+    if max_bytes is None:
+        max_bytes = getattr(settings, 'UPLOAD_MAX_BYTES', 20 * 1024 * 1024)
+    if uploaded_file.size > max_bytes:
+        raise ValidationError(f"Image trop lourde (maximum {max_bytes // (1024 * 1024)} Mo)")
+
+    max_pixels = getattr(settings, 'UPLOAD_MAX_IMAGE_PIXELS', 40_000_000)
+    try:
+        with PILImage.open(uploaded_file) as pil_img:
+            width, height = pil_img.size
+    except (UnidentifiedImageError, PILImage.DecompressionBombError, OSError):
+        raise ValidationError("Fichier image invalide")
+    finally:
+        uploaded_file.seek(0)
+    if width * height > max_pixels:
+        raise ValidationError(f"Image trop grande ({width}x{height} pixels)")
+
+
+def hash_upload(uploaded_file):
+    digest = hashlib.sha256()
+    for chunk in uploaded_file.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+@metrics.span('upload')
+def save_upload(uploaded_file, **owner):
+    """Enregistre une image envoyée et la met en file de tagging et de miniatures.
+
+    Le cache de tags est consulté par le worker, une seule fois par image :
+    un contenu déjà tagué l'est sans inférence. Avec TAG_CACHE_SHARE_FILES,
+    le fichier déjà stocké est réutilisé.
+    """
+    content_hash = hash_upload(uploaded_file)
+
+    existing = None
+    if getattr(settings, 'TAG_CACHE_SHARE_FILES', False):
+        existing = (
+            Image.objects.filter(content_hash=content_hash)
+            .exclude(image='')
+            .only('image')
+            .first()
+        )
+    if existing is not None:
+        image_obj = Image(content_hash=content_hash, **owner)
+        image_obj.image.name = existing.image.name
+        image_obj.save()
+    else:
+        image_obj = Image.objects.create(image=uploaded_file, content_hash=content_hash, **owner)
+
+    # Tagging (sans inférence si le cache répond) et miniatures sont faits
+    # en arrière-plan par `manage.py run_tagger`
+    TaggingJob.objects.create(image=image_obj)
+    return image_obj
@@ -1,6 +1,10 @@
 from django.urls import path
 from django.contrib.auth.views import LoginView, LogoutView
-from .views import SignUpView, event_list, event_details, add_event, add_review, add_answer
+from django.conf import settings
+from .views import SignUpView, event_list, event_details, event_reviews, add_event, add_review, add_answer, tag_detail, category_events, search_view, book_event, cancel_registration, export_events, start_upload, upload_session, complete_upload
+
+if settings.ASYNC_VIEWS:
+    from .async_views import event_list, event_details, event_reviews, add_event
 
 app_name = 'accounts'
 
@@ -10,7 +14,17 @@ urlpatterns = [
   path('signup/', SignUpView.as_view(), name='signup'),
   path('events/', event_list, name='event_list'),
   path('events/add/', add_event, name='add_event'),
+  path('events/export/', export_events, name='export_events'),
   path('events/<int:event_id>/', event_details, name='event_details'),
+  path('events/<int:event_id>/reviews/', event_reviews, name='event_reviews'),
   path('events/<int:event_id>/add_review/', add_review, name='add_review'),
   path('reviews/<int:review_id>/add_answer/', add_answer, name='add_answer'),
+  path('uploads/', start_upload, name='start_upload'),
+  path('uploads/<uuid:upload_id>/', upload_session, name='upload_session'),
+  path('uploads/<uuid:upload_id>/complete/', complete_upload, name='complete_upload'),
+  path('events/<int:event_id>/book/', book_event, name='book_event'),
+  path('registrations/<int:registration_id>/cancel/', cancel_registration, name='cancel_registration'),
+  path('categories/<int:category_id>/', category_events, name='category_events'),
+  path('tags/<str:tag_name>/', tag_detail, name='tag_detail'),
+  path('search/', search_view, name='search'),
 ]
\ No newline at end of file
@@ -0,0 +1,82 @@
+import io
+import os
+
+from PIL import Image as PILImage
+from PIL import ImageOps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import IntegrityError, transaction
+
+from .models import ImageVariant
+
+SAVE_OPTIONS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'avif': {'format': 'AVIF', 'quality': 60},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+CONTENT_TYPES = {
+    'webp': 'image/webp',
+    'avif': 'image/avif',
+    'jpeg': 'image/jpeg',
+}
+
+
+def variant_formats():
+    # AVIF n'est disponible qu'avec un Pillow compilé pour (ou le plugin pillow-avif)
+    PILImage.init()
+    formats = getattr(settings, 'IMAGE_VARIANT_FORMATS', ['avif', 'webp'])
+    return [fmt for fmt in formats if SAVE_OPTIONS[fmt]['format'] in PILImage.SAVE]
+
+
+def generate_variants(image_obj, force=False):
+    """Crée les miniatures de `image_obj` pour chaque largeur et format configurés.
+
+    L'original est décodé une seule fois ; les largeurs supérieures à celle de
+    l'original sont ignorées (on ne grossit pas une image).
+    """
+    if not image_obj.image:
+        return []
+
+    existing = set()
+    if force:
+        _delete_variants(image_obj)
+    else:
+        existing = set(image_obj.variants.values_list('format', 'width'))
+
+    widths = sorted(getattr(settings, 'IMAGE_VARIANT_WIDTHS', [160, 480, 960]))
+    with image_obj.image.open('rb') as fp:
+        original = PILImage.open(fp)
+        original.draft('RGB', (widths[-1], widths[-1]))
+        original = ImageOps.exif_transpose(original).convert('RGB')
+
+    base_name = os.path.splitext(os.path.basename(image_obj.image.name))[0]
+    variants = []
+    for i, width in enumerate(widths):
+        if width > original.width and i > 0:
+            break
+        resized = original.copy()
+        resized.thumbnail((width, width * 4))
+        for fmt in variant_formats():
+            if (fmt, resized.width) in existing:
+                continue
+            buffer = io.BytesIO()
+            resized.save(buffer, **SAVE_OPTIONS[fmt])
+            variant = ImageVariant(image=image_obj, format=fmt, width=resized.width, height=resized.height)
+            variant.file.save(f'{base_name}_{resized.width}.{fmt}', ContentFile(buffer.getvalue()), save=False)
+            try:
+                with transaction.atomic():
+                    variant.save()
+            except IntegrityError:
+                # Créée entre-temps (build concurrent, génération à la demande) :
+                # le fichier écrit n'a pas de ligne, il est supprimé
+                variant.file.delete(save=False)
+                continue
+            variants.append(variant)
+    return variants
+
+
+def _delete_variants(image_obj):
+    for variant in image_obj.variants.all():
+        variant.file.delete(save=False)
+    image_obj.variants.all().delete()
@@ -1,20 +1,29 @@
+import hashlib
+from datetime import datetime, timedelta
+
+from django.conf import settings
 from django.contrib.auth.forms import UserCreationForm
-from django.urls import reverse_lazy
+from django.core.exceptions import ValidationError
+from django.urls import reverse, reverse_lazy
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.views.generic import CreateView, TemplateView
+from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.shortcuts import render, redirect
-from .models import Answers, Categories, EventReviews, Events, Image, Tags
-import os
-import torch
-from torchvision import models
-from PIL import Image as PILImage
-from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse, QueryDict, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, render, redirect
+from . import aggregates, archive, booking, caching, chunked_uploads, event_io, feeds, metrics
+from .models import Answers, Categories, EventReviews, Events, Image, Registration, Tags, UploadSession
+from .pagination import paginate_keyset
+from .search import search
+from .tag_service import events_by_tag, images_by_tag
+from .uploads import save_upload, validate_image
 
-weights = models.EfficientNet_B3_Weights.IMAGENET1K_V1
-model = models.efficientnet_b3(weights=weights)
-model.eval()
-labels = weights.meta["categories"]
-transform = weights.transforms()
+EVENTS_PER_PAGE = 20
+TAGGED_IMAGES_LIMIT = 50
+SEARCH_RESULTS_PER_PAGE = 20
 
 class SignUpView(CreateView):
     form_class = UserCreationForm
@@ -28,23 +37,213 @@ class HomeView(LoginRequiredMixin, TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['events'] = Events.objects.order_by('date')[:5]  # Les 5 prochains événements
-        context['categories'] = Categories.objects.all()
+        version = caching.list_version()
+        context['events'] = caching.cached(
+            'home', 'events', version,
+            lambda: list(feeds.upcoming()[:5]),  # Les 5 prochains événements
+        )
+        context['categories'] = caching.cached('home', 'categories', version, lambda: list(Categories.objects.all()))
         return context
 
 
 def event_reviews(request, event_id):
-    reviews = EventReviews.objects.filter(event_id=event_id)
-    return render(request, 'event_reviews.html', {'reviews': reviews})
+    event = get_object_or_404(Events.objects.only('id', 'title'), id=event_id)
+    # Même fragment en cache que la page de détails : les avis ne sont lus
+    # (paresseusement) qu'en cas d'absence du fragment
+    return render(request, 'event_reviews.html', {
+        'event': event,
+        'reviews': _reviews_queryset().filter(event_id=event_id),
+        'cache_version': caching.event_version(event_id),
+        'cache_timeout': settings.PAGE_CACHE_TIMEOUT,
+    })
+
+def _day_start(value):
+    try:
+        day = parse_date(value)
+    except ValueError:
+        return None
+    if day is None:
+        return None
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+def _event_filters(params):
+    return {
+        'category': params.get('category', ''),
+        'tag': params.get('tag', ''),
+        'date_from': params.get('date_from', ''),
+        'date_to': params.get('date_to', ''),
+        'sort': params.get('sort', ''),
+    }
+
+# Tris de la liste (`?sort=`) : champs du curseur, chacun servi par un index
+EVENT_SORTS = {
+    '': ('date', 'id'),
+    'rating': ('-avg_rating', '-id'),
+}
+
+def _event_sort(filters):
+    return EVENT_SORTS.get(filters['sort'], EVENT_SORTS[''])
 
 def event_list(request):
-    events = Events.objects.all()
-    return render(request, 'event_list.html', {'events': events})
+    filters = _event_filters(request.GET)
+    cache_key = hashlib.sha1(request.GET.urlencode().encode()).hexdigest()
+    page, categories = caching.cached(
+        'event_list', cache_key, caching.list_version(),
+        lambda: _event_list_page(request.GET, filters),
+    )
+
+    # Les liens de pagination conservent les filtres
+    query = QueryDict(mutable=True)
+    query.update({key: value for key, value in filters.items() if value})
+    return render(request, 'event_list.html', {
+        'events': page,
+        'page': page,
+        'filters': filters,
+        'filter_query': query.urlencode(),
+        'categories': categories,
+    })
+
+def _filter_events(filters):
+    events = Events.objects.select_related('category')
+    if filters['category'].isdigit():
+        events = events.filter(category_id=filters['category'])
+    if filters['tag']:
+        tagged = Image.objects.filter(tags__name=filters['tag']).values('event_id')
+        events = events.filter(id__in=tagged)
+    # Bornes en datetime (et non `date__date`) pour que l'index sur `date` serve
+    date_from = _day_start(filters['date_from'])
+    if date_from:
+        events = events.filter(date__gte=date_from)
+    date_to = _day_start(filters['date_to'])
+    if date_to:
+        events = events.filter(date__lt=date_to + timedelta(days=1))
+    return events
+
+def _event_list_page(params, filters):
+    events = _filter_events(filters)
+    try:
+        page = paginate_keyset(
+            events,
+            fields=_event_sort(filters),
+            after=params.get('after'),
+            before=params.get('before'),
+            page_size=EVENTS_PER_PAGE,
+        )
+    except ValueError:
+        page = paginate_keyset(events, fields=_event_sort(filters), page_size=EVENTS_PER_PAGE)
+    return page, list(Categories.objects.all())
 
 def event_details(request, event_id):
-    event = Events.objects.get(id=event_id)
-    reviews = EventReviews.objects.filter(event_id=event_id)
-    return render(request, 'event_details.html', {'event': event, 'reviews': reviews})
+    version = caching.event_version(event_id)
+    try:
+        event = caching.cached('event_details', event_id, version, lambda: _load_event(event_id))
+    except Events.DoesNotExist:
+        # Les événements archivés restent consultables à la même adresse
+        return _archived_event_details(request, archive.lookup(event_id))
+    # Propre à chaque visiteur : hors cache
+    registration = None
+    if request.user.is_authenticated:
+        registration = (
+            Registration.objects.filter(event_id=event_id, user=request.user)
+            .exclude(status=Registration.CANCELLED)
+            .first()
+        )
+    return render(request, 'event_details.html', {
+        'event': event,
+        'reviews': event.reviews.all(),
+        'registration': registration,
+        'cache_version': version,
+        'cache_timeout': settings.PAGE_CACHE_TIMEOUT,
+    })
+
+def _archived_event_details(request, archived):
+    if archived is None:
+        raise Http404('Événement introuvable')
+    images = archive.images_of(archived)
+    reviews = [
+        {**review, 'images': [image for image in images if image['review'] == review['id']]}
+        for review in archived.data['reviews']
+    ]
+    return render(request, 'archived_event.html', {
+        'event': archived,
+        'data': archived.data,
+        'images': [image for image in images if image['review'] is None],
+        'reviews': reviews,
+    })
+
+def _load_event(event_id):
+    return _event_details_queryset().get(id=event_id)
+
+def _images_queryset():
+    return Image.objects.prefetch_related('tags', 'variants').order_by('id')
+
+def _reviews_queryset():
+    answers = Answers.objects.select_related('created_by').order_by('created_at', 'id')
+    return (
+        EventReviews.objects
+        .select_related('created_by')
+        .prefetch_related(
+            Prefetch('answers_set', queryset=answers),
+            Prefetch('images', queryset=_images_queryset()),
+        )
+        .order_by('created_at', 'id')
+    )
+
+def _event_details_queryset():
+    # Tout ce qu'affiche le template est chargé en un nombre fixe de requêtes,
+    # quel que soit le nombre d'avis, de réponses ou d'images.
+    return (
+        Events.objects
+        .select_related('category')
+        .prefetch_related(
+            Prefetch('reviews', queryset=_reviews_queryset()),
+            Prefetch('images', queryset=_images_queryset().filter(review__isnull=True)),
+        )
+    )
+
+def search_view(request):
+    query = request.GET.get('q', '').strip()
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    results, has_next = search(query, page=page, per_page=SEARCH_RESULTS_PER_PAGE) if query else ([], False)
+    return render(request, 'search.html', {
+        'query': query,
+        'results': results,
+        'page': page,
+        'has_next': has_next,
+    })
+
+def tag_detail(request, tag_name):
+    try:
+        min_confidence = float(request.GET.get('min_confidence', 0))
+    except ValueError:
+        min_confidence = 0.0
+    image_tags = images_by_tag(tag_name, min_confidence).prefetch_related('image__variants')[:TAGGED_IMAGES_LIMIT]
+    return render(request, 'tag_detail.html', {
+        'tag_name': tag_name,
+        'min_confidence': min_confidence,
+        'image_tags': image_tags,
+        'events': events_by_tag(tag_name, min_confidence),
+        'upcoming': _tag_upcoming(tag_name),
+    })
+
+def _tag_upcoming(tag_name):
+    tag_id = Tags.objects.filter(name=tag_name).values_list('id', flat=True).first()
+    if tag_id is None:
+        return []
+    return feeds.upcoming(feeds.tag_feed(tag_id))[:TAGGED_IMAGES_LIMIT]
+
+def _parse_places(value):
+    """Nombre de places saisi : entier positif ou nul, sinon ValidationError."""
+    try:
+        places = int(value)
+    except (TypeError, ValueError):
+        raise ValidationError('Nombre de places invalide.')
+    if places < 0:
+        raise ValidationError('Le nombre de places ne peut pas être négatif.')
+    return places
 
 def add_event(request):
     categories = Categories.objects.all()
@@ -53,8 +252,13 @@ def add_event(request):
         category_id = request.POST.get('category')
         date = request.POST.get('date')
         location = request.POST.get('location')
-        places = request.POST.get('places')
         uploaded_file = request.FILES.get('image')
+        try:
+            places = _parse_places(request.POST.get('places'))
+            if uploaded_file:
+                validate_image(uploaded_file)
+        except ValidationError as exc:
+            return render(request, 'add_event.html', {'categories': categories, 'error': exc.messages[0]})
         event = Events.objects.create(
             title=title,
             category_id=category_id,
@@ -64,20 +268,7 @@ def add_event(request):
             created_by=request.user
         )
         if uploaded_file:
-            image_obj = Image.objects.create(event=event, image=uploaded_file)
-
-            img_path = os.path.join(settings.MEDIA_ROOT, str(image_obj.image))
-            pil_img = PILImage.open(img_path).convert("RGB")
-            input_tensor = transform(pil_img).unsqueeze(0)
-
-            with torch.no_grad():
-                outputs = model(input_tensor)
-                _, indices = outputs.topk(5)
-                predicted_tags = [labels[idx] for idx in indices[0]]
-
-            for tag_name in predicted_tags:
-                tag, _ = Tags.objects.get_or_create(name=tag_name)
-                image_obj.tags.add(tag)
+            save_upload(uploaded_file, event=event)
         return redirect('home')
     return render(request, 'add_event.html', {'categories': categories})
 
@@ -85,11 +276,13 @@ def add_answer(request, review_id):
     if request.method == 'POST':
         answer_text = request.POST.get('answer_text')
         review = EventReviews.objects.get(id=review_id)
-        Answers.objects.create(
-            review=review,
-            answer_text=answer_text,
-            created_by=request.user
-        )
+        with transaction.atomic():
+            answer = Answers.objects.create(
+                review=review,
+                answer_text=answer_text,
+                created_by=request.user
+            )
+            aggregates.answer_added(answer)
         return redirect('accounts:event_details', event_id=review.event.id)
     return render(request, 'add_answer.html', {'review_id': review_id})
 
@@ -98,12 +291,14 @@ def add_review(request, event_id):
         review_text = request.POST.get('review_text')
         rating = request.POST.get('rating')
         event = Events.objects.get(id=event_id)
-        EventReviews.objects.create(
-            event=event,
-            review_text=review_text,
-            rating=rating,
-            created_by=request.user
-        )
+        with transaction.atomic():
+            review = EventReviews.objects.create(
+                event=event,
+                review_text=review_text,
+                rating=rating,
+                created_by=request.user
+            )
+            aggregates.review_added(review)
         return redirect('accounts:event_details', event_id=event_id)
     return render(request, 'add_review.html')
 
@@ -112,52 +307,133 @@ def add_image(request, event_id=None, review_id=None):
         uploaded_file = request.FILES.get('image') 
         if not uploaded_file:
             return render(request, 'add_image.html', {'event_id': event_id, 'review_id': review_id, 'error': 'Aucune image envoyée'})
+        try:
+            validate_image(uploaded_file)
+        except ValidationError as exc:
+            return render(request, 'add_image.html', {'event_id': event_id, 'review_id': review_id, 'error': exc.messages[0]})
 
         if event_id:
             event = Events.objects.get(id=event_id)
-            image_obj = Image.objects.create(event=event, image=uploaded_file)
+            image_obj = save_upload(uploaded_file, event=event)
         elif review_id:
             review = EventReviews.objects.get(id=review_id)
-            image_obj = Image.objects.create(review=review, image=uploaded_file)
+            image_obj = save_upload(uploaded_file, event=review.event, review=review)
+
+        return redirect('accounts:event_details', event_id=image_obj.event.id if event_id else review.event.id)
 
-        
-        img_path = os.path.join(settings.MEDIA_ROOT, str(image_obj.image))
-        pil_img = PILImage.open(img_path).convert("RGB")
-        input_tensor = transform(pil_img).unsqueeze(0)
+    return render(request, 'add_image.html', {'event_id': event_id, 'review_id': review_id})
 
-        with torch.no_grad():
-            outputs = model(input_tensor)
-            _, indices = outputs.topk(5)
-            predicted_tags = [labels[idx] for idx in indices[0]]
+def _upload_state(session, status=200, error=None):
+    response = JsonResponse({
+        'id': str(session.id),
+        'offset': session.received,
+        'size': session.size,
+        'status': session.status,
+        'image': session.image_id,
+        'error': error or session.error,
+    }, status=status)
+    response['Upload-Offset'] = str(session.received)
+    return response
 
-       
-        for tag_name in predicted_tags:
-            tag, _ = Tags.objects.get_or_create(name=tag_name)
-            image_obj.tags.add(tag)
+def start_upload(request):
+    """Ouvre un envoi par morceaux : event, review (facultatif), filename, size."""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Méthode non autorisée'}, status=405)
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Authentification requise'}, status=401)
+    try:
+        event = Events.objects.get(id=request.POST.get('event'))
+        review = None
+        if request.POST.get('review'):
+            review = EventReviews.objects.get(id=request.POST['review'], event=event)
+        size = int(request.POST.get('size', ''))
+        session = chunked_uploads.start(request.user, event, request.POST.get('filename', ''), size, review=review)
+    except (ValueError, Events.DoesNotExist, EventReviews.DoesNotExist):
+        return JsonResponse({'error': 'Paramètres invalides'}, status=400)
+    except ValidationError as exc:
+        return JsonResponse({'error': exc.messages[0]}, status=413)
+    response = _upload_state(session, status=201)
+    response['Location'] = reverse('accounts:upload_session', args=[session.id])
+    return response
 
-        return redirect('accounts:event_details', event_id=image_obj.event.id if event_id else review.event.id)
+def upload_session(request, upload_id):
+    """GET : position reçue (pour reprendre) ; PATCH : ajoute un morceau à `Upload-Offset`."""
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Authentification requise'}, status=401)
+    session = get_object_or_404(UploadSession, id=upload_id, user=request.user)
+    if request.method == 'GET':
+        return _upload_state(session)
+    if request.method != 'PATCH':
+        return JsonResponse({'error': 'Méthode non autorisée'}, status=405)
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+        length = int(request.headers.get('Content-Length', ''))
+    except ValueError:
+        return JsonResponse({'error': 'En-têtes Upload-Offset et Content-Length requis'}, status=400)
+    if length > chunked_uploads.max_chunk_bytes():
+        return JsonResponse({'error': 'Morceau trop gros'}, status=413)
+    try:
+        # Le corps est lu par blocs depuis le flux de la requête, jamais en entier
+        chunked_uploads.append(session, offset, request, length)
+    except chunked_uploads.UploadConflict as exc:
+        session.refresh_from_db()
+        return _upload_state(session, status=409, error=str(exc))
+    except chunked_uploads.UploadInterrupted as exc:
+        session.refresh_from_db()
+        return _upload_state(session, status=400, error=str(exc))
+    except ValidationError as exc:
+        return JsonResponse({'error': exc.messages[0]}, status=400)
+    return _upload_state(session)
 
-    return render(request, 'add_image.html', {'event_id': event_id, 'review_id': review_id})
+def complete_upload(request, upload_id):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Méthode non autorisée'}, status=405)
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Authentification requise'}, status=401)
+    session = get_object_or_404(UploadSession, id=upload_id, user=request.user)
+    try:
+        chunked_uploads.complete(session)
+    except chunked_uploads.UploadConflict as exc:
+        session.refresh_from_db()
+        return _upload_state(session, status=409, error=str(exc))
+    # Validation, stockage et tagging par `run_tagger`, en arrière-plan
+    return _upload_state(session, status=202)
 
 def update_event(request, event_id):
     event = Events.objects.get(id=event_id)
     categories = Categories.objects.all()
     if request.method == 'POST':
+        try:
+            places = _parse_places(request.POST.get('places'))
+        except ValidationError as exc:
+            return render(request, 'update_event.html', {
+                'event': event, 'categories': categories, 'error': exc.messages[0],
+            })
+        delta = places - event.places
         event.title = request.POST.get('title')
         event.category_id = request.POST.get('category')
         event.date = request.POST.get('date')
         event.location = request.POST.get('location')
-        event.places = request.POST.get('places')
-        event.save()
+        event.places = places
+        try:
+            with transaction.atomic():
+                # places_left est tenu par booking : jamais écrasé par save()
+                event.save(update_fields=['title', 'category', 'date', 'location', 'places'])
+                booking.change_capacity(event.id, delta)
+        except booking.BookingError as exc:
+            return render(request, 'update_event.html', {'event': event, 'categories': categories, 'error': str(exc)})
         return redirect('home')
     return render(request, 'update_event.html', {'event': event, 'categories': categories})
 
 def update_review(request, review_id):
     review = EventReviews.objects.get(id=review_id)
     if request.method == 'POST':
+        old_rating = review.rating
         review.review_text = request.POST.get('review_text')
         review.rating = request.POST.get('rating')
-        review.save()
+        with transaction.atomic():
+            review.save()
+            aggregates.review_rating_changed(review, old_rating)
         return redirect('home', event_id=review.event.id)
     return render(request, 'update_review.html', {'review': review})
 
@@ -180,17 +456,76 @@ def delete_review(request, review_id):
     review = EventReviews.objects.get(id=review_id)
     if request.method == 'POST':
         event_id = review.event.id
-        review.delete()
+        with transaction.atomic():
+            aggregates.review_removed(review)
+            review.delete()
         return redirect('home', event_id=event_id)
     return render(request, 'delete_review.html', {'review': review})
 
 def delete_answer(request, answer_id):
     answer = Answers.objects.get(id=answer_id)
     if request.method == 'POST':
-        answer.delete()
+        with transaction.atomic():
+            aggregates.answer_removed(answer)
+            answer.delete()
         return redirect('home', event_id=answer.review.event.id)
     return render(request, 'delete_answer.html', {'answer': answer})
 
+@login_required(login_url='accounts:login')
+def book_event(request, event_id):
+    if request.method == 'POST':
+        try:
+            booking.book(event_id, request.user)
+        except Events.DoesNotExist:
+            raise Http404
+        except booking.BookingError:
+            pass  # Déjà inscrit : la page affiche l'inscription existante
+    return redirect('accounts:event_details', event_id=event_id)
+
+@login_required(login_url='accounts:login')
+def cancel_registration(request, registration_id):
+    registration = get_object_or_404(Registration, id=registration_id, user=request.user)
+    if request.method == 'POST':
+        booking.cancel(registration)
+    return redirect('accounts:event_details', event_id=registration.event_id)
+
+def export_events(request):
+    # Réponse en streaming : les événements sont lus et envoyés par paquets,
+    # la mémoire ne dépend pas du nombre de lignes
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in event_io.FORMATS:
+        fmt = 'csv'
+    rows = event_io.export_rows(_filter_events(_event_filters(request.GET)))
+    content_type = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    response = StreamingHttpResponse(event_io.serialize(rows, fmt), content_type=f'{content_type}; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="events.{fmt}"'
+    return response
+
+def metrics_view(request):
+    # Format texte Prometheus ; le registre est propre à chaque processus
+    allowed_ips = getattr(settings, 'METRICS_ALLOWED_IPS', [])
+    if not request.user.is_staff and request.META.get('REMOTE_ADDR') not in allowed_ips:
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def category_events(request, category_id):
+    """Événements à venir d'une catégorie, lus dans son flux matérialisé."""
+    cache_key = hashlib.sha1(f'{category_id}:{request.GET.urlencode()}'.encode()).hexdigest()
+    category, page = caching.cached(
+        'category_events', cache_key, caching.list_version(),
+        lambda: (get_object_or_404(Categories, id=category_id),
+                 _feed_page(feeds.category_feed(category_id), request.GET)),
+    )
+    return render(request, 'category_events.html', {'category': category, 'events': page, 'page': page})
+
+def _feed_page(feed, params):
+    entries = feeds.upcoming(feed)
+    try:
+        return paginate_keyset(entries, fields=('date', 'event_id'), after=params.get('after'),
+                               before=params.get('before'), page_size=EVENTS_PER_PAGE)
+    except ValueError:
+        return paginate_keyset(entries, fields=('date', 'event_id'), page_size=EVENTS_PER_PAGE)
+
 def category_list(request):
     categories = Categories.objects.all()
     return render(request, 'category_list.html', {'categories': categories})
\ No newline at end of file
@@ -0,0 +1,117 @@
+"""Débit, latence, taille des réponses et requêtes SQL par endpoint de l'API JSON.
+
+Compare notamment une liste complète à sa version `fields=` (colonnes lues
+en base réduites), l'effet de `expand=` (une requête par relation, quel que
+soit le nombre d'objets) et les GET conditionnels (304, sans requête SQL).
+
+    python benchmarks/api.py [--events 2000] [--requests 200] [--output results.json]
+"""
+import argparse
+import io
+import json
+import random
+import statistics
+import tempfile
+import time
+
+from common import setup_django, test_database
+
+setup_django()
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import Events
+
+
+def scenarios(event_ids):
+    """(nom, méthode, fabrique de (url, corps), en-têtes, statut attendu)."""
+    rng = random.Random(0)
+
+    def event_url(query=''):
+        return lambda: (f'/api/events/{rng.choice(event_ids)}/{query}', None)
+
+    def create_review():
+        body = {'event': rng.choice(event_ids), 'review_text': 'Très bonne ambiance', 'rating': rng.randint(1, 5)}
+        return '/api/reviews/', json.dumps(body)
+
+    return [
+        ('events', 'get', lambda: ('/api/events/', None), {}, 200),
+        ('events_fields', 'get', lambda: ('/api/events/?fields=id,title,date', None), {}, 200),
+        ('events_expand', 'get', lambda: ('/api/events/?expand=category,reviews', None), {}, 200),
+        ('event', 'get', event_url(), {}, 200),
+        ('event_expand', 'get', event_url('?expand=category,reviews,images'), {}, 200),
+        ('reviews_by_event', 'get', lambda: (f'/api/reviews/?event={rng.choice(event_ids)}&expand=answers', None),
+         {}, 200),
+        ('events_304', 'get', lambda: ('/api/events/', None), {'conditional': True}, 304),
+        ('event_304', 'get', event_url(), {'conditional': True}, 304),
+        ('review_create', 'post', create_review, {}, 201),
+    ]
+
+
+def run_scenario(client, method, make_request, options, expected, requests):
+    latencies, queries, sizes, errors = [], [], [], 0
+    for i in range(requests + 1):
+        url, body = make_request()
+        headers = {}
+        if options.get('conditional'):
+            # ETag obtenu par un premier GET, comme le ferait un client qui interroge
+            headers['HTTP_IF_NONE_MATCH'] = client.get(url)['ETag']
+        kwargs = {'data': body, 'content_type': 'application/json'} if method == 'post' else {}
+        start = time.perf_counter()
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(client, method)(url, **kwargs, **headers)
+        elapsed = (time.perf_counter() - start) * 1000
+        if i == 0:
+            continue  # Premier appel hors mesure
+        latencies.append(elapsed)
+        queries.append(len(ctx))
+        sizes.append(len(response.content))
+        errors += response.status_code != expected
+
+    latencies.sort()
+    return {
+        'throughput_rps': round(len(latencies) / (sum(latencies) / 1000), 1),
+        'p50_ms': round(statistics.median(latencies), 2),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1], 2),
+        'queries': round(statistics.mean(queries), 1),
+        'bytes': round(statistics.mean(sizes)),
+        'errors': errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--events', type=int, default=2000)
+    parser.add_argument('--reviews', type=int, default=10, help='Avis par événement (moyenne)')
+    parser.add_argument('--requests', type=int, default=200, help='Requêtes par endpoint')
+    parser.add_argument('--only', nargs='*', help='Endpoints à mesurer')
+    parser.add_argument('--output', help='Écrit les résultats en JSON')
+    args = parser.parse_args()
+
+    with override_settings(MEDIA_ROOT=tempfile.mkdtemp()), test_database():
+        call_command('generate_data', events=args.events, reviews=args.reviews, users=10, stdout=io.StringIO())
+        client = Client()
+        client.force_login(User.objects.first())
+        event_ids = list(Events.objects.values_list('id', flat=True))
+
+        results = {}
+        for name, method, make_request, options, expected in scenarios(event_ids):
+            if args.only and name not in args.only:
+                continue
+            results[name] = r = run_scenario(client, method, make_request, options, expected, args.requests)
+            print(f"{name:<18} {r['throughput_rps']:>8} req/s  p50 {r['p50_ms']:>7} ms  p95 {r['p95_ms']:>7} ms  "
+                  f"SQL {r['queries']:>5}  {r['bytes']:>7} octets  erreurs {r['errors']}")
+
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump({'options': vars(args), 'database': connection.vendor, 'results': results}, fp,
+                      indent=2, ensure_ascii=False)
+            fp.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""Test de charge des réservations : aucune surréservation sous concurrence.
+
+De nombreux threads réservent le même événement via l'endpoint, puis une
+seconde vague mélange annulations (avec promotion de la liste d'attente) et
+nouvelles réservations. Les invariants sont vérifiés à la fin ; le script
+sort en erreur au premier écart.
+
+    python benchmarks/booking_stress.py
+    DB_PROFILE=postgres POSTGRES_HOST=... python benchmarks/booking_stress.py --threads 64
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from common import setup_django, test_database
+
+setup_django()
+
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.db.models import Count
+from django.test import Client
+from django.utils import timezone
+
+from accounts.models import Categories, Events, Registration
+
+
+def run_threads(targets):
+    errors = []
+    barrier = threading.Barrier(len(targets))
+
+    def wrap(target):
+        barrier.wait()
+        try:
+            target()
+        except Exception as exc:
+            errors.append(repr(exc))
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=wrap, args=(target,)) for target in targets]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, errors
+
+
+def client_for(user):
+    client = Client()
+    client.force_login(user)
+    return client
+
+
+def booker(user, event_id, attempts):
+    def run():
+        client = client_for(user)
+        # Plusieurs essais par utilisateur : les doublons doivent être refusés
+        for _ in range(attempts):
+            response = client.post(f'/accounts/events/{event_id}/book/')
+            if response.status_code != 302:
+                raise AssertionError(f'réservation : HTTP {response.status_code}')
+    return run
+
+
+def canceller(user, registration_id):
+    def run():
+        response = client_for(user).post(f'/accounts/registrations/{registration_id}/cancel/')
+        if response.status_code != 302:
+            raise AssertionError(f'annulation : HTTP {response.status_code}')
+    return run
+
+
+def check(event):
+    event.refresh_from_db()
+    counts = dict(Registration.objects.filter(event=event).values_list('status').annotate(n=Count('id')))
+    confirmed = counts.get(Registration.CONFIRMED, 0)
+    waitlisted = counts.get(Registration.WAITLISTED, 0)
+    duplicates = (
+        Registration.objects.filter(event=event).exclude(status=Registration.CANCELLED)
+        .values('user').annotate(n=Count('id')).filter(n__gt=1).count()
+    )
+    print(f'  confirmées {confirmed}/{event.places}, en attente {waitlisted}, '
+          f'places restantes {event.places_left}')
+    problems = []
+    if confirmed > event.places:
+        problems.append('surréservation')
+    if confirmed + event.places_left != event.places:
+        problems.append('places_left incohérent')
+    if event.places_left > 0 and waitlisted:
+        problems.append("places libres alors que la liste d'attente n'est pas vide")
+    if duplicates:
+        problems.append(f'{duplicates} utilisateur(s) inscrit(s) deux fois')
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=48)
+    parser.add_argument('--places', type=int, default=20)
+    parser.add_argument('--attempts', type=int, default=3, help='Réservations tentées par utilisateur')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    if connection.vendor == 'sqlite':
+        connection.settings_dict['TEST']['NAME'] = os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')
+
+    with test_database():
+        users = [User.objects.create_user(f'stress{i}') for i in range(args.threads * 2)]
+        first_wave, second_wave = users[:args.threads], users[args.threads:]
+        category = Categories.objects.create(name='Stress')
+        event = Events.objects.create(title='Stress', category=category, date=timezone.now(),
+                                      location='Paris', places=args.places, created_by=users[0])
+
+        print(f'{args.threads} threads réservent {args.places} places ({args.attempts} essais chacun)')
+        elapsed, errors = run_threads([booker(user, event.id, args.attempts) for user in first_wave])
+        print(f'  {elapsed:.2f} s, erreurs : {len(errors)} {errors[:3] if errors else ""}')
+        problems = check(event)
+
+        confirmed = list(Registration.objects.filter(event=event, status=Registration.CONFIRMED)
+                         .select_related('user'))
+        cancelled = random.sample(confirmed, len(confirmed) // 2)
+        print(f'{len(cancelled)} annulations et {len(second_wave)} réservations simultanées')
+        elapsed, more_errors = run_threads(
+            [canceller(r.user, r.id) for r in cancelled]
+            + [booker(user, event.id, 1) for user in second_wave]
+        )
+        errors += more_errors
+        print(f'  {elapsed:.2f} s, erreurs : {len(more_errors)} {more_errors[:3] if more_errors else ""}')
+        problems += check(event)
+
+    if problems or errors:
+        print('ÉCHEC : ' + ', '.join(problems + [f'{len(errors)} requête(s) en erreur'] * bool(errors)))
+        sys.exit(1)
+    print('OK : aucune surréservation')
+
+
+if __name__ == '__main__':
+    main()
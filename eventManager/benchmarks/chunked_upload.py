@@ -0,0 +1,194 @@
+"""Mémoire du serveur pendant un envoi par morceaux, selon la taille du fichier.
+
+Un vrai serveur WSGI (wsgiref) tourne dans un processus enfant, avec un
+thread qui finalise les envois comme le fait `run_tagger`. Le processus
+parent envoie le fichier par HTTP, morceau par morceau, et relève le RSS du
+serveur toutes les 20 ms (/proc, Linux). Le RSS ne doit pas suivre la taille
+du fichier : le script sort en erreur si le pic dépasse le RSS de départ de
+plus de --max-growth Mo.
+
+    python benchmarks/chunked_upload.py [--sizes 20 200] [--chunk-size 4]
+"""
+import argparse
+import http.client
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+CSRF_TOKEN = 'benchmarkcsrftokenbenchmarkcsrft'  # 32 caractères : secret CSRF non masqué
+MB = 1024 * 1024
+
+
+def serve():
+    """Processus enfant : base de test, serveur WSGI et finalisation en arrière-plan."""
+    from common import setup_django, test_database
+
+    setup_django()
+    from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.core.wsgi import get_wsgi_application
+    from django.db import close_old_connections, connection
+    from django.test import Client
+    from django.utils import timezone
+
+    from accounts import chunked_uploads
+    from accounts.models import Categories, Events
+
+    # Sans le journal des requêtes SQL de DEBUG, qui fausserait la mesure
+    settings.DEBUG = False
+    settings.ALLOWED_HOSTS = ['127.0.0.1']
+    workdir = tempfile.mkdtemp()
+    settings.MEDIA_ROOT = os.path.join(workdir, 'media')
+    settings.CHUNKED_UPLOAD_DIR = os.path.join(workdir, 'chunks')
+    # Base partagée par le serveur et le thread de finalisation
+    connection.settings_dict['TEST']['NAME'] = os.path.join(workdir, 'bench.sqlite3')
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    with test_database():
+        user = User.objects.create_user('upload')
+        event = Events.objects.create(title='Bench', category=Categories.objects.create(name='Bench'),
+                                      date=timezone.now(), location='Paris', places=10, created_by=user)
+        client = Client()
+        client.force_login(user)
+
+        def finalizer():
+            while True:
+                chunked_uploads.finalize_pending()
+                close_old_connections()
+                time.sleep(0.1)
+
+        threading.Thread(target=finalizer, daemon=True).start()
+        server = make_server('127.0.0.1', 0, get_wsgi_application(), handler_class=QuietHandler)
+        print(json.dumps({'port': server.server_port, 'event': event.id,
+                          'session': client.cookies[settings.SESSION_COOKIE_NAME].value}), flush=True)
+        server.serve_forever()
+
+
+def rss_mb(pid):
+    with open(f'/proc/{pid}/status') as fp:
+        for line in fp:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+class Sampler(threading.Thread):
+    def __init__(self, pid):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.peak = 0.0
+        self.running = True
+
+    def run(self):
+        while self.running:
+            self.peak = max(self.peak, rss_mb(self.pid))
+            time.sleep(0.02)
+
+
+def jpeg_header():
+    from PIL import Image as PILImage
+
+    buffer = io.BytesIO()
+    PILImage.new('RGB', (640, 480), 'red').save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+def upload(conn, headers, event_id, size, chunk_size):
+    """Envoie `size` octets (une image JPEG suivie de bourrage) ; renvoie l'URL de la session."""
+    body = f'event={event_id}&filename=bench.jpg&size={size}'
+    conn.request('POST', '/accounts/uploads/', body,
+                 {**headers, 'Content-Type': 'application/x-www-form-urlencoded'})
+    response = conn.getresponse()
+    response.read()
+    assert response.status == 201, response.status
+    url = response.getheader('Location')
+
+    header = jpeg_header()
+    offset = 0
+    while offset < size:
+        length = min(chunk_size, size - offset)
+        # Morceaux générés à la volée : le client non plus ne garde pas le fichier en mémoire
+        chunk = (header + os.urandom(length))[:length] if offset == 0 else os.urandom(length)
+        conn.request('PATCH', url, chunk, {**headers, 'Upload-Offset': str(offset),
+                                           'Content-Type': 'application/offset+octet-stream'})
+        response = conn.getresponse()
+        state = json.loads(response.read())
+        assert response.status == 200, (response.status, state)
+        offset = state['offset']
+
+    conn.request('POST', url + 'complete/', '', headers)
+    response = conn.getresponse()
+    response.read()
+    assert response.status == 202, response.status
+    return url
+
+
+def wait_done(conn, headers, url, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        conn.request('GET', url, headers=headers)
+        state = json.loads(conn.getresponse().read())
+        if state['status'] in ('done', 'failed'):
+            return state
+        time.sleep(0.1)
+    raise TimeoutError(url)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[20, 200], help='Tailles de fichier (Mo)')
+    parser.add_argument('--chunk-size', type=int, default=4, help='Taille des morceaux (Mo)')
+    parser.add_argument('--max-growth', type=float, default=32, help='Hausse de RSS tolérée (Mo)')
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve()
+        return
+
+    failed = False
+    for size_mb in args.sizes:
+        # Un serveur neuf par taille : les mesures ne se cumulent pas
+        server = subprocess.Popen([sys.executable, __file__, '--serve'], stdout=subprocess.PIPE, text=True)
+        try:
+            info = json.loads(server.stdout.readline())
+            conn = http.client.HTTPConnection('127.0.0.1', info['port'], timeout=60)
+            headers = {'Cookie': f"sessionid={info['session']}; csrftoken={CSRF_TOKEN}", 'X-CSRFToken': CSRF_TOKEN}
+
+            # Chauffe (imports, premières requêtes) hors mesure
+            wait_done(conn, headers, upload(conn, headers, info['event'], MB, MB))
+            start_rss = rss_mb(server.pid)
+            sampler = Sampler(server.pid)
+            sampler.start()
+
+            start = time.perf_counter()
+            url = upload(conn, headers, info['event'], size_mb * MB, args.chunk_size * MB)
+            sent = time.perf_counter() - start
+            state = wait_done(conn, headers, url)
+            finalized = time.perf_counter() - start - sent
+            sampler.running = False
+            sampler.join()
+        finally:
+            server.terminate()
+            server.wait()
+
+        growth = sampler.peak - start_rss
+        failed |= growth > args.max_growth or state['status'] != 'done'
+        print(f'{size_mb:>5} Mo  envoi {size_mb / sent:>6.0f} Mo/s  finalisation {finalized:>5.2f} s  '
+              f'RSS serveur {start_rss:.1f} Mo, pic {sampler.peak:.1f} Mo (+{growth:.1f})  {state["status"]}')
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+"""Outils partagés par les benchmarks qui ont besoin de Django.
+
+Les scripts tournent sur une base de test jetable (comme `manage.py test`),
+jamais sur db.sqlite3.
+"""
+import contextlib
+import os
+import sys
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup_django():
+    sys.path.insert(0, PROJECT_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'eventManager.settings')
+    import django
+
+    django.setup()
+
+
+@contextlib.contextmanager
+def test_database(keepdb=False):
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, keepdb=keepdb)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+        teardown_test_environment()
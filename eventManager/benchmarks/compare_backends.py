@@ -0,0 +1,130 @@
+"""Compare les backends d'inférence du tagger sur un dossier d'images local.
+
+Pour chaque backend : latence (lot de 1), débit (lot de 32), mémoire résidente
+ajoutée et accord du top-5 avec le modèle PyTorch fp32 actuel. Chaque backend
+est mesuré dans un processus neuf : le pic de RSS de l'un ne se reporte pas
+sur les suivants.
+
+Usage : python benchmarks/compare_backends.py DOSSIER [--backends eager quantized onnx]
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import torch
+from PIL import Image as PILImage
+from torchvision import models
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from accounts.inference import BACKENDS, BatchEngine, build_backend
+
+EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.bmp')
+
+
+def load_images(folder):
+    paths = sorted(
+        os.path.join(folder, name) for name in os.listdir(folder)
+        if name.lower().endswith(EXTENSIONS)
+    )
+    if not paths:
+        sys.exit(f'Aucune image dans {folder}')
+    return [PILImage.open(path).convert('RGB') for path in paths]
+
+
+def rss_mb():
+    # RSS courant (/proc, Linux)
+    with open('/proc/self/status') as fp:
+        for line in fp:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def peak_rss_mb():
+    # ru_maxrss est en Ko sous Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(name, folder, runs, onnx_path):
+    """Processus enfant : mesure un backend et renvoie un dict sérialisable."""
+    weights = models.EfficientNet_B3_Weights.IMAGENET1K_V1
+    transform = weights.transforms()
+    images = load_images(folder)
+    model = models.efficientnet_b3(weights=weights)
+    model.eval()
+    rss_before = rss_mb()
+    try:
+        backend = build_backend(name, model, transform.crop_size[0], onnx_path=onnx_path)
+    except ImportError as exc:
+        return {'skipped': str(exc)}
+    engine = BatchEngine(backend, transform, weights.meta['categories'], max_batch_size=32)
+    engine.predict_batch(images[:1])  # échauffement / compilation
+
+    latencies = []
+    for i in range(runs):
+        start = time.perf_counter()
+        engine.predict_batch([images[i % len(images)]])
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    predictions = [[label for label, _ in tags] for tags in engine.predict_batch(images)]
+    return {
+        'latency_ms': statistics.median(latencies),
+        'throughput': len(images) / (time.perf_counter() - start),
+        # Pic du processus (construction, échauffement, inférence) moins le RSS
+        # avant le backend
+        'rss_added_mb': peak_rss_mb() - rss_before,
+        'predictions': predictions,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('folder')
+    parser.add_argument('--backends', nargs='+', default=BACKENDS, choices=BACKENDS)
+    parser.add_argument('--runs', type=int, default=20, help='Passes pour la latence')
+    parser.add_argument('--measure', choices=BACKENDS, help=argparse.SUPPRESS)
+    parser.add_argument('--onnx-path', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure, args.folder, args.runs, args.onnx_path)))
+        return
+
+    images = load_images(args.folder)
+    # Partagé entre les processus : l'export ONNX n'est fait qu'une fois
+    onnx_path = os.path.join(tempfile.mkdtemp(), 'efficientnet_b3.onnx')
+
+    reference = None
+    print(f'{len(images)} images, {torch.get_num_threads()} thread(s)\n')
+    print(f'{"backend":<12} {"latence ms":>10} {"images/s":>9} {"RSS +Mo":>8} {"top-5 identique":>16} {"recouvrement":>13}')
+    for name in ['eager'] + [b for b in args.backends if b != 'eager']:
+        child = subprocess.run(
+            [sys.executable, __file__, args.folder, '--measure', name, '--runs', str(args.runs),
+             '--onnx-path', onnx_path],
+            stdout=subprocess.PIPE, text=True, check=True,
+        )
+        result = json.loads(child.stdout.strip().splitlines()[-1])
+        if 'skipped' in result:
+            print(f'{name:<12} ignoré ({result["skipped"]})')
+            continue
+        predictions = result['predictions']
+        if reference is None:
+            reference = predictions
+        identical = sum(p == r for p, r in zip(predictions, reference)) / len(images)
+        overlap = statistics.mean(
+            len(set(p) & set(r)) / len(r) for p, r in zip(predictions, reference)
+        )
+        print(f'{name:<12} {result["latency_ms"]:>10.1f} {result["throughput"]:>9.1f} '
+              f'{result["rss_added_mb"]:>8.0f} {identical:>15.0%} {overlap:>13.0%}')
+
+
+if __name__ == '__main__':
+    main()
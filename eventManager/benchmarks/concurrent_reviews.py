@@ -0,0 +1,98 @@
+"""Débit de `add_review` sous écritures concurrentes, pour le profil de base actif.
+
+Lancer une fois par profil :
+    python benchmarks/concurrent_reviews.py
+    DB_PROFILE=postgres POSTGRES_HOST=... python benchmarks/concurrent_reviews.py
+
+Avec SQLite, la base de test est un vrai fichier (et non la base en mémoire
+habituelle des tests) pour que WAL et les verrous se comportent comme en
+développement.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from common import setup_django, test_database
+
+setup_django()
+
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.test import Client
+from django.utils import timezone
+
+from accounts.models import Categories, EventReviews, Events
+
+
+def worker(event_id, user, requests, latencies, errors, barrier):
+    client = Client()
+    client.force_login(user)
+    barrier.wait()
+    for i in range(requests):
+        start = time.perf_counter()
+        try:
+            response = client.post(
+                f'/accounts/events/{event_id}/add_review/',
+                {'review_text': f'Avis {i}', 'rating': str(i % 5 + 1)},
+            )
+            if response.status_code != 302:
+                errors.append(response.status_code)
+        except Exception as exc:
+            errors.append(repr(exc))
+        latencies.append((time.perf_counter() - start) * 1000)
+    connections.close_all()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=50, help='Requêtes par thread')
+    args = parser.parse_args()
+
+    db = connection.settings_dict
+    if connection.vendor == 'sqlite':
+        db['TEST']['NAME'] = os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')
+
+    with test_database():
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                print(f'SQLite, journal_mode={cursor.fetchone()[0]}')
+        else:
+            print(f"{connection.vendor}, CONN_MAX_AGE={db['CONN_MAX_AGE']}, pool={'pool' in db.get('OPTIONS', {})}")
+
+        users = [User.objects.create_user(f'bench{i}') for i in range(args.threads)]
+        category = Categories.objects.create(name='Bench')
+        event = Events.objects.create(title='Bench', category=category, date=timezone.now(),
+                                      location='Paris', places=100, created_by=users[0])
+
+        latencies, errors = [], []
+        barrier = threading.Barrier(args.threads + 1)
+        threads = [
+            threading.Thread(target=worker, args=(event.id, user, args.requests, latencies, errors, barrier))
+            for user in users
+        ]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        total = args.threads * args.requests
+        event.refresh_from_db()
+        latencies.sort()
+        print(f'{args.threads} threads x {args.requests} avis : {total / elapsed:.0f} avis/s')
+        print(f'latence p50 {statistics.median(latencies):.1f} ms, '
+              f'p99 {latencies[int(len(latencies) * 0.99) - 1]:.1f} ms')
+        print(f'erreurs : {len(errors)} {errors[:3] if errors else ""}')
+        print(f'avis en base : {EventReviews.objects.filter(event=event).count()}, '
+              f'review_count : {event.review_count}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+"""Débit, latences et nombre de requêtes SQL des pages principales.
+
+Les requêtes passent par le vrai URLconf (client de test Django, middleware
+compris) sur une base de test remplie par `manage.py generate_data`.
+
+    python benchmarks/endpoints.py                       # tableau des résultats
+    python benchmarks/endpoints.py --output results.json
+    python benchmarks/endpoints.py --baseline benchmarks/baselines/endpoints.json
+
+Avec --baseline, le script sort en erreur si la latence médiane d'une page
+dépasse la référence de plus de --tolerance, ou si elle fait plus de requêtes
+SQL. Régénérer la référence avec --output après un changement voulu, sur la
+même machine et avec les mêmes options.
+"""
+import argparse
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from common import setup_django, test_database
+
+setup_django()
+
+from PIL import Image as PILImage
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import Categories, Events
+
+NO_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+def upload_file():
+    buffer = io.BytesIO()
+    PILImage.new('RGB', (800, 600), 'red').save(buffer, 'JPEG')
+    return SimpleUploadedFile('bench.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+
+def scenarios(event_ids, category_id):
+    """(nom, méthode, fabrique de (url, données), statut attendu)."""
+    rng = random.Random(0)
+
+    def event_details():
+        return reverse('accounts:event_details', args=[rng.choice(event_ids)]), None
+
+    def add_review():
+        data = {'review_text': 'Très bonne ambiance', 'rating': str(rng.randint(1, 5))}
+        return reverse('accounts:add_review', args=[rng.choice(event_ids)]), data
+
+    def add_event_with_image():
+        return reverse('accounts:add_event'), {
+            'title': 'Bench', 'category': category_id, 'date': '2030-01-01T20:00:00+01:00',
+            'location': 'Paris', 'places': '50', 'image': upload_file(),
+        }
+
+    return [
+        ('home', 'get', lambda: (reverse('home'), None), 200),
+        ('event_list', 'get', lambda: (reverse('accounts:event_list'), None), 200),
+        ('event_list_category', 'get',
+         lambda: (reverse('accounts:event_list') + f'?category={category_id}', None), 200),
+        ('category_events', 'get', lambda: (reverse('accounts:category_events', args=[category_id]), None), 200),
+        ('event_details', 'get', event_details, 200),
+        ('add_review', 'post', add_review, 302),
+        ('image_upload', 'post', add_event_with_image, 302),
+    ]
+
+
+def run_scenario(users, method, make_request, expected, requests, threads):
+    latencies, queries, errors = [], [], []
+    lock = threading.Lock()
+    per_thread = max(1, requests // threads)
+
+    def worker(user):
+        client = Client()
+        client.force_login(user)
+        for i in range(per_thread + 1):
+            with lock:
+                url, data = make_request()
+            if i == 0:
+                # Premier appel hors mesure (imports, caches)
+                getattr(client, method)(url, data)
+                continue
+            start = time.perf_counter()
+            # Le comptage des requêtes n'est fiable que sur un seul thread
+            if threads == 1:
+                with CaptureQueriesContext(connection) as ctx:
+                    response = getattr(client, method)(url, data)
+                queries.append(len(ctx))
+            else:
+                response = getattr(client, method)(url, data)
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                latencies.append(elapsed)
+                if response.status_code != expected:
+                    errors.append(response.status_code)
+        if threads > 1:
+            connections.close_all()
+
+    start = time.perf_counter()
+    if threads == 1:
+        worker(users[0])
+    else:
+        workers = [threading.Thread(target=worker, args=(users[i % len(users)],)) for i in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'throughput_rps': round(len(latencies) / wall, 1),
+        'p50_ms': round(statistics.median(latencies), 2),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1], 2),
+        'p99_ms': round(latencies[int(len(latencies) * 0.99) - 1], 2),
+        'queries': round(statistics.mean(queries), 1) if queries else None,
+        'errors': len(errors),
+    }
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, result in results.items():
+        reference = baseline['results'].get(name)
+        if reference is None:
+            continue
+        if result['p50_ms'] > reference['p50_ms'] * (1 + tolerance):
+            regressions.append(f"{name} : p50 {result['p50_ms']} ms (référence {reference['p50_ms']} ms)")
+        if result['queries'] is not None and reference['queries'] is not None \
+                and result['queries'] > reference['queries']:
+            regressions.append(f"{name} : {result['queries']} requêtes SQL (référence {reference['queries']})")
+        if result['errors']:
+            regressions.append(f"{name} : {result['errors']} réponse(s) inattendue(s)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--events', type=int, default=2000)
+    parser.add_argument('--reviews', type=int, default=10, help='Avis par événement (moyenne)')
+    parser.add_argument('--requests', type=int, default=200, help='Requêtes par page')
+    parser.add_argument('--threads', type=int, default=1,
+                        help='Clients simultanés (le nombre de requêtes SQL n\'est compté qu\'avec 1)')
+    parser.add_argument('--no-cache', action='store_true', help='Désactive le cache des pages')
+    parser.add_argument('--only', nargs='*', help='Pages à mesurer')
+    parser.add_argument('--output', help='Écrit les résultats en JSON')
+    parser.add_argument('--baseline', help='Compare à un fichier de référence')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Écart de latence toléré (0.25 = +25 %%)')
+    args = parser.parse_args()
+
+    if connection.vendor == 'sqlite' and args.threads > 1:
+        # La base en mémoire n'est pas partagée entre threads
+        connection.settings_dict['TEST']['NAME'] = os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')
+
+    media_root = tempfile.mkdtemp()
+    overrides = {'MEDIA_ROOT': media_root}
+    if args.no_cache:
+        overrides['CACHES'] = NO_CACHE
+
+    with override_settings(**overrides), test_database():
+        call_command('generate_data', events=args.events, reviews=args.reviews,
+                     users=max(args.threads, 10), stdout=io.StringIO())
+        users = list(User.objects.all()[:max(args.threads, 1)])
+        event_ids = list(Events.objects.values_list('id', flat=True))
+        category_id = Categories.objects.values_list('id', flat=True).first()
+
+        results = {}
+        for name, method, make_request, expected in scenarios(event_ids, category_id):
+            if args.only and name not in args.only:
+                continue
+            results[name] = run_scenario(users, method, make_request, expected, args.requests, args.threads)
+            r = results[name]
+            print(f"{name:<22} {r['throughput_rps']:>8} req/s  p50 {r['p50_ms']:>7} ms  "
+                  f"p95 {r['p95_ms']:>7} ms  p99 {r['p99_ms']:>7} ms  "
+                  f"SQL {r['queries'] if r['queries'] is not None else '-':>5}  erreurs {r['errors']}")
+
+    report = {
+        'options': {k: v for k, v in vars(args).items() if k not in ('output', 'baseline', 'only')},
+        'database': connection.vendor,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump(report, fp, indent=2, ensure_ascii=False)
+            fp.write('\n')
+
+    if args.baseline:
+        with open(args.baseline) as fp:
+            baseline = json.load(fp)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print('Régressions :')
+            for line in regressions:
+                print(f'  {line}')
+            sys.exit(1)
+        print('Aucune régression par rapport à la référence')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Vérifie que la page de détails d'un événement fait un nombre constant de requêtes.
+
+Usage : python benchmarks/event_details_queries.py
+"""
+from common import setup_django, test_database
+
+setup_django()
+
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from accounts.models import Answers, Categories, EventReviews, Events, Image, Tags
+
+SIZES = [(1, 1), (10, 5), (50, 10)]
+
+
+def make_event(user, category, tag, reviews, answers_per_review):
+    event = Events.objects.create(
+        title=f'Événement {reviews}x{answers_per_review}', category=category,
+        date=timezone.now() + timedelta(days=7), location='Paris', places=100, created_by=user,
+    )
+    image = Image.objects.create(event=event, image='events/demo.jpg')
+    image.tags.add(tag)
+    for r in range(reviews):
+        review = EventReviews.objects.create(event=event, review_text=f'Avis {r}', rating=4, created_by=user)
+        Image.objects.create(event=event, review=review, image='events/review.jpg').tags.add(tag)
+        Answers.objects.bulk_create(
+            Answers(review=review, answer_text=f'Réponse {a}', created_by=user)
+            for a in range(answers_per_review)
+        )
+    return event
+
+
+def main():
+    with test_database():
+        user = User.objects.create_user('bench', password='bench')
+        category = Categories.objects.create(name='Conférence')
+        tag = Tags.objects.create(name='Tech')
+        client = Client()
+        client.force_login(user)
+
+        counts = []
+        for reviews, answers in SIZES:
+            event = make_event(user, category, tag, reviews, answers)
+            with CaptureQueriesContext(connection) as ctx:
+                response = client.get(f'/accounts/events/{event.id}/')
+            assert response.status_code == 200, response.status_code
+            counts.append(len(ctx.captured_queries))
+            print(f'{reviews:>3} avis x {answers:>2} réponses : {len(ctx)} requêtes')
+
+        if len(set(counts)) != 1:
+            raise SystemExit(f'ÉCHEC : le nombre de requêtes varie avec le volume ({counts})')
+        print('OK : nombre de requêtes constant')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Coût d'une page de la liste des événements selon sa profondeur.
+
+Compare la pagination par curseur (date, id) à OFFSET sur une table volumineuse.
+
+Usage : python benchmarks/event_list_pagination.py [--events 1000000]
+"""
+import argparse
+import statistics
+import time
+
+from common import setup_django, test_database
+
+setup_django()
+
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from accounts.models import Categories, Events
+from accounts.pagination import encode_cursor, paginate_keyset
+
+PAGE_SIZE = 20
+
+
+def populate(count, batch_size=10_000):
+    user = User.objects.create_user('bench')
+    categories = Categories.objects.bulk_create(Categories(name=f'Catégorie {i}') for i in range(10))
+    start = timezone.now()
+    for offset in range(0, count, batch_size):
+        with transaction.atomic():
+            Events.objects.bulk_create(
+                Events(
+                    title=f'Événement {i}',
+                    category=categories[i % len(categories)],
+                    # Plusieurs événements par minute : le départage par id compte
+                    date=start + timedelta(seconds=(i * 7919) % count),
+                    location='Paris',
+                    places=100,
+                    places_left=100,
+                    created_by=user,
+                )
+                for i in range(offset, min(offset + batch_size, count))
+            )
+    return categories
+
+
+def timed(fn, runs=5):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--events', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with test_database():
+        start = time.perf_counter()
+        categories = populate(args.events)
+        print(f'{args.events} événements insérés en {time.perf_counter() - start:.1f} s\n')
+
+        events = Events.objects.all()
+        deep = events.order_by('-date', '-id')[PAGE_SIZE]
+        deep_cursor = encode_cursor([deep.date, deep.id])
+        deep_offset = args.events - PAGE_SIZE - 1
+
+        rows = [
+            ('curseur, page 1', lambda: list(paginate_keyset(events, page_size=PAGE_SIZE))),
+            ('curseur, dernière page', lambda: list(paginate_keyset(events, after=deep_cursor, page_size=PAGE_SIZE))),
+            ('OFFSET, page 1', lambda: list(events.order_by('date', 'id')[:PAGE_SIZE])),
+            ('OFFSET, dernière page', lambda: list(events.order_by('date', 'id')[deep_offset:deep_offset + PAGE_SIZE])),
+            ('curseur + catégorie, dernière page',
+             lambda: list(paginate_keyset(events.filter(category=categories[3]), after=deep_cursor, page_size=PAGE_SIZE))),
+        ]
+        for label, fn in rows:
+            print(f'{label:<36} {timed(fn):8.2f} ms')
+
+        if connection.vendor == 'sqlite':
+            with CaptureQueriesContext(connection) as ctx:
+                list(paginate_keyset(events, after=deep_cursor, page_size=PAGE_SIZE))
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN QUERY PLAN {ctx.captured_queries[-1]['sql']}")
+                print('\nPlan :', ' / '.join(row[-1] for row in cursor.fetchall()))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Débit et mémoire de `import_events` / `export_events` selon la taille du fichier.
+
+Chaque taille est mesurée dans un processus neuf. Le pic de mémoire Python
+(tracemalloc, sur une seconde passe non chronométrée) doit rester à peu près
+le même quand le nombre de lignes est multiplié. Le RSS n'est pas utilisé :
+il inclut le cache de pages et le mmap de SQLite.
+
+Usage : python benchmarks/import_export.py [--rows 10000 100000] [--format csv]
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+
+def write_file(path, rows, fmt):
+    rng = random.Random(0)
+    with open(path, 'w', newline='', encoding='utf-8') as fp:
+        if fmt == 'csv':
+            fp.write('title,category,date,location,places\n')
+        for i in range(rows):
+            row = {
+                'title': f'Événement importé {i}',
+                'category': f'Catégorie {rng.randrange(20)}',
+                'date': f'2030-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T20:00:00+01:00',
+                'location': rng.choice(['Paris', 'Lyon', 'Nantes']),
+                'places': rng.choice([20, 100, 500]),
+            }
+            if fmt == 'csv':
+                fp.write('{title},{category},{date},{location},{places}\n'.format(**row))
+            else:
+                fp.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+
+def measure(path, fmt):
+    """Exécuté dans le processus enfant : importe puis exporte, sur une base de test."""
+    from common import setup_django, test_database
+
+    setup_django()
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.conf import settings
+    from django.db import connection
+
+    # Comme en production : avec DEBUG, Django garde le texte des 9000
+    # dernières requêtes SQL, ce qui fausserait la mesure
+    settings.DEBUG = False
+    if connection.vendor == 'sqlite':
+        # La base de test en mémoire grossirait avec les données importées
+        connection.settings_dict['TEST']['NAME'] = os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')
+
+    with test_database():
+        User.objects.create_user('import')
+
+        def run_import():
+            call_command('import_events', path, user='import', format=fmt, stdout=open(os.devnull, 'w'))
+
+        def run_export():
+            call_command('export_events', output=os.devnull, format=fmt)
+
+        result = {}
+        for name, fn in (('import', run_import), ('export', run_export)):
+            start = time.perf_counter()
+            fn()
+            result[f'{name}_s'] = time.perf_counter() - start
+            tracemalloc.start()
+            fn()
+            result[f'{name}_peak_mb'] = tracemalloc.get_traced_memory()[1] / 1e6
+            tracemalloc.stop()
+    print(json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--format', choices=['csv', 'jsonl'], default='csv')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        measure(args.child, args.format)
+        return
+
+    workdir = tempfile.mkdtemp()
+    for rows in args.rows:
+        path = os.path.join(workdir, f'events_{rows}.{args.format}')
+        write_file(path, rows, args.format)
+        output = subprocess.run(
+            [sys.executable, __file__, '--child', path, '--format', args.format],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{rows:>9} lignes ({os.path.getsize(path) / 1e6:.1f} Mo)  "
+              f"import {rows / result['import_s']:>8.0f} lignes/s  "
+              f"export {rows / result['export_s']:>8.0f} lignes/s  "
+              f"pic mémoire import {result['import_peak_mb']:.1f} Mo, export {result['export_peak_mb']:.1f} Mo")
+
+
+if __name__ == '__main__':
+    main()
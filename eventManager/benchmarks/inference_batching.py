@@ -0,0 +1,52 @@
+"""Débit (images/s) du classifieur selon la taille de lot, sur CPU.
+
+Usage : python benchmarks/inference_batching.py [--images 64] [--threads N]
+"""
+import argparse
+import os
+import sys
+import time
+
+import torch
+from PIL import Image as PILImage
+from torchvision import models
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from accounts.inference import BatchEngine
+
+
+def make_images(count, size=(640, 480)):
+    # Images de bruit : le coût d'inférence ne dépend pas du contenu
+    return [
+        PILImage.frombytes('RGB', size, os.urandom(size[0] * size[1] * 3))
+        for _ in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--images', type=int, default=64)
+    parser.add_argument('--threads', type=int, default=torch.get_num_threads())
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 32])
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    weights = models.EfficientNet_B3_Weights.IMAGENET1K_V1
+    model = models.efficientnet_b3(weights=weights)
+    model.eval()
+    images = make_images(args.images)
+
+    print(f'{args.images} images, {args.threads} thread(s)')
+    for batch_size in args.batch_sizes:
+        engine = BatchEngine(model, weights.transforms(), weights.meta['categories'],
+                             max_batch_size=batch_size)
+        engine.predict_batch(images[:batch_size])  # échauffement
+        start = time.perf_counter()
+        engine.predict_batch(images)
+        elapsed = time.perf_counter() - start
+        print(f'batch={batch_size:>3}  {args.images / elapsed:8.1f} images/s')
+
+
+if __name__ == '__main__':
+    main()
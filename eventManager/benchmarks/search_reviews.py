@@ -0,0 +1,84 @@
+"""Recherche plein texte sur un grand volume d'avis.
+
+Génère N avis (1 million par défaut), reconstruit l'index puis mesure la
+latence de quelques requêtes typiques.
+
+Usage : python benchmarks/search_reviews.py [--reviews 1000000] [--seed 42]
+"""
+import argparse
+import io
+import random
+import statistics
+import time
+
+from common import setup_django, test_database
+
+setup_django()
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import Categories, EventReviews, Events
+from accounts.search import search
+
+VOCABULARY = (
+    'concert conférence atelier super génial ennuyeux organisation accueil salle son lumière '
+    'intervenant python django jazz rock théâtre danse cuisine vin café ambiance public retard '
+    'prix places parking nantes lyon paris lille bordeaux marseille excellent décevant court long'
+).split()
+
+QUERIES = ['jazz', 'génial ambiance', 'python django', 'parking retard', 'déce', 'introuvable']
+
+
+def populate(count, rng, batch_size=10_000):
+    user = User.objects.create_user('bench')
+    category = Categories.objects.create(name='Divers')
+    events = Events.objects.bulk_create(
+        Events(title=f'Événement {i}', category=category, date=timezone.now(),
+               location=rng.choice(VOCABULARY), places=100, places_left=100, created_by=user)
+        for i in range(1000)
+    )
+    for offset in range(0, count, batch_size):
+        with transaction.atomic():
+            EventReviews.objects.bulk_create(
+                EventReviews(
+                    event=events[i % len(events)],
+                    review_text=' '.join(rng.choices(VOCABULARY, k=rng.randint(8, 40))),
+                    rating=rng.randint(1, 5),
+                    created_by=user,
+                )
+                for i in range(offset, min(offset + batch_size, count))
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--reviews', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    with test_database():
+        start = time.perf_counter()
+        populate(args.reviews, random.Random(args.seed))
+        print(f'{args.reviews} avis insérés en {time.perf_counter() - start:.1f} s')
+
+        start = time.perf_counter()
+        call_command('rebuild_search_index', stdout=io.StringIO())
+        print(f'Index reconstruit en {time.perf_counter() - start:.1f} s\n')
+
+        for query in QUERIES:
+            for page in (1, 10):
+                timings = []
+                for _ in range(args.runs):
+                    start = time.perf_counter()
+                    results, _ = search(query, page=page)
+                    timings.append((time.perf_counter() - start) * 1000)
+                print(f'{query!r:<20} page {page:>2} : {statistics.median(timings):8.1f} ms '
+                      f'({len(results)} résultats)')
+
+
+if __name__ == '__main__':
+    main()
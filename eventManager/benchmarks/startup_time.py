@@ -0,0 +1,49 @@
+"""Mesure le temps de `manage.py check` et vérifie qu'il n'importe pas torch.
+
+Usage : python benchmarks/startup_time.py [--runs 5]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHECK_SCRIPT = """
+import io, os, sys
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'eventManager.settings')
+import django
+django.setup()
+from django.core.management import call_command
+call_command('check', stdout=io.StringIO())
+heavy = sorted(m for m in ('torch', 'torchvision') if m in sys.modules)
+print(','.join(heavy))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    timings = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-c', CHECK_SCRIPT],
+            cwd=PROJECT_DIR, capture_output=True, text=True, check=True,
+        )
+        timings.append(time.perf_counter() - start)
+        heavy = result.stdout.strip()
+        if heavy:
+            print(f'ÉCHEC : manage.py check a importé {heavy}')
+            sys.exit(1)
+
+    print(f'manage.py check : médiane {statistics.median(timings) * 1000:.0f} ms '
+          f'sur {args.runs} exécutions, torch non importé')
+
+
+if __name__ == '__main__':
+    main()
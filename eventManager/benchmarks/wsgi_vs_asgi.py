@@ -0,0 +1,138 @@
+"""Page de détails d'un événement : WSGI (threads) contre ASGI (boucle asyncio).
+
+Les deux chemins passent par les vrais gestionnaires Django, dans ce
+processus : `Client` (WSGIHandler) appelé depuis N threads, et `AsyncClient`
+(ASGIHandler) avec N tâches simultanées. Chaque chemin sert ses propres vues,
+comme en déploiement : synchrones pour WSGI, celles de accounts/async_views.py
+(ASYNC_VIEWS) pour ASGI. Le gain d'ASGI tient surtout au nombre de connexions
+ouvertes simultanément qu'il supporte sans un thread chacune.
+
+    python benchmarks/wsgi_vs_asgi.py [--concurrency 1 8 32] [--no-cache]
+"""
+import argparse
+import asyncio
+import importlib
+import io
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+from common import setup_django, test_database
+
+setup_django()
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import AsyncClient, Client, override_settings
+from django.urls import clear_url_caches
+
+import accounts.urls
+import eventManager.urls
+from accounts.models import Events
+
+NO_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+def summary(latencies, wall):
+    latencies.sort()
+    return (
+        f'{len(latencies) / wall:>8.0f} req/s  p50 {statistics.median(latencies):>7.1f} ms  '
+        f'p99 {latencies[int(len(latencies) * 0.99) - 1]:>7.1f} ms'
+    )
+
+
+def use_views(async_views):
+    # Les URLconfs choisissent leurs vues à l'import, selon ASYNC_VIEWS
+    settings.ASYNC_VIEWS = async_views
+    importlib.reload(accounts.urls)
+    importlib.reload(eventManager.urls)
+    clear_url_caches()
+
+
+def run_wsgi(user, urls, concurrency):
+    latencies = []
+    lock = threading.Lock()
+    chunks = [urls[i::concurrency] for i in range(concurrency)]
+
+    def worker(chunk):
+        client = Client()
+        client.force_login(user)
+        for url in chunk:
+            start = time.perf_counter()
+            response = client.get(url)
+            elapsed = (time.perf_counter() - start) * 1000
+            assert response.status_code == 200, response.status_code
+            with lock:
+                latencies.append(elapsed)
+        connections.close_all()
+
+    threads = [threading.Thread(target=worker, args=(chunk,)) for chunk in chunks]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summary(latencies, time.perf_counter() - start)
+
+
+async def run_asgi(user, urls, concurrency):
+    latencies = []
+    chunks = [urls[i::concurrency] for i in range(concurrency)]
+
+    async def worker(chunk):
+        client = AsyncClient()
+        await client.aforce_login(user)
+        for url in chunk:
+            start = time.perf_counter()
+            response = await client.get(url)
+            latencies.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200, response.status_code
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(chunk) for chunk in chunks))
+    return summary(latencies, time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--events', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--no-cache', action='store_true', help='Désactive le cache des pages')
+    args = parser.parse_args()
+
+    if connection.vendor == 'sqlite':
+        # Base partagée entre threads : un vrai fichier, pas la base en mémoire
+        connection.settings_dict['TEST']['NAME'] = os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')
+
+    # Sous forte concurrence, toutes les requêtes dépasseraient le seuil du journal
+    overrides = {'MEDIA_ROOT': tempfile.mkdtemp(), 'PERF_SLOW_REQUEST_MS': 60_000}
+    if args.no_cache:
+        overrides['CACHES'] = NO_CACHE
+
+    with override_settings(**overrides), test_database():
+        call_command('generate_data', events=args.events, users=10, stdout=io.StringIO())
+        user = User.objects.first()
+        event_ids = list(Events.objects.values_list('id', flat=True))
+        rng = random.Random(0)
+        urls = [f'/accounts/events/{rng.choice(event_ids)}/' for _ in range(args.requests)]
+
+        for concurrency in args.concurrency:
+            use_views(async_views=False)
+            if concurrency == args.concurrency[0]:
+                # Passe de chauffe (imports, premier rendu des templates)
+                run_wsgi(user, urls[:10], 1)
+            print(f'{concurrency:>3} clients  WSGI {run_wsgi(user, urls, concurrency)}')
+            use_views(async_views=True)
+            if concurrency == args.concurrency[0]:
+                asyncio.run(run_asgi(user, urls[:10], 1))
+            print(f'{concurrency:>3} clients  ASGI {asyncio.run(run_asgi(user, urls, concurrency))}')
+
+
+if __name__ == '__main__':
+    main()
@@ -45,6 +45,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # En premier : mesure tout le reste de la chaîne (voir accounts/middleware.py)
+    'accounts.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -58,7 +60,7 @@ ROOT_URLCONF = 'eventManager.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'accounts.templating.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -82,12 +84,56 @@ LOGIN_REDIRECT_URL = '/'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Profil choisi par DB_PROFILE : "sqlite" (défaut, développement) ou "postgres" (production)
+DB_PROFILE = os.environ.get('DB_PROFILE', 'sqlite')
+
+if DB_PROFILE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'eventmanager'),
+            'USER': os.environ.get('POSTGRES_USER', 'eventmanager'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            # Connexions persistantes, vérifiées avant réutilisation
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+    }
+    if os.environ.get('DB_POOL_MAX_SIZE'):
+        # Pool psycopg 3 (paquet psycopg[pool]) : incompatible avec CONN_MAX_AGE
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.environ['DB_POOL_MAX_SIZE']),
+            'timeout': 10,
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                # Attente (s) d'un verrou d'écriture avant "database is locked"
+                'timeout': 20,
+                # Prend le verrou d'écriture dès BEGIN : évite les échecs immédiats
+                # quand deux transactions lectrices veulent ensuite écrire
+                'transaction_mode': 'IMMEDIATE',
+                # Exécuté à chaque nouvelle connexion : WAL laisse les lectures se
+                # poursuivre pendant une écriture
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    'PRAGMA busy_timeout=20000;'
+                    'PRAGMA temp_store=MEMORY;'
+                    'PRAGMA cache_size=-20000;'
+                    'PRAGMA mmap_size=134217728;'
+                ),
+            },
+        }
     }
-}
 
 
 # Password validation
@@ -137,4 +183,109 @@ LOGOUT_REDIRECT_URL = 'accounts:login'
 LOGIN_REDIRECT_URL = '/'
 
 MEDIA_URL = '/media/'
-MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
\ No newline at end of file
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Stockage froid des images des événements archivés (voir `manage.py archive_events`)
+ARCHIVE_MEDIA_URL = '/archive-media/'
+ARCHIVE_MEDIA_ROOT = os.environ.get('ARCHIVE_MEDIA_ROOT', os.path.join(BASE_DIR, 'archive_media'))
+
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    'archive': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+        'OPTIONS': {'location': ARCHIVE_MEDIA_ROOT, 'base_url': ARCHIVE_MEDIA_URL},
+    },
+}
+
+# Âge (jours) au-delà duquel un événement passé est archivé
+ARCHIVE_AFTER_DAYS = 365
+
+# Flux d'événements à venir (voir accounts/feeds.py) : confiance minimale
+# d'un tag détecté pour placer l'événement dans le flux de ce tag
+FEED_TAG_MIN_CONFIDENCE = 0.3
+
+# Tagging des images (voir `manage.py run_tagger`)
+# Backend d'inférence : eager, torchscript, compile, quantized ou onnx
+TAGGER_BACKEND = os.environ.get('TAGGER_BACKEND', 'eager')
+TAGGER_ONNX_PATH = os.path.join(BASE_DIR, 'models', 'efficientnet_b3.onnx')
+TAGGER_MAX_BATCH_SIZE = 32
+TAGGER_MAX_WAIT = 0.05
+# Charge le modèle au démarrage de chaque processus (sinon au premier job)
+TAGGER_WARM_ON_STARTUP = False
+
+# Cache des tags par contenu d'image (sha256)
+TAG_CACHE_MAX_ENTRIES = 100_000
+# Les doublons réutilisent le fichier déjà stocké au lieu d'en écrire une copie
+TAG_CACHE_SHARE_FILES = False
+
+# Point de reprise de `manage.py retag_images`
+RETAG_CHECKPOINT_PATH = os.path.join(BASE_DIR, 'retag_images.checkpoint.json')
+
+# Limites des images envoyées (vérifiées sur l'en-tête, avant décodage)
+UPLOAD_MAX_BYTES = 20 * 1024 * 1024
+UPLOAD_MAX_IMAGE_PIXELS = 40_000_000
+
+# Envois par morceaux (accounts/chunked_uploads.py) : fichiers temporaires,
+# taille maximale du fichier et d'un morceau, abandon après N heures sans envoi
+CHUNKED_UPLOAD_DIR = os.environ.get('CHUNKED_UPLOAD_DIR', os.path.join(BASE_DIR, 'upload_chunks'))
+CHUNKED_UPLOAD_MAX_BYTES = 500 * 1024 * 1024
+CHUNKED_UPLOAD_MAX_CHUNK_BYTES = 8 * 1024 * 1024
+CHUNKED_UPLOAD_EXPIRY_HOURS = 24
+
+# Cache des pages : "locmem" (défaut, par processus), "file" ou "redis"
+# (partagé entre workers, REDIS_URL)
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1'),
+        }
+    }
+elif CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_DIR', BASE_DIR / 'cache'),
+            'OPTIONS': {'MAX_ENTRIES': 10_000},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 10_000},
+        }
+    }
+
+# Durée de vie (s) des pages et fragments en cache ; les modifications les
+# invalident immédiatement (voir accounts/caching.py)
+PAGE_CACHE_TIMEOUT = 300
+
+# Instrumentation des requêtes (accounts.middleware.PerformanceMiddleware)
+# En-tête Server-Timing : expose les durées internes, réservé au développement par défaut
+PERF_SERVER_TIMING = DEBUG
+# Seuil du journal des requêtes lentes (ms) et nombre de requêtes SQL citées
+PERF_SLOW_REQUEST_MS = 500
+PERF_SLOW_TOP_QUERIES = 5
+# Adresses autorisées à lire /metrics/ (en plus des comptes staff)
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
+# Pool borné des traitements bloquants des uploads sous ASGI (validation,
+# hachage, stockage) ; au-delà des tâches en attente, l'upload est refusé
+UPLOAD_EXECUTOR_WORKERS = 4
+UPLOAD_EXECUTOR_MAX_PENDING = 16
+
+# API JSON (accounts/api.py) : taille de page par défaut et maximale
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+
+# Vues asynchrones (accounts/async_views.py) : activées par eventManager/asgi.py ;
+# sous WSGI les vues synchrones évitent le coût de async_to_sync à chaque requête
+ASYNC_VIEWS = os.environ.get('DJANGO_ASYNC_VIEWS') == '1'
+
+# Miniatures générées pour chaque image (voir `manage.py build_variants`)
+IMAGE_VARIANT_WIDTHS = [160, 480, 960]
+IMAGE_VARIANT_FORMATS = ['avif', 'webp']
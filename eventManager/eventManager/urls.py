@@ -17,15 +17,21 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from django.views.generic import RedirectView
-from accounts.views import HomeView
+from accounts.views import HomeView, metrics_view
 from django.conf import settings
 from django.conf.urls.static import static
 
+if settings.ASYNC_VIEWS:
+    from accounts.async_views import HomeView
+
 urlpatterns = [
     path('', HomeView.as_view(), name='home'),
     path('admin/', admin.site.urls),
+    path('metrics/', metrics_view, name='metrics'),
     path('accounts/', include('accounts.urls', namespace='accounts')),
+    path('api/', include('accounts.api_urls', namespace='api')),
 ]
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    urlpatterns += static(settings.ARCHIVE_MEDIA_URL, document_root=settings.ARCHIVE_MEDIA_ROOT)
\ No newline at end of file